@@ -6,9 +6,17 @@ from evennia import default_cmds
 from server.utils import sub_old_ansi
 from world.boards.models import BulletinBoard, BoardPost
 from commands.command import Command
+from server.bbunread import unread_counts, unread_posts, with_read_flag, mark_read, posts_changed
+from server.bbsweep import post_body
+from server.bbnotify import (notify_new_post, forget_subscriber, can_read,
+                             get_subscribers, QUIET_TAG)
 from evennia.commands.default.muxcommand import MuxCommand
 
 
+# posts shown per page of a board listing
+BB_LIST_SIZE = 30
+
+
 def get_boards():
     """
     returns list of bulletin boards
@@ -27,10 +35,8 @@ def list_bboards(caller):
         caller.msg("No boards were found.")
         return
     # later set this on the account level, which involves change of model
-    my_subs = []
-    for bb in bb_list:
-        if caller in bb.has_subscriber.all():
-            my_subs.append(bb)
+    my_subs = set(BulletinBoard.objects.filter(has_subscriber=caller).values_list("id", flat=True))
+    unread = unread_counts(caller)
 
     # just display the subscribed bboards with no extra info
     
@@ -41,15 +47,14 @@ def list_bboards(caller):
         bb_number = bboard.id
         bb_name = bboard.db_name
 
-        unread_num = get_num_unread(caller, bboard)
-        subbed = bboard in my_subs
+        unread_num = unread.get(bboard.id, 0)
+        subbed = bboard.id in my_subs
         
         bbtable.add_row(bb_number, bb_name, unread_num, subbed)
     caller.msg("\n" + "=" * 70 + "\n%s" % bbtable)
 
 def check_if_subbed(caller, board_to_check):
-    board_subs = board_to_check.has_subscriber.all()
-    if not caller in board_subs:
+    if caller.id not in get_subscribers(board_to_check):
         caller.msg("You are not yet a subscriber to {0}.".format(board_to_check.db_name))
         caller.msg("Use bbsub to subscribe to it.")
         return False
@@ -57,41 +62,43 @@ def check_if_subbed(caller, board_to_check):
         return True
     
 
-def get_post(caller, board_num, number):
-    board = access_bboard(caller, board_num)
-    post = BoardPost.objects.get(id__icontains=number, id__in=board)
-    return post
+def get_post(caller, board, number):
+    """
+    Returns the post with the given number on board, or None. Post
+    numbers are per board, so this is one lookup on (board, number).
+    """
+    try:
+        number = int(number)
+    except (TypeError, ValueError):
+        return None
+    return BoardPost.objects.filter(db_board=board, db_seq=number).first()
 
 def access_bboard(caller, args, request="read"):
     """
     Helper function for searching for a single bboard with
     some error handling.
     """
-    bboards = get_boards()
-    if not bboards:
-        return
-
-    if (isinstance(args, int)):
-        bb_num = int(args)
-        if (bb_num < 0) or (bb_num >= len(bboards)):
+    args = str(args).strip()
+    if args.isdigit():
+        # board numbers are the ids shown in bblist
+        board = BulletinBoard.objects.filter(id=int(args)).first()
+        if not board:
             caller.msg("Invalid board number.")
             return
-        board = bboards[bb_num]
 
     else:
-        board_ids = [ob.id for ob in bboards]
-        try:
-            board = BulletinBoard.objects.get(id__icontains=args, id__in=board_ids)
-        except BulletinBoard.DoesNotExist:
+        boards = list(BulletinBoard.objects.filter(db_name__iexact=args)) or list(
+            BulletinBoard.objects.filter(db_name__istartswith=args))
+        if not boards:
             caller.msg("Could not find a unique board by name %s." % args)
             return
-        except BulletinBoard.MultipleObjectsReturned:
-            boards = BulletinBoard.objects.filter(id__icontains=args, id__in=board_ids)
+        if len(boards) > 1:
             caller.msg(
                 "Too many boards returned, please pick one: %s"
                 % ", ".join(str(ob) for ob in boards)
             )
             return
+        board = boards[0]
     if not check_access(caller, board):
         caller.msg("You do not have the permissions to view that board.")
         return
@@ -101,15 +108,16 @@ def access_bboard(caller, args, request="read"):
 def get_all_posts(board):
     posts = []
     try:
-        posts = BoardPost.objects.filter(db_board = board)
+        posts = BoardPost.objects.filter(db_board = board, is_archived=False)
     except LookupError:
         return 
     return posts
 
-def list_messages(caller, board):
+def list_messages(caller, board, start=None):
     """
-    Helper function for printing all the posts on board
-    to caller.
+    Helper function for printing the posts on board to caller,
+    BB_LIST_SIZE at a time. Shows the newest posts unless start
+    gives the post number to list from.
     """
     if not board:
         caller.msg("No bulletin board found.")
@@ -118,23 +126,21 @@ def list_messages(caller, board):
     title = "**** %s ****" % board.db_name.capitalize()
     title = "{:^60}".format(title)
     caller.msg(title)
-    posts = get_all_posts(board)
+    posts = with_read_flag(get_all_posts(board), caller)
+    if start is None:
+        posts = list(posts.order_by("-db_seq")[:BB_LIST_SIZE])[::-1]
+    else:
+        posts = list(posts.filter(db_seq__gte=start).order_by("db_seq")[:BB_LIST_SIZE])
     if not posts:
-        caller.msg = "No posts found yet on this board."
+        caller.msg("No posts found yet on this board.")
         return
-    msgnum = 0
     msgtable = EvTable(
         "bb/msg", "Subject", "PostDate", "Posted By"
     )
 
-    # to do - posts track if they are read-by characters.
-    # not working for now.
-    
-    unread_posts = get_unread_posts(caller)
-
     for post in posts:
-        unread = post in unread_posts
-        msgnum += 1
+        unread = not post.is_read
+        msgnum = post.db_seq
         if str(board).isdigit():
             bbmsgnum = str(board) + "/" + str(msgnum)
         else:
@@ -150,74 +156,51 @@ def list_messages(caller, board):
             poster = "{0}".format(poster) + ""
         msgtable.add_row(bbmsgnum, subject, date, poster)
     caller.msg(str(msgtable))
-    pass
+    first, last = posts[0].db_seq, posts[-1].db_seq
+    older = get_all_posts(board).filter(db_seq__lt=first).exists()
+    newer = start is not None and get_all_posts(board).filter(db_seq__gt=last).exists()
+    if older:
+        caller.msg("Older posts: bbread/list %s=%s" % (board.id, max(1, first - BB_LIST_SIZE)))
+    if newer:
+        caller.msg("Newer posts: bbread/list %s=%s" % (board.id, last + 1))
 
 def get_num_unread(caller, board):
-    
-    post_list = list(BoardPost.objects.all())
-    unread = []
-    for post in post_list:
-        if board == post.db_board:
-            if caller in post.read_by.all():
-                continue
-            else:
-                unread.append(post)
-    unread_int = len(unread)
-    return unread_int
+    return unread_counts(caller).get(board.id, 0)
 
 def get_unread_posts(caller):
-    bb_list = get_boards()
-    if not bb_list:
-        return
-    my_subs = []
-    for bb in bb_list:
-        if caller in bb.has_subscriber.all():
-            my_subs.append(bb)
-    msg = "New @bb posts in: "
-    post_list = list(BoardPost.objects.all())
-    unread = []
-    for post in post_list:
-        if caller in post.read_by.all():
-            continue
-        else:
-            unread.append(post)
-    if len(unread) == 0:
+    """
+    Tell caller which of their subscribed boards have new posts.
+    Returns a list of (board, unread count).
+    """
+    counts = unread_counts(caller)
+    my_subs = BulletinBoard.objects.filter(has_subscriber=caller, id__in=list(counts))
+    unread = [(bb, counts[bb.id]) for bb in my_subs]
+    if not unread:
         caller.msg("There are no unread posts on your subscribed bboards.")
-        return 0
+        return []
+    msg = "New @bb posts in: "
+    msg += ", ".join("%s (%s)" % (bb.db_name.capitalize(), num) for bb, num in unread)
+    caller.msg(msg)
     return unread
-    for bb in my_subs:
-        post = bb.get_latest_post()
-        if not post:
-            continue
-        if not post.check_read(caller):
-            unread.append(bb)
-    if unread:
-        msg += ", ".join(bb.key.capitalize() for bb in unread)
-        caller.msg(msg)
-    else:
-        caller.msg("There are no unread posts on your subscribed bboards.")
 
 def check_access(caller, board):
-    # boards = get_boards()
-    player_groups = caller.db.pcgroups
-    board_groups = board.db_groups.all()
-    if not board_groups:
-        # assume all access
-        return True
-        #otherwise:
-    for group in board_groups:
-        if group in player_groups:
-            return True
-        else:
-            return False
+    # boards with no groups are open to all, pcgroups holds group names
+    return can_read(caller, get_subscribers(board).group_names)
+
+def format_post(board, post):
+    post_string = "**** %s ****\n" % board.db_name.capitalize()
+    post_string += "Post: %s/%s%s\n" % (board.id, post.db_seq, " (archived)" if post.is_archived else "")
+    post_string += "Subject: " + post.db_title + "\n"
+    post_string += "Author: " + post.posted_by + "\n\n"
+    post_string += post_body(post)
+    return post_string
 
 def read_post(caller, board, post_num):
     post = get_post(caller, board, post_num)
-    post_string = "**** %s ****" % board.db_name.capitalize()
-    post_string += "Subject: " + post.posted_by + "\n"
-    post_string += "Author: " + post.db_title + "\n\n"
-    post_string += post.body_text
-    return post_string
+    if not post:
+        return
+    mark_read(caller, post)
+    return format_post(board, post)
 
 '''
 to add- board timeout function for server using the board timeout value
@@ -270,9 +253,7 @@ class CmdBBNew(MuxCommand):
         if not bb_list:
             return
         if not self.rhs:
-            for bb in bb_list:
-                if caller in bb.has_subscriber.all():
-                    my_subs.append(bb)
+            my_subs = list(BulletinBoard.objects.filter(has_subscriber=caller))
         else:
             sub = access_bboard(caller, self.rhs)
             if sub:
@@ -295,14 +276,17 @@ class CmdBBNew(MuxCommand):
         # noread = "markread" in self.switches
         unread_count = 0
         for bb in my_subs:
-            posts = bb.get_unread_posts(caller.account)
+            if unread_count >= num_posts:
+                break
+            posts = list(unread_posts(caller, bb)[:num_posts - unread_count])
             if not posts:
                 continue
-            unread_count += 1
+            unread_count += len(posts)
             # caller.msg("Board %s:" % bb.key)
             # posts_on_board = 0
             for post in posts:
-                read_post(caller, bb, post)
+                caller.msg(format_post(bb, post))
+            mark_read(caller, *posts)
                 # if noread:
                 #     bb.mark_read(caller, post)
                 # else:
@@ -332,12 +316,14 @@ class CmdBBRead(MuxCommand):
         +bbread
         +bbread <Board Number>
         +bbread <Board Number>/<Message Number>
+        +bbread/list <Board Number>=<Message Number>
 
     The first command in the list returns a list of all the boards you are
     currently subscribed to. (You can also use +bblist for this.)
 
-    The second command returns a list of all the posts made to the given  
-    board.
+    The second command returns a list of the newest posts made to the given
+    board. Use +bbread/list to page back through older posts, starting
+    from the given message number.
 
     The third command returns a specific post on the given board.
 
@@ -367,7 +353,10 @@ class CmdBBRead(MuxCommand):
             return
         
         # do the reading not listing 
-        arglist = args.split("/")
+        if "list" in self.switches:
+            arglist = [self.lhs]
+        else:
+            arglist = args.split("/")
         board_num = arglist[0]
         board_to_check = access_bboard(caller, board_num)
         if not board_to_check:
@@ -380,6 +369,15 @@ class CmdBBRead(MuxCommand):
             caller.msg("You don't have the permissions necessary to read that board.")
             return
         
+        if "list" in self.switches:
+            try:
+                start = int(self.rhs) if self.rhs else 1
+            except ValueError:
+                caller.msg("Usage: +bbread/list <Board Number>=<Message Number>")
+                return
+            list_messages(caller, board_to_check, start)
+            return
+
         if len(arglist) < 2:
             list_messages(caller, board_to_check)
             return
@@ -462,6 +460,9 @@ class CmdBBPost(MuxCommand):
             if not bbpost:
                 caller.msg("Sorry, something went wrong. Usage: +bbpost <Board Number>/<Subject>=<Message>")
             else:
+                # your own post doesn't count as unread
+                mark_read(caller, bbpost)
+                notify_new_post(board, bbpost, caller)
                 caller.msg(f"Created post {subject} to board {board}.")
         return
 
@@ -504,17 +505,26 @@ class CmdBBEdit(MuxCommand):
         board = access_bboard(caller, arglist[0], "write")
         if not board:
             return
-        post = get_post(caller, post_num)
+        post = get_post(caller, board, post_num)
         if not post:
+            caller.msg("No post with that number.")
             return
-        if not caller.account.check_permstring("Admins"):
-            if (caller not in post.db_sender_accounts.all() and not board.access(
-                    caller, "edit"
-                )) or caller.key.upper() != post.poster_name.upper():
-                    caller.msg("You cannot edit someone else's post, only your own.")
-                    return
-            if board.edit_post(self.caller, post, sub_old_ansi(self.rhs)):
-                self.msg("Post edited.")
+        if not caller.check_permstring("Admins") and caller.key.upper() != post.posted_by.upper():
+            caller.msg("You cannot edit someone else's post, only your own.")
+            return
+        if post.is_archived:
+            caller.msg("That post has been archived and can't be edited.")
+            return
+        if "/" not in self.rhs:
+            self.msg("Usage: bbedit <Board Number>/<Message Number>=<Old Text>/<New Text>")
+            return
+        old_text, new_text = self.rhs.split("/", 1)
+        if not old_text or old_text not in post.body_text:
+            caller.msg("Couldn't find that text in the post.")
+            return
+        post.body_text = post.body_text.replace(old_text, sub_old_ansi(new_text))
+        post.save(update_fields=["body_text"])
+        self.msg("Post edited.")
 
 class CmdBBDel(MuxCommand):
 
@@ -536,44 +546,29 @@ class CmdBBDel(MuxCommand):
         """Implement the command"""
 
         caller = self.caller
-        args = self.lhs
-        switchname = "del"
-        verb = "delete"
-        method = "delete_post"
-        switches = self.switches
-        board = args
-        if board.tags.get("only_staff_delete") and not caller.check_permstring(
-                    "builders"
-                ):
-                    self.msg("Only builders may delete from that board.")
-                    return
-        else:
-            switchname = "archive"
-            verb = "archive"
-            method = "archive_post"
-        if len(args) < 2:
-            caller.msg("Usage: @bb/%s <board #>/<post #>" % switchname)
+        arglist = self.lhs.split("/")
+        if len(arglist) < 2:
+            caller.msg("Usage: bbdel <board #>/<post #>")
             return
         try:
-            post_num = int(args[1])
+            post_num = int(arglist[1])
         except ValueError:
             caller.msg("Invalid post number.")
             return
-        post = board.get_post(caller, post_num)
+        board = access_bboard(caller, arglist[0], "write")
+        if not board:
+            return
+        post = get_post(caller, board, post_num)
         if not post:
+            caller.msg("No post with that number.")
             return
-        if not caller.account.check_permstring("Admins"):
-            if (caller not in post.db_sender_accounts.all() and not board.access(
-                    caller, "edit"
-                )) or caller.key.upper() != post.poster_name.upper():
-                    caller.msg("You cannot %s someone else's post, only your own." % verb)
-                    return
-            if getattr(board, method)(post):
-                caller.msg("Post %sd" % verb)
-
-            else:
-                caller.msg("Post %s failed for unknown reason." % verb)
+        if not caller.check_permstring("Admins") and caller.key.upper() != post.posted_by.upper():
+            caller.msg("You cannot delete someone else's post, only your own.")
             return
+        post.delete()
+        # unread counts include it until they're rebuilt
+        posts_changed()
+        caller.msg("Post deleted.")
 
 
 class CmdBBStick(MuxCommand):
@@ -621,8 +616,10 @@ class CmdBBSub(MuxCommand):
     Usage:
        bbsub <board #>
        bbsub/add <board #>=<player>
+       bbsub/notify
 
     Subscribes to a board of the given number.
+    bbsub/notify turns new post notices on or off for all your boards.
     """
 
     key = "bbsub"
@@ -636,6 +633,16 @@ class CmdBBSub(MuxCommand):
         caller = self.caller
         args = self.lhs
 
+        if "notify" in self.switches:
+            if caller.tags.has(QUIET_TAG):
+                caller.tags.remove(QUIET_TAG)
+                caller.msg("You will be told about new posts on your boards.")
+            else:
+                caller.tags.add(QUIET_TAG)
+                caller.msg("You will no longer be told about new posts. Use bbnew to catch up.")
+            forget_subscriber(caller)
+            return
+
         if not args:
             self.msg("Usage: bbsub <board #>.")
             return
@@ -657,12 +664,11 @@ class CmdBBSub(MuxCommand):
             targ = caller
         if not targ:
             return
-        for sub in bboard.has_subscriber.all():
-            if sub == caller:
-                caller.msg("%s is already subscribed to that board." % targ)
-                return
+        if targ.id in get_subscribers(bboard):
+            caller.msg("%s is already subscribed to that board." % targ)
+            return
         #wasn't found on list so add to list
-        bboard.has_subscriber.add(caller)
+        bboard.has_subscriber.add(targ)
         caller.msg("Successfully subscribed %s to %s" % (targ, bboard.db_name))
 
 
@@ -693,12 +699,11 @@ class CmdBBUnsub(default_cmds.MuxCommand):
         bboard = access_bboard(caller, args)
         if not bboard:
             return
-        for sub in bboard.has_subscriber.all():
-            if sub == caller:
-                found = True
-                bboard.has_subscriber.remove(caller)
-                caller.msg("Unsubscribed from %s" % bboard.db_name)
-                return
+        if caller.id in get_subscribers(bboard):
+            found = True
+            bboard.has_subscriber.remove(caller)
+            caller.msg("Unsubscribed from %s" % bboard.db_name)
+            return
         if not found:
             caller.msg(f"You were not subscribed to board {args}.")
 
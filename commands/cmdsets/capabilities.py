@@ -10,6 +10,7 @@ from evennia.utils.utils import inherits_from
 from django.conf import settings
 from world.combat.models import Weapon
 from world.armor.models import ArmorMode, Capability
+from server.statblock import statblock_to_armor_fields
 
 '''
 Capabilities. Some are combat related and some are not.
@@ -202,13 +203,10 @@ class CmdCrossfuse(MuxCommand):
             #process fusion code
             # TODO - this is a draft, does a full copy. normalize.
             armor_name = (f"{char.name}Soul")
-            fused_armor  = ArmorMode.objects.create(db_name=armor_name, db_swap = 4, db_pow = char.db.pow, db_dex = char.db.dex, db_ten = char.db.ten, db_cun = char.db.cun, 
-                                            db_edu = char.db.edu, db_chr = char.db.chr, db_aur = char.db.aur, db_size = char.db.size, db_speed = char.db.speed, db_strength = char.db.strength,
+            fused_armor  = ArmorMode.objects.create(db_name=armor_name, db_swap = 4, db_size = char.db.size, db_speed = char.db.speed, db_strength = char.db.strength,
                                             db_resistance = char.db.resistance, db_weakness = char.db.weakness,
-                                            db_discern = char.db.discern, db_aim = char.db.aim, db_athletics = char.db.athletics,
-                                            db_force = char.db.force, db_mechanics = char.db.mechanics, db_medicine = char.db.medicine, db_computer = char.db.computer,
-                                            db_stealth = char.db.stealth, db_heist = char.db.heist, db_convince = char.db.convince, db_presence = char.db.presence, db_arcana = char.db.arcana,
-                                            db_primary = char.db.primary, db_secondary = char.db.secondary)
+                                            db_primary = char.db.primary, db_secondary = char.db.secondary,
+                                            **statblock_to_armor_fields(char.get_base_statblock()))
 
 
         except ValueError:
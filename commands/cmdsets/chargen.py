@@ -16,8 +16,12 @@ from evennia import create_object
 from evennia.utils.utils import inherits_from
 from evennia.objects.models import ObjectDB
 from typeclasses.accounts import Account
+from typeclasses.characters import Character
 from world.combat.models import Weapon
 from world.armor.models import ArmorMode, Capability
+from server.choices import ELEMENTS
+from server.statblock import STATBLOCK_FIELDS, stat_index, is_stat, is_skill, statblock_to_armor_fields, pack_from_attributes
+from server.weapons import weapon_index
 from server.battle import process_elements, process_attack_class, num_to_line, num_to_skill, listcap_to_string, process_effects, get_all_elements, get_all_flags, get_element_text, get_effect_text, get_class_text
 
 
@@ -72,6 +76,16 @@ Info
 
 
 
+def set_working_stat(target, name, value):
+    # characters keep stats in a packed block, armor modes as model fields
+    if inherits_from(target, settings.BASE_CHARACTER_TYPECLASS):
+        return target.set_stat(name, value)
+    field = STATBLOCK_FIELDS[stat_index(name)]
+    setattr(target, "db_" + field, value)
+    target.save()
+    return True
+
+
 class CmdStartChargen(MuxCommand):
     """
     
@@ -638,37 +652,12 @@ class CmdSetStat(MuxCommand):
         # at this point the argument is tested as valid. Let's set it.
 
         success = (f"The PC's {stat_name} was set to {stat}.")
-        if stat_name == "power" or stat_name == "pow":
-            character.db.pow = stat
-            caller.msg(success)
-            return
-        if stat_name == "dexterity" or stat_name == "dex":
-            character.db.dex = stat
-            caller.msg(success)
-            return
-        if stat_name == "tenacity" or stat_name == "ten":
-            character.db.ten = stat
-            caller.msg(success)
-            return
-        if stat_name == "cunning" or stat_name == "cun":
-            character.db.cun = stat
-            caller.msg(success)
-            return
-        if stat_name == "education" or stat_name == "edu":
-            character.db.edu = stat
-            caller.msg(success)
-            return
-        if stat_name == "charisma" or stat_name == "chr":
-            character.db.chr = stat
-            caller.msg(success)
-            return
-        if stat_name == "aura" or stat_name == "aur":
-            character.db.aur = stat
-            caller.msg(success)
-            return
-        else:
+        if not is_stat(stat_name):
             caller.msg("Not a valid entry for the stat.")
             return
+        set_working_stat(character, stat_name, stat)
+        caller.msg(success)
+        return
 
 
 
@@ -736,57 +725,12 @@ class CmdSetSkills(MuxCommand):
             return
         # at this point the argument is tested as valid. Let's set it.
         success = (f"The PC's {skill_name} was set to {stat}.")
-        if skill_name == "discern":
-            character.db.discern = stat
-            caller.msg(success)
-            return
-        if skill_name == "aim":
-            character.db.aim = stat
-            caller.msg(success)
-            return
-        if skill_name == "athletics":
-            character.db.althetics = stat
-            caller.msg(success)
-            return
-        if skill_name == "force":
-            character.db.force = stat
-            caller.msg(success)
-            return
-        if skill_name == "mechanics":
-            character.db.mechanics = stat
-            caller.msg(success)
-            return
-        if skill_name == "medicine":
-            character.db.medicine = stat
-            caller.msg(success)
-            return
-        if skill_name == "computer":
-            character.db.computer = stat
-            caller.msg(success)
-            return
-        if skill_name == "stealth":
-            character.db.stealth = stat
-            caller.msg(success)
-            return
-        if skill_name == "heist":
-            character.db.heist = stat
-            caller.msg(success)
-            return
-        if skill_name == "convince":
-            character.db.convince = stat
-            caller.msg(success)
-            return
-        if skill_name == "presence":
-            character.db.presence = stat
-            caller.msg(success)
-            return
-        if skill_name == "arcana":
-            character.db.arcana = stat
-            caller.msg(success)
-            return            
-        else: 
+        if not is_skill(skill_name):
             caller.msg("Not a valid skill entry.")
             return
+        set_working_stat(character, skill_name, stat)
+        caller.msg(success)
+        return
         
 
 class CmdSetProfileAttr(MuxCommand):
@@ -1041,7 +985,7 @@ class CmdSetWeapons(MuxCommand):
            # no = found, so just take weapon
            text = self.args
         
-        check_weapon = Weapon.objects.filter(db_name__iexact=text)
+        check_weapon = weapon_index().find_exact(text)
         if not check_weapon:
             caller.msg("That weapon was not found. Add it first using +addweapon.")
             return
@@ -1049,7 +993,7 @@ class CmdSetWeapons(MuxCommand):
             caller.msg("Error, duplicate weapons found. Please fix this in database.")
             return
 
-        weapon = Weapon.objects.filter(db_name__iexact=text)[0]
+        weapon = check_weapon[0]
 
         try:
             
@@ -1358,13 +1302,10 @@ class CmdSetArmor(MuxCommand):
             caller.msg("Character missing necessary attributes. Did you set primary weapons?")
             return
         
-        new_armor = ArmorMode.objects.create(db_name=name, db_swap = armor_type, db_belongs_to = char.name,db_pow = char.db.pow, db_dex = char.db.dex, db_ten = char.db.ten, db_cun = char.db.cun, 
-                                            db_edu = char.db.edu, db_chr = char.db.chr, db_aur = char.db.aur, db_size = char.db.size, db_speed = char.db.speed, db_strength = char.db.strength,
+        new_armor = ArmorMode.objects.create(db_name=name, db_swap = armor_type, db_belongs_to = char.name, db_size = char.db.size, db_speed = char.db.speed, db_strength = char.db.strength,
                                             db_resistance = char.db.resistance, db_weakness = char.db.weakness,
-                                            db_discern = char.db.discern, db_aim = char.db.aim, db_athletics = char.db.athletics,
-                                            db_force = char.db.force, db_mechanics = char.db.mechanics, db_medicine = char.db.medicine, db_computer = char.db.computer,
-                                            db_stealth = char.db.stealth, db_heist = char.db.heist, db_convince = char.db.convince, db_presence = char.db.presence, db_arcana = char.db.arcana,
-                                            db_primary = char.db.primary, db_secondary = char.db.secondary
+                                            db_primary = char.db.primary, db_secondary = char.db.secondary,
+                                            **statblock_to_armor_fields(char.get_base_statblock())
                                             )
         #db_capabilities.set(char.db.capabilities), db_weapons.set(char.db.weapons)
         try:
@@ -1490,6 +1431,11 @@ class CmdFinishChargen(MuxCommand):
             caller.msg("Missing attribute: function\n")
         if not char.db.specialties:
             caller.msg("Missing attribute: specialties\n")
+        # every stat and skill in one lookup
+        for name, value in zip(STATBLOCK_FIELDS, char.get_base_statblock()):
+            top = 10 if is_stat(name) else 5
+            if not (1 <= value <= top):
+                caller.msg(f"Out of range: {name} is {value}\n")
 
         try:
             self.caller.cmdset.remove(ChargenCmdset)
@@ -1499,6 +1445,39 @@ class CmdFinishChargen(MuxCommand):
             return
         
 
+class CmdMigrateStats(MuxCommand):
+    """
+    Convert characters to packed stat blocks.
+
+    Usage:
+      +migratestats
+
+    Older characters kept each stat and skill as its own attribute.
+    This packs them into a single stat block for every character that
+    doesn't have one yet, and removes the old attributes.
+
+    Characters are also converted on their own the first time their
+    stats are read, so this only needs to be run once.
+
+    """
+
+    key = "migratestats"
+    aliases = ["+migratestats"]
+    help_category = "Character"
+    locks = "perm(Admin)"
+
+    def func(self):
+        caller = self.caller
+        converted = 0
+        for char in Character.objects.all_family():
+            if char.attributes.has("statblock"):
+                continue
+            char.set_statblock(pack_from_attributes(char))
+            char.attributes.remove(list(STATBLOCK_FIELDS))
+            converted += 1
+        caller.msg(f"Converted {converted} characters to stat blocks.")
+
+
 class CmdAllWeaponSearch(MuxCommand):
     """
     This command allows you to see all weapons in the database.
@@ -1536,16 +1515,15 @@ class CmdAllWeaponSearch(MuxCommand):
         caller = self.caller
         switches = self.switches
 
+        all_weapons = weapon_index()
+
         if not switches:
-            all_weapons = Weapon.objects.all()
-            
             num =  len(all_weapons)
             caller.msg(f"Number of weapons in DB: {num}") 
             return
 
         if "all" in switches:
             caller.msg("List of all weapons:")
-            all_weapons = Weapon.objects.all()
             w_list = []
             for weapon in all_weapons:
                 w_list.append(weapon.db_name)
@@ -1561,7 +1539,7 @@ class CmdAllWeaponSearch(MuxCommand):
                 caller.msg("Search for which class of weapon?")
                 return
             val = process_attack_class(text)
-            weapons_of_class = Weapon.objects.filter(db_class__iexact=val)
+            weapons_of_class = [weapon for weapon in all_weapons if weapon.db_class == val]
             table = self.styled_table(
                 "|wName",
                 "|wClass",
@@ -1596,11 +1574,9 @@ class CmdAllWeaponSearch(MuxCommand):
                 return
             val = process_elements(text)
 
-            weapons_of_type1 = Weapon.objects.filter(db_type_1__iexact=val)
-            weapons_of_type2 = Weapon.objects.filter(db_type_2__iexact=val)
-            weapons_of_type3 = Weapon.objects.filter(db_type_3__iexact=val)
-            #union of all queries to catch all results
-            weapons_of_type = weapons_of_type1 | weapons_of_type2 | weapons_of_type3
+            #any of the three element slots counts
+            weapons_of_type = [weapon for weapon in all_weapons
+                               if val in (weapon.db_type_1, weapon.db_type_2, weapon.db_type_3)]
             if not weapons_of_type:
                     caller.msg("No matches found.")
                     return
@@ -1636,7 +1612,7 @@ class CmdAllWeaponSearch(MuxCommand):
                 caller.msg("Which weapon?")
                 return
             else:
-                weapons = Weapon.objects.filter(db_name__contains=self.args)
+                weapons = all_weapons.find(self.args)
                 if not weapons:
                     caller.msg("Weapon not found.")
                     return
@@ -1706,8 +1682,8 @@ class CmdAllArmorSearch(MuxCommand):
                     cap = armor.db_capabilities
                     #cap = listcap_to_string(cap)
 
-                    weakness = process_elements(armor.db_weakness)
-                    resistance = process_elements(armor.db_resistance)
+                    weakness = get_element_text(ELEMENTS.to_value(armor.db_weakness))
+                    resistance = get_element_text(ELEMENTS.to_value(armor.db_resistance))
                     if not weakness:
                         weakness = "None"
                     if not resistance:
@@ -19,9 +19,11 @@ from math import floor
 from evennia.utils.search import object_search
 from evennia.utils.utils import inherits_from
 from django.conf import settings
-from world.combat.models import Weapon
 from typeclasses.characters import Character
-from server.battle import process_elements, process_attack_class, process_effects, get_element_text, get_class_text, get_effect_text, num_to_line, listcap_to_string, num_to_skill
+from server.choices import ELEMENTS
+from server.statblock import STAT_SLICE, SKILL_SLICE
+from server.weapons import match_weapon, ambiguous_msg
+from server.battle import process_attack_class, process_effects, get_element_text, get_class_text, get_effect_text, num_to_line, listcap_to_string, num_to_skill
 
 class CmdFinger(BaseCommand):
     """
@@ -514,13 +516,15 @@ class CmdSheet(BaseCommand):
                 char = caller
 
             types, size, speed, strength = char.get_statobjs()
-            pow, dex, ten, cun, edu, chr, aur = char.get_stats()
+            # one lookup for every stat and skill on the sheet
+            block = char.get_statblock()
+            pow, dex, ten, cun, edu, chr, aur = block[STAT_SLICE]
             cap = char.get_caps()
             cap = listcap_to_string(cap)
             armor = char.get_current_armor()
             all_armors_names = []
-            weakness = process_elements(char.db.weakness)
-            resistance = process_elements(char.db.resistance)
+            weakness = get_element_text(ELEMENTS.to_value(char.db.weakness))
+            resistance = get_element_text(ELEMENTS.to_value(char.db.resistance))
             if not weakness:
                 weakness = "None"
             if not resistance:
@@ -528,7 +532,7 @@ class CmdSheet(BaseCommand):
             for mode in char.get_all_armors():
                 all_armors_names.append(mode.db_name)
             focuses = char.db.focuses
-            discern, aim, athletics, force, mechanics, medicine, computer, stealth, heist, convince, presence, arcana= char.get_skills()
+            discern, aim, athletics, force, mechanics, medicine, computer, stealth, heist, convince, presence, arcana= block[SKILL_SLICE]
             border = "________________________________________________________________________________"
             line1 = "Name: %s" % (name)
             line2 = "Templates: %s" % (types)
@@ -596,7 +600,7 @@ class CmdCheckWeapons(MuxCommand):
                 char = caller
 
 
-            weapon_list = char.db.weapons
+            weapon_list = char.get_weapons()
 
             sheetmsg = ("Weapons: \n")
             for weapon in weapon_list:
@@ -672,25 +676,21 @@ class CmdWeaponDesc(MuxCommand):
             caller.msg("Syntax error. Please see help wdesc.")
             return
         
-        weapon_check = Weapon.objects.filter(db_name__icontains=w_name)
-        my_weapons = caller.db.weapons
-            
-        # match found. Weapons should have a unique name with no duplicates.
+        # only weapons in your own arsenal can be described, but
         # this will let anybody who has that weapon redesc the weapon...
         # is that a problem? 
-        if not weapon_check:
-            caller.msg("That weapon is not in your arsenal.")
-            return
+        weapon_check = match_weapon(caller, w_name)
 
-        for w in my_weapons:
-            if weapon_check[0].id == w.id:                    
-                weapon = w
+        if len(weapon_check) > 1:
+            caller.msg(ambiguous_msg(weapon_check))
+            return
             
-        if not weapon:
-                #no weapon no attack
+        if not weapon_check:
+                #no weapon no desc
                 caller.msg("That weapon is not in your arsenal.")
                 return
         else:
+            weapon = weapon_check[0]
             weapon.db_description = w_desc
             weapon.save()
             caller.msg(f"Added description to weapon {weapon.db_name}")
@@ -9,11 +9,16 @@ from evennia.commands.default.muxcommand import MuxCommand
 from server.utils import sub_old_ansi
 from random import randint
 from evennia import Command, InterruptCommand
-from server.battle import roll_attack, check_valid_target, explode_tens, roll_to_string, check_successes, check_capabilities, copy_attack, do_roll, check_morale, check_not_ko
+from server.battle import roll_attack, check_valid_target, explode_tens, roll_to_string, check_successes, check_capabilities, copy_attack, do_roll, check_morale, check_not_ko, check_elements
+from server.odds import opposed_odds, expected_damage, MAX_POOL
+from server.combatstate import get_combat_state, get_combatant, mark_dirty
+from server.statblock import STATBLOCK_INDEX
+from server.armorswap import find_armor, swap_message
+from server.weapons import match_weapon, match_generic, ambiguous_msg
 from evennia.utils.utils import inherits_from
 from django.conf import settings
-from world.combat.models import Weapon, GenericAttack
-from world.armor.models import ArmorMode, Capability
+from world.combat.models import GenericAttack
+from world.armor.models import Capability
 
 
 
@@ -32,72 +37,21 @@ RESIST_FACTOR = 0.75
 
 
 def combat_reset(player):
-    player.db.hp = STANDARD_HP
-    player.db.morale = STANDARD_MORALE
-    player.db.aimdice = 0
-    player.db.defending = 0
-    player.db.chargedice = 0
-    player.db.bonusdice = 0
-    player.db.boss = False
+    # changes stay in the room's combat state until it's flushed
+    return get_combat_state(player.location).reset(player, STANDARD_HP, STANDARD_MORALE)
 
 
 def swap_armor(caller, armor):    
 
-    #armor was found, so replace my stats with this armor
-    caller.db.pow = armor.db_pow
-    caller.db.dex = armor.db_dex
-    caller.db.ten = armor.db_ten
-    caller.db.cun = armor.db_cun
-    caller.db.edu = armor.db_edu
-    caller.db.chr = armor.db_chr
-    caller.db.aur = armor.db_aur
-
-    caller.discern = armor.db_discern
-    caller.db.aim = armor.db_aim
-    caller.db.athletics =  armor.db_athletics
-    caller.db.force = armor.db_force
-    caller.db.mechanics = armor.db_mechanics
-    caller.db.medicine = armor.db_medicine
-    caller.db.computer = armor.db_computer
-    caller.db.stealth = armor.db_stealth
-    caller.db.heist = armor.db_heist
-    caller.db.convince =  armor.db_convince
-    caller.db.presence = armor.db_presence
-    caller.db.arcana = armor.db_arcana
-
-    caller.db.size = armor.db_size
-    caller.db.speed = armor.db_speed
-    caller.db.strength = armor.db_strength
-
+    #armor was found, so make it the active mode. stats, weapons and
+    #capabilities all come from the one snapshot, see server/armorswap.py
     #right now, changing armors does not change buster list
-    caller.db.capabilities = armor.db_capabilities
-    caller.db.weapons = armor.db_weapons
-    caller.db.primary = armor.db_primary
-    caller.db.secondary = armor.db_secondary
+    mode = caller.activate_armor(armor)
 
     #process the armor message
     #TODO - better pronoun processing
-    swap_msg = (f"{caller} activates their {armor.db_name} armor!")
-    if armor.db_swap == 1:
-        swap_msg = (f"{caller} has activated their {armor.db_name} mode!")
-    elif armor.db_swap == 2:   
-        swap_msg = (f"{caller} has swapped to their {armor.db_name} stance!")
-    elif armor.db_swap == 3:
-        swap_msg = (f"{caller} focuses their efforts, becoming {armor.db_name} !")
-    elif armor.db_swap == 4:
-        swap_msg = (f"{caller} changes forms, becoming their {armor.db_name}!")
-    elif armor.db_swap == 5:
-        swap_msg = (f"{caller} jacks in, activating {armor.db_name}!")
-    elif armor.db_swap == 6:
-        swap_msg = (f"{caller} summons {armor.db_name} to assist!")
-    elif armor.db_swap == 7:
-        swap_msg = (f"{caller} is playing as squadron {armor.db_name}.")
-    elif armor.db_swap == 8:
-        swap_msg = (f"{caller} activates their {armor.db_name} system!")
-
-    # the generic '9' is currently a catch-all
-    caller.location.msg_contents(swap_msg, from_obj=caller)
-    return
+    caller.location.msg_contents(swap_message(caller, mode), from_obj=caller)
+    return mode
 
 
 class CmdModeSwap(MuxCommand):
@@ -106,9 +60,11 @@ class CmdModeSwap(MuxCommand):
 
     Usage:
         armor <name>
+        armor base
 
     Swapping to an armor mode.
     This will change your stats and the weapons that you have equipped.
+    armor base goes back to your base stats and weapons.
 
 
     """
@@ -128,35 +84,22 @@ class CmdModeSwap(MuxCommand):
             caller.msg("Swap to which armor?")
             return
         else:
-            # search the armor DB for a matching armor (not case sensitive)
-            armor_name = self.args
-            armor_list = ArmorMode.objects.filter(db_name__icontains=armor_name)
+            # search my own armors for a match (not case sensitive),
+            # weapons and capabilities come along in the same trip
+            armor_name = self.args.strip()
+            if armor_name.lower() == "base":
+                caller.clear_armor()
+                caller.msg("Swapped back to your base form.")
+                return
+            my_armor = find_armor(caller, armor_name)
             errmsg = "No match for that armor was found."
             # did not find, return error
-            if not armor_list:
+            if not my_armor:
                 caller.msg(errmsg)
                 return
-            my_armors = caller.db.armor
-            #handle multiple matches
-            if len(armor_list > 1):
-                for armor in armor_list:
-                    for my_armor in my_armors:        
-                        if my_armor.id == armor.id:
-                            #match found, do the swap
-                            swap_armor(caller,my_armor)
-                            caller.msg(f"Swapped to {my_armor}.")
-                            #set the name of the armor, for the sheet
-                            caller.db.currentmode = my_armor.db_name
-                            return
-            else:
-                # only one match so it's faster not to loop
-                for my_armor in my_armors:
-                    if my_armor.id == armor[0].id:
-                        swap_armor(caller,my_armor)
-                        caller.msg(f"Swapped to {my_armor}.")
-                        #set the name of the armor, for the sheet
-                        caller.db.currentmode = my_armor.db_name
-                        return
+            swap_armor(caller, my_armor)
+            caller.msg(f"Swapped to {my_armor}.")
+            return
                         
 
 class CmdHPDisplay(MuxCommand):
@@ -181,11 +124,12 @@ class CmdHPDisplay(MuxCommand):
 
     def func(self):
         caller = self.caller
+        combatant = get_combatant(caller)
         # build a string
         # TODO - make pretty 
         border = "________________________________________________________________________________"
 
-        sheetmsg = (border + "HP: " + str(caller.db.hp) + "\n" + "Morale: " + str(caller.db.morale) + "\n" + border + "\n")
+        sheetmsg = (border + "HP: " + str(combatant.hp) + "\n" + "Morale: " + str(combatant.morale) + "\n" + border + "\n")
         caller.msg(sheetmsg)
 
 
@@ -229,6 +173,7 @@ class CmdShowdown(MuxCommand):
         
         caller= self.caller
         room = caller.location
+        state = get_combat_state(room)
 
         if self.switches:
             if "start" in self.switches:
@@ -248,8 +193,7 @@ class CmdShowdown(MuxCommand):
                 if inherits_from(player, settings.BASE_CHARACTER_TYPECLASS):
                     if not player.db.observer:
                         #remove all flags and bonus dice
-                        player.db.incombat = True
-                        combat_reset(player)
+                        combat_reset(player).incombat = True
             if "boss" in self.switches:
                 caller.msg("You start a boss fight in this location!")
                 caller.location.msg_contents(caller.name + " has begun a Boss Showdown in this location!" )
@@ -271,8 +215,9 @@ class CmdShowdown(MuxCommand):
                 start at -1 since a boss is not counted as themselves.
                 '''
                     
-                caller.db.incobmat = True
-                caller.db.boss = True
+                boss = state.get(caller)
+                boss.incombat = True
+                boss.boss = True
                 room.db.combat = True
                 override = 0
                 
@@ -286,30 +231,28 @@ class CmdShowdown(MuxCommand):
                         if not player.db.observer:
                             playercount += 1
                             # we have to check all players, to be sure this flag is set
-                            player.db.incombat = True
+                            state.get(player).incombat = True
+                            state.mark_dirty(player)
 
                 #boss HP takes the count, unless a hard number was specified
                 if override:
                     playercount = override
 
-                caller.db.hp = playercount * HP_FACTOR
-                caller.db.morale = playercount * MORALE_FACTOR
+                boss.hp = playercount * HP_FACTOR
+                boss.morale = playercount * MORALE_FACTOR
+                state.mark_dirty(caller)
                 
                 return
             if "join" in self.switches:
-                if caller.incombat:
+                if state.get(caller).incombat:
                     caller.msg("You are already in an active Showdown.")
                     return
                 else:
-                    caller.incombat = True
                     #TODO - bug check this to make sure it doesn't allow people to reset in the middle
                     #of an active fight
-                    combat_reset(caller)
+                    combat_reset(caller).incombat = True
 
             if "end" in self.switches:
-                #rooms don't have this flag by default
-                #if it's there, a combat did happen, but ended
-                room.db.combat = False          
                 char_list = room.contents_get(exclude=caller.location.exits)                
                 for player in char_list:
                 #make sure it's a player and not some other object
@@ -317,7 +260,12 @@ class CmdShowdown(MuxCommand):
                         #might not need this check, but leave it for now
                         if not player.db.observer:
                             #remove all flags and bonus dice
-                            combat_reset(player)
+                            combat_reset(player).incombat = False
+                # write the whole fight back in one go
+                state.end()
+                #rooms don't have this flag by default
+                #if it's there, a combat did happen, but ended
+                room.db.combat = False
 
             else:
                 caller.msg("Invalid switch. See help showdown.")
@@ -333,9 +281,10 @@ class CmdShowdown(MuxCommand):
             for player in char_list:
                 #make sure it's a player and not some other object
                 if inherits_from(player, settings.BASE_CHARACTER_TYPECLASS):
-                    if player.db.incombat:
+                    combatant = state.get(player)
+                    if combatant.incombat:
                         # this is too much info for live, but now, for debugging, keep it.
-                        message += (f"{player.name}: HP: {player.db.hp} Morale: {player.db.morale} \n")
+                        message += (f"{player.name}: HP: {combatant.hp} Morale: {combatant.morale} \n")
             caller.msg(message)
 
         
@@ -392,6 +341,53 @@ class CmdGMRoll(Command):
             return
 
 
+class CmdOdds(MuxCommand):
+    """
+    Preview the odds of an opposed roll.
+
+    Usage:
+       odds <attack dice>=<defense dice>
+       odds/explode <attack dice>=<defense dice>
+
+    Shows the chance of each result when a pool of attack dice
+    is rolled against a pool of defense dice, along with the average
+    damage before weakness and resist. Nothing is actually rolled.
+
+    Use /explode for pools where tens explode, as with +check.
+
+    """
+
+    key = "odds"
+    aliases = ["+odds"]
+    help_category = "Dice"
+    locks = "perm(Player))"
+
+    def func(self):
+        caller = self.caller
+        errmsg = "Usage: odds <attack dice>=<defense dice>"
+        if not self.lhs or not self.rhs:
+            caller.msg(errmsg)
+            return
+        try:
+            attack_pool = int(self.lhs)
+            defense_pool = int(self.rhs)
+        except ValueError:
+            caller.msg(errmsg)
+            return
+        if not (0 <= attack_pool <= MAX_POOL and 0 <= defense_pool <= MAX_POOL):
+            caller.msg(f"Pools must be between 0 and {MAX_POOL} dice.")
+            return
+
+        explode = "explode" in self.switches
+        odds = opposed_odds(attack_pool, defense_pool, explode)
+        outputmsg = (f"Odds for {attack_pool} dice against {defense_pool} dice:\n")
+        outputmsg += (f"Crit: {odds.crit:.1%}  Hit: {odds.hit:.1%}  Tie: {odds.tie:.1%}  ")
+        outputmsg += (f"Miss: {odds.miss:.1%}  Drama: {odds.drama:.1%}\n")
+        if not explode:
+            outputmsg += (f"Average damage: {expected_damage(attack_pool, defense_pool):.1f}")
+        caller.msg(outputmsg)
+
+
 class CmdRoll(Command):
     """
     Roll an arbitrary die.
@@ -635,6 +631,7 @@ class CmdAim(Command):
         errmsg = "An error occured. Contact an administrator to debug this."
         
         caller= self.caller
+        combatant = get_combatant(caller)
         sniper = False
 
         #if the Sniper capability is present, stack Aim up to 3x
@@ -645,14 +642,14 @@ class CmdAim(Command):
             if cap == "Sniper":
                 sniper = True
 
-        if caller.db.aimdice == 1 and not sniper:
+        if combatant.aimdice == 1 and not sniper:
             caller.msg("You are already aiming!")
             return
-        if caller.db.aimdice >= 3 and sniper:
+        if combatant.aimdice >= 3 and sniper:
             caller.msg("You are using the maximum amount of aim rounds.")
             return
         
-        if not caller.db.incombat:
+        if not combatant.incombat:
             caller.msg("You are not in an active action scene.")
             return
         
@@ -662,9 +659,10 @@ class CmdAim(Command):
             return
         
         try:
-            caller.db.defending = 0
+            combatant.defending = 0
             caller.location.msg_contents(f"{caller.name} forfeits their turn to Aim.", from_obj=caller)
-            caller.db.aimdice += 1
+            combatant.aimdice += 1
+            mark_dirty(caller)
         except ValueError:
             caller.msg(errmsg)
             return
@@ -701,8 +699,9 @@ class CmdCharge(Command):
         errmsg = "An error occured."
         
         caller= self.caller
+        combatant = get_combatant(caller)
 
-        if caller.db.chargedice == 1:
+        if combatant.chargedice == 1:
             caller.msg("You can't charge any more!")
 
         '''
@@ -710,9 +709,10 @@ class CmdCharge(Command):
         '''
         
         try:
-            caller.db.defending = 0
+            combatant.defending = 0
             caller.location.msg_contents(f"{caller.name} is charging their shot!", from_obj=caller)
-            caller.db.chargedice = 1
+            combatant.chargedice = 1
+            mark_dirty(caller)
         except ValueError:
             caller.msg(errmsg)
             return
@@ -824,24 +824,24 @@ class CmdAttack(MuxCommand):
                 flavor_text = 0
                 
             target = char
-            weapon_check = Weapon.objects.filter(db_name__icontains=attack_name)
-            my_weapons = caller.db.weapons
+            my_weapons = match_weapon(caller, attack_name)
             weapon_generic = False
             
-           
-            # match found. Weapons should have a unique name with no duplicates.
-            # this currently will fail on partial matches, so be more clever 
-            # about this in the future.
+            # match found. Exact names win, a partial name has to be
+            # unique in your arsenal.
             found_weapon = False
-            for w in my_weapons:
-                if weapon_check[0].id == w.id:                    
-                    caller.msg(f"Using weapon {w.db_name}.")
-                    caller.db.active_weapon = w
-                    found_weapon = True
+            if len(my_weapons) > 1:
+                caller.msg(ambiguous_msg(my_weapons))
+                return
+            if my_weapons:
+                w = my_weapons[0]
+                caller.msg(f"Using weapon {w.db_name}.")
+                caller.db.active_weapon = w
+                found_weapon = True
             
             if not found_weapon:
                 # is it a generic weapon?
-                weapon_check = GenericAttack.objects.filter(db_name__icontains=attack_name)
+                weapon_check = match_generic(attack_name)
                 if weapon_check:
                     found_weapon = True
                     weapon_generic = True
@@ -851,9 +851,12 @@ class CmdAttack(MuxCommand):
                     caller.msg("That weapon is not in your arsenal.")
                     return
     
+            attacker = get_combatant(caller)
+            defender = get_combatant(target)
             #if I attack I'm not defending
-            caller.db.defending = 0
-            target_defense = target.db.ten
+            attacker.defending = 0
+            target_block = target.get_statblock()
+            target_defense = target_block[STATBLOCK_INDEX["ten"]]
             target_cap = check_capabilities(target)
             attacker_cap = check_capabilities(caller)
             #either a stored weapon or the one just set
@@ -872,7 +875,7 @@ class CmdAttack(MuxCommand):
             #otherwise, lower the potential to-hit
 
             full_defender = False
-            if target.db.defending:
+            if defender.defending:
                 for cap in target_cap:
                     if cap == "Defender":
                         full_defender = True
@@ -896,13 +899,13 @@ class CmdAttack(MuxCommand):
             else:
                 result = do_roll(which_stat,which_skill)
             # add aimdice to the to-hit
-            if caller.db.aimdice:
-                bonus_dice = caller.db.aimdice
+            if attacker.aimdice:
+                bonus_dice = attacker.aimdice
                 bonus = do_roll(bonus_dice,0)
                 #not sure this works
                 result = result + bonus
             str_result = str(result)
-            dodge_roll = do_roll(target_defense,target.db.athletics)
+            dodge_roll = do_roll(target_defense,target_block[STATBLOCK_INDEX["athletics"]])
             str_dodge = str(dodge_roll)
             
             caller.msg(f"You attack {char.name} with {weapon.db_name}.")
@@ -925,12 +928,12 @@ class CmdAttack(MuxCommand):
             #final attack damage
             if "final" in switches:
                 damage = damage * 1.5
-                caller.db.reckless = True
+                attacker.reckless = True
                 outputmsg += (f"They're giving it their all!\n" )
             else:
-                caller.db.reckless = False
+                attacker.reckless = False
 
-            if target.db.reckless:
+            if defender.reckless:
                 #reckless targets can't defend.
                 target_defense = 0
                 outputmsg += (f"{target.name} used a final strike and can't defend! \n" )
@@ -939,24 +942,23 @@ class CmdAttack(MuxCommand):
 
             #skip element check for generic weapons
             if not weapon_generic:
-                weapon_elements = [weapon.db_type_1, weapon.db_type_2, weapon.db_type_3]
-                for element in weapon_elements:
-                    if element:
-                        if element == char.db.weakness:
-                            outputmsg += (f"It hit a weakness! \n")
-                            damage = damage * CRIT_FACTOR
-                    if element:
-                        if element == char.db.resistance:
-                            outputmsg += (f"It hit a resist! \n")
-                            damage = damage * RESIST_FACTOR
+                hit_weakness, hit_resist = check_elements(weapon, char)
+                if hit_weakness:
+                    outputmsg += (f"It hit a weakness! \n")
+                    damage = damage * CRIT_FACTOR
+                if hit_resist:
+                    outputmsg += (f"It hit a resist! \n")
+                    damage = damage * RESIST_FACTOR
             
             if damage == 0:
                 outputmsg += (f"The attack misses." )
             else:
                 damage = int(damage)
                 outputmsg += (f"The attack does {str(damage)} physical damage." )
-                target.db.hp = target.db.hp - damage
+                defender.hp = defender.hp - damage
+                mark_dirty(target)
 
+            mark_dirty(caller)
             caller.location.msg_contents(outputmsg, from_obj=caller)
 
 
@@ -1065,14 +1067,17 @@ class CmdTaunt(MuxCommand):
 
 
         #calc highest of charisma, aura, tenacity, cunning
-        stat = max(caller.db.chr, caller.db.aur, caller.db.ten, caller.db.cun)
-        skill = caller.get_a_skill("presence")
+        block = caller.get_statblock()
+        stat = max(block[STATBLOCK_INDEX[name]] for name in ("chr", "aur", "ten", "cun"))
+        skill = block[STATBLOCK_INDEX["presence"]]
         
         try:
-            caller.db.defending = 0
+            get_combatant(caller).defending = 0
+            mark_dirty(caller)
             result = do_roll(stat, skill)
             str_result = roll_to_string(result)
-            dodge_roll = do_roll(char.db.cun, char.db.convince)
+            target_block = char.get_statblock()
+            dodge_roll = do_roll(target_block[STATBLOCK_INDEX["cun"]], target_block[STATBLOCK_INDEX["convince"]])
             outputmsg = (f"{caller.name} rolls to taunt: {str_result} \n" )
 
             #primitive first draft damage calc
@@ -1090,7 +1095,9 @@ class CmdTaunt(MuxCommand):
                 outputmsg += (f"The attack misses." )
             else:
                 outputmsg += (f"The attack does {str(damage)} morale damage." )
-                char.db.morale = char.db.morale - damage
+                target_state = get_combatant(char)
+                target_state.morale = target_state.morale - damage
+                mark_dirty(char)
 
             caller.location.msg_contents(outputmsg, from_obj=caller)
         except ValueError:
@@ -1165,16 +1172,19 @@ class CmdIntimidate(MuxCommand):
         '''
 
         #calc highest of charisma, aura, power
-        stat = max(caller.db.chr, caller.db.aur, caller.db.pow)
+        block = caller.get_statblock()
+        stat = max(block[STATBLOCK_INDEX[name]] for name in ("chr", "aur", "pow"))
 
-        skill = caller.get_a_skill("presence")
+        skill = block[STATBLOCK_INDEX["presence"]]
         #TODO - if this roll fails, future difficulties are harder
 
         try:
-            caller.db.defending = 0
+            get_combatant(caller).defending = 0
+            mark_dirty(caller)
             result = do_roll(stat, skill)
             str_result = roll_to_string(result)
-            dodge_roll = do_roll(char.db.ten, char.db.presence)
+            target_block = char.get_statblock()
+            dodge_roll = do_roll(target_block[STATBLOCK_INDEX["ten"]], target_block[STATBLOCK_INDEX["presence"]])
             outputmsg = (f"{caller.name} rolls to intimidate: {str_result} \n" )
 
             #primitive first draft damage calc
@@ -1192,7 +1202,9 @@ class CmdIntimidate(MuxCommand):
                 outputmsg += (f"The attack misses." )
             else:
                 outputmsg += (f"The attack does {str(damage)} morale damage." )
-                char.db.morale = char.db.morale - damage
+                target_state = get_combatant(char)
+                target_state.morale = target_state.morale - damage
+                mark_dirty(char)
 
             caller.location.msg_contents(outputmsg, from_obj=caller)
         except ValueError:
@@ -1241,7 +1253,8 @@ class CmdGuard(MuxCommand):
         if not self.args:
             outputmsg = (f"{caller.name} goes into full defense." )
             caller.location.msg_contents(outputmsg, from_obj=caller)
-            caller.db.defending = 1
+            get_combatant(caller).defending = 1
+            mark_dirty(caller)
             return
         try:
             self.caller.msg("You Roll.")
@@ -1381,15 +1394,18 @@ class CmdPersuade(Command):
         '''
 
         #calc highest of charisma, cunning, education
-        stat = max(caller.db.chr, caller.db.cun, caller.db.edu)
-        skill = caller.get_a_skill("convince")
+        block = caller.get_statblock()
+        stat = max(block[STATBLOCK_INDEX[name]] for name in ("chr", "cun", "edu"))
+        skill = block[STATBLOCK_INDEX["convince"]]
 
         try:
-            caller.db.defending = 0
+            get_combatant(caller).defending = 0
+            mark_dirty(caller)
             result = do_roll(stat, skill)
             str_result = roll_to_string(result)
             # TODO - update this dodge roll later and make it better
-            dodge_roll = do_roll(char.db.ten, char.db.presence)
+            target_block = char.get_statblock()
+            dodge_roll = do_roll(target_block[STATBLOCK_INDEX["ten"]], target_block[STATBLOCK_INDEX["presence"]])
             outputmsg = (f"{caller.name} rolls to persuade: {str_result} \n" )
 
             #primitive first draft damage calc
@@ -1407,7 +1423,9 @@ class CmdPersuade(Command):
                 outputmsg += (f"The attack misses." )
             else:
                 outputmsg += (f"The attack does {str(damage)} morale damage." )
-                char.db.morale = char.db.morale - damage
+                target_state = get_combatant(char)
+                target_state.morale = target_state.morale - damage
+                mark_dirty(char)
 
             caller.location.msg_contents(outputmsg, from_obj=caller)
         # TODO - if this roll fails, future difficulties are harder
@@ -43,8 +43,11 @@ Once installed, use `help mail` in game for help with the mail command. Use
 import re
 from evennia import ObjectDB, AccountDB
 from evennia import default_cmds
-from evennia.utils import create, evtable, make_iter, inherits_from, datetime_format
-from evennia.comms.models import Msg
+from evennia.utils import evtable, make_iter, inherits_from, datetime_format
+from world.pcgroups.models import PlayerGroup
+from world.roster.models import GameRoster
+from server.mailbox import (mailbox, mail_at, inbox_page, mail_page_count, mark_mail_read,
+                            delete_mail, send_mail_bulk, group_mail_targets)
 
 
 _HEAD_CHAR = "|015-|n"
@@ -57,7 +60,8 @@ class CmdMail(default_cmds.MuxAccountCommand):
     Communicate with others by sending mail.
 
     Usage:
-      @mail       - Displays all the mail an account has in their mailbox
+      @mail       - Displays the newest page of mail in your mailbox
+      @mail/page <page #> - Displays an older page of your mailbox
       @mail <#>   - Displays a specific message
       @mail <accounts>=<subject>/<message>
               - Sends a message to the comma separated list of accounts.
@@ -68,10 +72,18 @@ class CmdMail(default_cmds.MuxAccountCommand):
       @mail/reply <#>=<message>
               - Replies to a message #. Prepends message to the original
                 message text.
+      @mail/group <group>=<subject>/<message>
+              - Sends a message to every member of a group. Group leaders
+                and staff only.
+      @mail/roster <game>=<subject>/<message>
+              - Sends a message to everyone in a game's cast. Staff only.
     Switches:
+      page    - shows one page of your mailbox
       delete  - deletes a message
       forward - forward a received message to another object with an optional message attached.
       reply   - Replies to a received message, appending the original message to the bottom.
+      group   - mail a whole group
+      roster  - mail a whole game's cast
     Examples:
       @mail 2
       @mail Griatch=New mail/Hey man, I am sending you a message!
@@ -127,12 +139,44 @@ class CmdMail(default_cmds.MuxAccountCommand):
             messages (QuerySet): Matching Msg objects.
 
         """
-        if self.caller_is_account:
-            return Msg.objects.get_by_tag(category="mail").filter(db_receivers_accounts=self.caller)
-        else:
-            return Msg.objects.get_by_tag(category="mail").filter(db_receivers_objects=self.caller)
+        return mailbox(self.caller)
 
 
+    def character_names(self):
+        """
+        The names of the caller's characters. Group leaders are stored by
+        character name, and an account's key needn't match any of them.
+        """
+        if not self.caller_is_account:
+            return {self.caller.key}
+        chars = list(self.caller.db._playable_characters or [])
+        puppet = self.session.puppet if self.session else None
+        if puppet:
+            chars.append(puppet)
+        return {char.key for char in chars if char}
+
+    def get_group_members(self):
+        """
+        The db_members of the PlayerGroup or GameRoster named in lhs, or
+        None if there isn't one or the caller can't mail it.
+        """
+        caller = self.caller
+        is_staff = caller.check_permstring("builders")
+        if "roster" in self.switches:
+            group = GameRoster.objects.filter(db_name__iexact=self.lhs).first()
+            if not is_staff:
+                caller.msg("Only staff can mail a whole cast.")
+                return None
+        else:
+            group = PlayerGroup.objects.filter(db_name__iexact=self.lhs).first()
+            if group and not is_staff and not self.character_names() & {group.db_leader, group.db_twoic}:
+                caller.msg("Only the group's leaders and staff can mail the whole group.")
+                return None
+        if not group:
+            caller.msg("No group by that name.")
+            return None
+        return group.db_members
+
     def send_mail(self, recipients, subject, message, caller):
         """
         Function for sending new mail.  Also useful for sending notifications
@@ -146,12 +190,8 @@ class CmdMail(default_cmds.MuxAccountCommand):
             caller (obj): The object (or Account or Character) that is sending the message.
 
         """
-        for recipient in recipients:
-            recipient.msg("You have received a new @mail from %s" % caller)
-            new_message = create.create_message(
-                self.caller, message, receivers=recipient, header=subject
-            )
-            new_message.tags.add("new", category="mail")
+        # every copy is created in one go, see server/mailbox.py
+        recipients = send_mail_bulk(self.caller, recipients, subject, message)
 
         if recipients:
             caller.msg("You sent your message.")
@@ -176,17 +216,15 @@ class CmdMail(default_cmds.MuxAccountCommand):
                         self.caller.msg("No Message ID given. Unable to delete.")
                         return
                     else:
-                        all_mail = self.get_all_mail()
-                        mind_max = max(0, all_mail.count() - 1)
-                        mind = max(0, min(mind_max, int(self.lhs) - 1))
-                        if all_mail[mind]:
-                            mail = all_mail[mind]
-                            question = "Delete message {} ({}) [Y]/N?".format(mind + 1, mail.header)
+                        mind = int(self.lhs)
+                        mail = mail_at(self.caller, mind)
+                        if mail:
+                            question = "Delete message {} ({}) [Y]/N?".format(mind, mail.header)
                             ret = yield (question)
                             # handle not ret, it will be None during unit testing
                             if not ret or ret.strip().upper() not in ("N", "No"):
-                                all_mail[mind].delete()
-                                self.caller.msg("Message %s deleted" % (mind + 1,))
+                                delete_mail(self.caller, mail)
+                                self.caller.msg("Message %s deleted" % (mind,))
                             else:
                                 self.caller.msg("Message not deleted.")
                         else:
@@ -206,14 +244,11 @@ class CmdMail(default_cmds.MuxAccountCommand):
                         self.caller.msg("You must define a message to forward.")
                         return
                     else:
-                        all_mail = self.get_all_mail()
-                        mind_max = max(0, all_mail.count() - 1)
                         if "/" in self.rhs:
                             message_number, message = self.rhs.split("/", 1)
-                            mind = max(0, min(mind_max, int(message_number) - 1))
+                            old_message = mail_at(self.caller, int(message_number))
 
-                            if all_mail[mind]:
-                                old_message = all_mail[mind]
+                            if old_message:
 
                                 self.send_mail(
                                     self.search_targets(self.lhslist),
@@ -227,9 +262,8 @@ class CmdMail(default_cmds.MuxAccountCommand):
                             else:
                                 raise IndexError
                         else:
-                            mind = max(0, min(mind_max, int(self.rhs) - 1))
-                            if all_mail[mind]:
-                                old_message = all_mail[mind]
+                            old_message = mail_at(self.caller, int(self.rhs))
+                            if old_message:
                                 self.send_mail(
                                     self.search_targets(self.lhslist),
                                     "FWD: " + old_message.header,
@@ -237,8 +271,7 @@ class CmdMail(default_cmds.MuxAccountCommand):
                                     self.caller,
                                 )
                                 self.caller.msg("Message forwarded.")
-                                old_message.tags.remove("new", category="mail")
-                                old_message.tags.add("fwd", category="mail")
+                                mark_mail_read(self.caller, old_message, "fwd")
                             else:
                                 raise IndexError
                 except IndexError:
@@ -254,19 +287,15 @@ class CmdMail(default_cmds.MuxAccountCommand):
                         self.caller.msg("You must supply a reply message")
                         return
                     else:
-                        all_mail = self.get_all_mail()
-                        mind_max = max(0, all_mail.count() - 1)
-                        mind = max(0, min(mind_max, int(self.lhs) - 1))
-                        if all_mail[mind]:
-                            old_message = all_mail[mind]
+                        old_message = mail_at(self.caller, int(self.lhs))
+                        if old_message:
                             self.send_mail(
                                 old_message.senders,
                                 "RE: " + old_message.header,
                                 self.rhs + "\n---- Original Message ----\n" + old_message.message,
                                 self.caller,
                             )
-                            old_message.tags.remove("new", category="mail")
-                            old_message.tags.add("-", category="mail")
+                            mark_mail_read(self.caller, old_message)
                             return
                         else:
                             raise IndexError
@@ -274,6 +303,19 @@ class CmdMail(default_cmds.MuxAccountCommand):
                     self.caller.msg("Message does not exist.")
                 except ValueError:
                     self.caller.msg("Usage: @mail/reply <#>=<message>")
+            elif "group" in self.switches or "roster" in self.switches:
+                if not self.rhs:
+                    self.caller.msg("Usage: @mail/%s <name>=<subject>/<message>" % self.switches[0])
+                    return
+                members = self.get_group_members()
+                if members is None:
+                    return
+                if "/" in self.rhs:
+                    subject, body = self.rhs.split("/", 1)
+                else:
+                    body = self.rhs
+                self.send_mail(group_mail_targets(members, self.caller_is_account),
+                               subject, body, self.caller)
             else:
                 # normal send
                 if self.rhs:
@@ -282,13 +324,19 @@ class CmdMail(default_cmds.MuxAccountCommand):
                     else:
                         body = self.rhs
                     self.send_mail(self.search_targets(self.lhslist), subject, body, self.caller)
+                elif "page" in self.switches:
+                    try:
+                        page = int(self.args)
+                    except ValueError:
+                        self.caller.msg("Usage: @mail/page <page #>")
+                        return
+                    self.list_mail(page)
                 else:
-                    all_mail = self.get_all_mail()
-                    mind_max = max(0, all_mail.count() - 1)
                     try:
-                        mind = max(0, min(mind_max, int(self.lhs) - 1))
-                        message = all_mail[mind]
-                    except (ValueError, IndexError):
+                        message = mail_at(self.caller, int(self.lhs))
+                    except ValueError:
+                        message = None
+                    if not message:
                         self.caller.msg("'%s' is not a valid mail id." % self.lhs)
                         return
 
@@ -309,51 +357,60 @@ class CmdMail(default_cmds.MuxAccountCommand):
                         messageForm.append(message.message)
                         messageForm.append(_HEAD_CHAR * _WIDTH)
                     self.caller.msg("\n".join(messageForm))
-                    message.tags.remove("new", category="mail")
-                    message.tags.add("-", category="mail")
+                    mark_mail_read(self.caller, message)
 
         else:
-            # list messages
-            messages = self.get_all_mail()
-
-            if messages:
-                table = evtable.EvTable(
-                    "|wID|n",
-                    "|wFrom|n",
-                    "|wSubject|n",
-                    "|wArrived|n",
-                    "",
-                    table=None,
-                    border="header",
-                    header_line_char=_SUB_HEAD_CHAR,
-                    width=_WIDTH,
+            # list the newest messages
+            self.list_mail()
+
+    def list_mail(self, page=None):
+        """
+        Show one page of the caller's mailbox, the newest by default.
+        """
+        pages = mail_page_count(self.caller)
+        page = pages if page is None else max(1, min(page, pages))
+        messages, index = inbox_page(self.caller, page)
+
+        if messages:
+            table = evtable.EvTable(
+                "|wID|n",
+                "|wFrom|n",
+                "|wSubject|n",
+                "|wArrived|n",
+                "",
+                table=None,
+                border="header",
+                header_line_char=_SUB_HEAD_CHAR,
+                width=_WIDTH,
+            )
+            for message in messages:
+                status = str(message.status or "-").upper()
+                if status == "NEW":
+                    status = "|gNEW|n"
+                senders = message.senders
+
+                table.add_row(
+                    index,
+                    senders[0].get_display_name(self.caller) if senders else "Unknown",
+                    message.header,
+                    datetime_format(message.db_date_created),
+                    status,
                 )
-                index = 1
-                for message in messages:
-                    status = str(message.db_tags.last().db_key.upper())
-                    if status == "NEW":
-                        status = "|gNEW|n"
-
-                    table.add_row(
-                        index,
-                        message.senders[0].get_display_name(self.caller),
-                        message.header,
-                        datetime_format(message.db_date_created),
-                        status,
-                    )
-                    index += 1
-
-                table.reformat_column(0, width=6)
-                table.reformat_column(1, width=18)
-                table.reformat_column(2, width=34)
-                table.reformat_column(3, width=13)
-                table.reformat_column(4, width=7)
-
-                self.caller.msg(_HEAD_CHAR * _WIDTH)
-                self.caller.msg(str(table))
-                self.caller.msg(_HEAD_CHAR * _WIDTH)
-            else:
-                self.caller.msg("There are no messages in your inbox.")
+                index += 1
+
+            table.reformat_column(0, width=6)
+            table.reformat_column(1, width=18)
+            table.reformat_column(2, width=34)
+            table.reformat_column(3, width=13)
+            table.reformat_column(4, width=7)
+
+            self.caller.msg(_HEAD_CHAR * _WIDTH)
+            self.caller.msg(str(table))
+            if pages > 1:
+                self.caller.msg("Page %s of %s. Use @mail/page <page #> to see others." % (page, pages))
+            self.caller.msg(_HEAD_CHAR * _WIDTH)
+        else:
+            self.caller.msg("There are no messages in your inbox.")
 
 
 
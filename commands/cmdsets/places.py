@@ -14,6 +14,7 @@ from evennia import default_cmds, create_object
 from evennia.utils import search
 from evennia.utils import utils, create
 from server.utils import sub_old_ansi
+from server.posebroadcast import forget_viewer
 from evennia.utils.utils import inherits_from
 from evennia import ObjectDB
 
@@ -180,6 +181,7 @@ class CmdClearStage(MuxCommand):
     def remove_stage(self, stage):
         for occupant in stage.db.occupants:
             occupant.db.stage = 0
+            forget_viewer(occupant)
             occupant.msg(f"You were removed from stage {stage}.")
         #delete it
         stage.delete()
@@ -278,6 +280,7 @@ class CmdStageSelect(MuxCommand):
         # found a match, so set that stage.
         name = my_stage[0].db_key
         caller.db.stage = my_stage[0]
+        forget_viewer(caller)
         my_stage[0].db.occupants.append(caller)
 
         # I am now in a stage.
@@ -369,6 +372,7 @@ class CmdDepart(MuxCommand):
         stage_name = my_stage[0].db_key
         stage.db.occupants.remove(caller)
         caller.db.stage = 0
+        forget_viewer(caller)
 
         #take me out of the list of stage occupants
 
@@ -404,11 +408,13 @@ class CmdStageMute(MuxCommand):
         if not caller.db.stagemute:
             #not muted, so toggle mute
             caller.db.stagemute = True
+            forget_viewer(caller)
             caller.msg("You turn on stage muting.")
             return
         else:
             #normal functionality
             caller.db.stagemute = False
+            forget_viewer(caller)
             caller.msg("You turn off stage muting.")
             return
        
@@ -7,6 +7,10 @@ from six import string_types
 from commands.command import BaseCommand
 from evennia.commands.default.muxcommand import MuxCommand, MuxAccountCommand
 from server.utils import sub_old_ansi, highlight_words
+from server.posebroadcast import broadcast_pose, forget_viewer
+from server.posehistory import record_pose
+from server.scenelog import log_scene_entry
+from world.scenes.models import LogEntry
 from evennia.utils import utils, evtable
 from evennia.commands.default.general import CmdSay
 from evennia.commands.default.account import CmdOOC
@@ -18,7 +22,6 @@ from evennia.utils.utils import inherits_from
 from django.conf import settings
 from typeclasses.cities import Stage
 from datetime import datetime
-import time
 
     
 
@@ -198,16 +201,14 @@ class CmdEmit(MuxCommand):
             location = caller.location
             in_stage = caller.db.stage
             private = caller.db.potprivate
-            #storing lastpose for pot
+            #storing the pose in the room's history for pot
             if not private:
-                caller.db.lastpose = message
-                caller.set_pose_time(float(time.time()))
+                record_pose(caller, message)
             if in_stage:
                 message = append_stage(caller, message)
-            target_list = see_players(location)
-            for player in target_list:
-                message = process_pose(player, caller, message)
-                player.msg(f"\n{message}\n")
+            # one render per group of viewers with the same settings
+            broadcast_pose(caller, message, location)
+            log_scene_entry(caller, LogEntry.EntryType.EMIT, message)
      
                 #self.caller.location.msg_contents(message, from_obj=caller)
         
@@ -366,16 +367,13 @@ class CmdPose(BaseCommand):
             message = sub_old_ansi(message)
             message = (f"{caller.name}{message}")
             in_stage = caller.db.stage
-            target_list = see_players(location)
-            for player in target_list:
-                message = process_pose(player, caller, message)
-                player.msg(f"\n{message}\n")
+            broadcast_pose(caller, message, location)
+            log_scene_entry(caller, LogEntry.EntryType.POSE, message)
                 
             
-            #storing lastpose for pot
+            #storing the pose in the room's history for pot
             if not private:
-                caller.db.lastpose = message
-                caller.set_pose_time(float(time.time()))
+                record_pose(caller, message)
             # this won't work actually, but fix later
             if in_stage:
                 message = append_stage(caller, message)
@@ -457,16 +455,13 @@ class CmdMegaSay(CmdSay):
             message = sub_old_ansi(message)
             message = (f"{caller.name}{pre_name_emit_string}")
             in_stage = caller.db.stage
-            target_list = see_players(caller.location)
-            for player in target_list:
-                message = process_pose(player, caller, message)
-                player.msg(f"\n{message}\n")
+            broadcast_pose(caller, message)
+            log_scene_entry(caller, LogEntry.EntryType.SAY, message)
 
-            #storing lastpose for pot
+            #storing the pose in the room's history for pot
             private = caller.db.potprivate
             if not private:
-                caller.db.lastpose = message
-                caller.set_pose_time(float(time.time()))
+                record_pose(caller, message)
             # this won't work actually, but fix later
             if in_stage:
                 message = append_stage(caller, message)
@@ -475,11 +470,8 @@ class CmdMegaSay(CmdSay):
             self.caller.msg("Some error occured.")
             return
         
-        # If an event is running in the current room, then write to event log
-        #if caller.location.db.active_event:
-            #scene = Scene.objects.get(pk=self.caller.location.db.event_id)
-            #scene.addLogEntry(LogEntry.EntryType.SAY, self.args, self.caller)
-            #add_participant_to_scene(self.caller, scene)
+        # If an event is running in the current room, the say was queued
+        # for the event log above, see server/scenelog.py
 
 
 class CmdPage(MuxCommand):
@@ -1101,10 +1093,12 @@ class CmdSetSpoof(MuxCommand):
 
         if caller.db.nospoof:
             caller.db.nospoof = False
+            forget_viewer(caller)
             caller.msg("Nospoof OFF.")
             return
         else:
             caller.db.nospoof = True
+            forget_viewer(caller)
             caller.msg("Nospoof ON.")
             return
         
@@ -2,17 +2,21 @@ from evennia.commands.default.muxcommand import MuxCommand
 from evennia import default_cmds, create_object, search_object
 from evennia.utils import utils, create
 from server.utils import sub_old_ansi, color_check
-from world.radio.models import Frequency
+from server.radio import (slot_letter, get_tuning, tune, untune, set_gag, is_gagged,
+                          listeners_on, transmit, radio_online, radio_offline, recall,
+                          RADIO_RECALL_SIZE)
 
 
-def get_frequency_index(caller, letter):
-    try:
-        letter = (letter[0]).upper
-    except:
+def get_frequency_letter(caller, letter):
+    # the slot letter, if caller has that many frequencies
+    letter = slot_letter(letter)
+    if not letter:
         caller.msg("Frequencies should be letters.")
-        return
-    i = caller.db.radio_slots.index(letter)
-    return i
+        return None
+    if ord(letter) - 64 > caller.db.radio_channels:
+        caller.msg("You don't have that many frequencies. Try +freq/total.")
+        return None
+    return letter
 
 
 class CmdRadio(MuxCommand):
@@ -67,9 +71,11 @@ class CmdRadio(MuxCommand):
             #turn radio on or off.
             if caller.db.radio_on:
                 caller.db.radio_on = False
+                radio_offline(caller)
                 caller.msg("Radio off.")
             else:
                 caller.db.radio_on = True
+                radio_online(caller)
                 caller.msg("Radio on.")
             return
     
@@ -85,71 +91,55 @@ class CmdRadio(MuxCommand):
         
         if "reset" in switches:
             #reset the radio
-            for freq in caller.db.radio_list:
-                freq.pop()
-            for name in  caller.db.radio_names:
-                name.pop()
-            for title in caller.db.radio_titles:
-                title.pop()
+            for letter in list(get_tuning(caller)):
+                untune(caller, letter)
             caller.msg("All radio frequencies cleared.")
             return
-        
-        
-        else:
-            #no switches or invalid switch, continue
-            try:
-                letter = self.lhs
-                msg = self.rhs
-
-                letter = str(freq)
-                if len(letter) == 1:
-                    #one letter, so it's a frequency, else do a 2way
-                    i = get_frequency_index(caller,freq)
-                    freq = caller.db.radio_list[i]
-                    freq_name = caller.db.radio_names[i]
-                    freq_title = caller.db.radio_titles[i]
-                    freq_colors = caller.db.radio_colors[i]
-                    #for all members of this radio frequency
-                    for member in freq.db_members:
-                        member.msg("Radio Message from frequency A:")
-                    #who aren't gagging the channel
-                    #am i spoofing? 
-                        if msg[0] == "@":
-                            #process as spoofed
-                            spoof_message = msg[1:]
-                            #also check nospoof
-                            if member.db.radio_nospoof:
-                                full_string = (f"(From {caller.name}): {spoof_message} \n")
-                            else:
-                                full_string = (spoof_message + "\n")
-                            member.msg(full_string)
-                            return
-                        else:
-                            member.msg(f'{caller.name} transmits: "{msg}"')
-                            return
-                    #TODO: format with reciever's frequency and color
-                    #maybe do some processing for interceptors
-                    
-                    return
-                else:
-                    receiver_list = freq.strip().split(',')
-                    for r in receiver_list:
-                        if r.db.radio:
-                            if not r.radio_on:
-                                caller.msg(f"{r.name}'s radio is turned off.")
-                            else:
-                                r.msg(f"Tightbeam from {caller.name}: {msg} \n")
-                                
-                            if len(receiver_list) > 1:
-                                r.msg("(Sent to")
-                                for s in receiver_list:
-                                    r.msg(f"{s.name} )\n")
-                    caller.msg(f"Tightbeam to {freq}: {msg} \n")
-                    return
-            except:
-                #no args either, so just return status
-                caller.msg("Radio status: to be added")
+
+        if not self.args:
+            #no args, so just return status
+            tuning = get_tuning(caller)
+            status = "Radio status: %s" % ("on" if caller.db.radio_on else "off")
+            for letter, slot in sorted(tuning.items()):
+                status += "\n  %s%s|n: %s %s %s%s" % (
+                    slot["color"], letter, slot["freq"], slot["name"], slot["title"],
+                    " (gagged)" if is_gagged(caller, letter) else "")
+            caller.msg(status)
+            return
+
+        if not self.rhs:
+            caller.msg("Usage: +radio <Frequency Letter>=<Message>")
+            return
+        msg = self.rhs
+
+        letter = slot_letter(self.lhs)
+        if letter:
+            #one letter, so it's a frequency, else do a 2way
+            if not caller.db.radio_on:
+                caller.msg("Your radio is turned off.")
+                return
+            #every listener gets it with their own letter and color
+            #maybe do some processing for interceptors
+            if transmit(caller, letter, msg) is None:
+                caller.msg(f"You have nothing set on frequency {letter}.")
+            return
+
+        receiver_list = []
+        for name in self.lhslist:
+            r = caller.search(name, global_search=True)
+            if not r:
                 return
+            receiver_list.append(r)
+        names = ", ".join(r.name for r in receiver_list)
+        for r in receiver_list:
+            if not r.db.radio_on:
+                caller.msg(f"{r.name}'s radio is turned off.")
+                continue
+            r.msg(f"Tightbeam from {caller.name}: {msg}")
+            if len(receiver_list) > 1:
+                r.msg(f"(Sent to {names})")
+        caller.msg(f"Tightbeam to {names}: {msg}")
+        return
 
 
 class CmdFrequency(MuxCommand):
@@ -160,6 +150,7 @@ class CmdFrequency(MuxCommand):
     Usage:
         +freq/set <Letter>=<Number>
         +freq/name <Letter>=<Name>
+        +freq/title <Letter>=<Title>
         +freq/color <Letter>=<Color>
         +freq/total <Number>
         +freq/clear <Letter>
@@ -174,7 +165,8 @@ class CmdFrequency(MuxCommand):
     These commands will set various settings on a specific frequency. The 
     SET option will set the letter in +radio to the given frequency number. The   
     NAME option will give the channel a specific name which will show up when you 
-    receive radio messages. The TOTAL option gives you more or less frequency slots 
+    receive radio messages, and TITLE is shown before your name when you
+    transmit on it. The TOTAL option gives you more or less frequency slots 
     total, up to 26. 
     
     The CLEAR option will wipe all the settings for the given channel     
@@ -203,147 +195,132 @@ class CmdFrequency(MuxCommand):
 
         if "set" in switches:
             #set a frequency            
-            if not args:
-                caller.msg(errmsg)
-                return
             try:
-                letter_freq = self.lhs
-                num_freq = self.rhs
-                num_freq = int(num_freq)
-            except:
+                num_freq = int(self.rhs)
+            except (TypeError, ValueError):
                 caller.msg(errmsg)
                 return
-            #just one uppercase letter
-            letter_freq = (letter_freq[0]).upper
-            #check my amount of frequencies
-            my_freq_amount = caller.db.radio_channels
-            number_converted = ord(letter_freq) - 64
-            if my_freq_amount < number_converted:
-                caller.msg("You don't have that many frequencies. Try +freq/total.")
+            letter_freq = get_frequency_letter(caller, self.lhs)
+            if not letter_freq:
                 return
             if num_freq > 1000000 or num_freq < 0:
                 caller.msg("Frequency numbers must be positive integers 6 digits or less.")
                 return
-            #does it exist? 
-            freq = Frequency.objects.filter(db_freq__iexact=num_freq)
-            if not freq:
-                #does not exist so create it
-                freq = Frequency.objects.create(db_freq = num_freq)
-
-            freq.db_members.add(caller) 
-            caller.db.radio_list.append(freq)
-            caller.db.radio_names.append("No Name")
-            caller.db.radio_slots.append(letter_freq)
-            caller.db.radio_titles.append("")
-            caller.db.radio_colors.append("|400")
+            tune(caller, letter_freq, num_freq)
             caller.msg(f"Added you to frequency {num_freq} on slot {letter_freq}.")
             return
 
-        if "name" in switches:
-            #name frequency
-            if not args:
+        if "name" in switches or "title" in switches or "color" in switches:
+            #name, title or color a frequency
+            if not self.rhs:
                 caller.msg(errmsg)
                 return
-            try:
-                letter_freq = self.lhs
-                name_freq = self.rhs
-            except:
-                caller.msg(errmsg)
+            letter_freq = get_frequency_letter(caller, self.lhs)
+            if not letter_freq:
                 return
-            #just one uppercase letter
-            letter_freq = (letter_freq[0]).upper
-            #check my amount of frequencies
-            my_freq_amount = caller.db.radio_channels
-            number_converted = ord(letter_freq) - 64
-            if my_freq_amount < number_converted:
-                caller.msg("You don't have that many frequencies. Try +freq/total.")
+            tuning = dict(get_tuning(caller))
+            if letter_freq not in tuning:
+                caller.msg(f"You have nothing set on frequency {letter_freq}.")
                 return
-            caller.db.radio_names[i] = name_freq
-            caller.msg(f"Set name of Frequency {letter_freq} to {name_freq}.")
+            slot = dict(tuning[letter_freq])
+            if "color" in switches:
+                # try checking valid color
+                if color_check(self.rhs) == "invalid":
+                    caller.msg("Please use a valid color code.")
+                    return
+                setting, value = "color", "|" + self.rhs
+            elif "title" in switches:
+                setting, value = "title", self.rhs
+            else:
+                setting, value = "name", self.rhs
+            slot[setting] = value
+            tuning[letter_freq] = slot
+            caller.db.radio_tuning = tuning
+            # listeners keep their label, so refresh it
+            radio_online(caller)
+            caller.msg(f"Set {setting} of Frequency {letter_freq} to {self.rhs}.")
             return
         
         if "clear" in switches:
             #clear a frequency
-            letter = args
-            i = get_frequency_index(caller,letter)
-            if not i:
-                caller.msg("You don't have that many radio channels.")
+            letter = get_frequency_letter(caller, args)
+            if not letter:
                 return
-            else:
-                caller.radio_list.pop(i)
-                caller.radio_names.pop(i)
-                caller.radio_titles.pop(i)
-                caller.radio_colors.pop(i)
+            if untune(caller, letter):
                 caller.msg(f"Cleared frequency {letter}.")
-                return
+            else:
+                caller.msg(f"You have nothing set on frequency {letter}.")
+            return
     
         if "gag" in switches:
-            #gag
-            letter = args
-            i = get_frequency_index(caller,letter)
-            if not i:
-                caller.msg("You don't have that many radio channels.")
-                return
-            num_freq = caller.db.radio_list[i]
-            freq = Frequency.objects.filter(db_freq__iexact=num_freq)
-            if not freq:
-                #this shouldn't happen, but...
-                caller.msg("Error, contact an admin to debug this.")
-                return
-            freq.db_gaglist.add(caller)
-            caller.msg(f"Now gagging frequency {freq_letter}.")
-            #TODO: reset gag list on logout
-            return
-        
-        if "color" in switches:
-            # over-ride freq color
-            # try getting frequency letter
-            letter = self.lhs
-            color = self.rhs
-            i = get_frequency_index(caller,letter)
-            if not i:
-                caller.msg("You don't have that many radio channels.")
+            #gag or ungag
+            letter = get_frequency_letter(caller, args)
+            if not letter:
                 return
-            # try checking valid color
-            if color_check(color) == "invalid":
-                caller.msg("Please use a valid color code.")
+            gag = not is_gagged(caller, letter)
+            if not set_gag(caller, letter, gag):
+                caller.msg(f"You have nothing set on frequency {letter}.")
                 return
-            # find index of frequency and set.
-            caller.db.radio_colors[i] = color
-            caller.msg(f"Set color of Frequency {letter} to {color}.")
+            if gag:
+                caller.msg(f"Now gagging frequency {letter}.")
+            else:
+                caller.msg(f"No longer gagging frequency {letter}.")
             return
         
         if "who" in switches:
             #who
-            try:
-                freq_letter = args
-                freq_letter = (freq_letter[0]).upper
-            except:
-                caller.msg(errmsg)
+            letter = get_frequency_letter(caller, args)
+            if not letter:
                 return
-            i = caller.db.radio_slots.index(freq_letter)
-            if not i:
-                caller.msg("You don't have that many radio channels.")
+            slot = get_tuning(caller).get(letter)
+            if not slot:
+                caller.msg(f"You have nothing set on frequency {letter}.")
                 return
-            num_freq = caller.db.radio_list[i]
-            freq = Frequency.objects.filter(db_freq__iexact=num_freq)
-            if not freq:
-                #this shouldn't happen, but...
-                caller.msg("Error, contact an admin to debug this.")
-                return
-            message = (f"On radio frequency {freq_letter}: ")
-            for c in freq.db_members:
+            message = (f"On radio frequency {letter}: ")
+            for c, gagged in listeners_on(slot["freq"]):
                 message += c.name
+                if gagged:
+                    message += " (gagged)"
                 message += " "
             caller.msg(message)
             return
     
         if "swap" in switches:
-            #name frequency
+            #swap two letters' settings
+            first = get_frequency_letter(caller, self.lhs)
+            second = first and get_frequency_letter(caller, self.rhs)
+            if not second:
+                return
+            tuning = dict(get_tuning(caller))
+            first_slot, second_slot = tuning.pop(first, None), tuning.pop(second, None)
+            if first_slot:
+                tuning[second] = first_slot
+            if second_slot:
+                tuning[first] = second_slot
+            caller.db.radio_tuning = tuning
+            radio_online(caller)
+            caller.msg(f"Swapped frequencies {first} and {second}.")
             return
         
         if "recall" in switches:
             #recall up to 50 messages
+            letter = get_frequency_letter(caller, self.lhs)
+            if not letter:
+                return
+            count = RADIO_RECALL_SIZE
+            if self.rhs:
+                try:
+                    count = min(int(self.rhs), RADIO_RECALL_SIZE)
+                except ValueError:
+                    caller.msg(f"Supply a number of lines up to {RADIO_RECALL_SIZE}.")
+                    return
+            lines = recall(caller, letter, count)
+            if lines is None:
+                caller.msg(f"You have nothing set on frequency {letter}.")
+            elif not lines:
+                caller.msg(f"Nothing to recall on frequency {letter}.")
+            else:
+                caller.msg(f"Recall for frequency {letter}:\n" + "\n".join(lines))
             return
         
         if "total" in switches:
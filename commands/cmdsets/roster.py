@@ -16,6 +16,7 @@ from evennia.utils import evmenu
 from evennia.utils.search import object_search
 from evennia.utils.utils import inherits_from
 from server.utils import color_check
+from server.bbnotify import forget_subscriber
 from django.conf import settings
 from typeclasses.objects import Object
 from evennia.objects.models import ObjectDB
@@ -56,6 +57,8 @@ def groupadd(caller, char_string, name):
             
         group.db_members.add(char)
         char.db.pcgroups.append(group.db_name)
+        # group boards they can now read
+        forget_subscriber(char)
         caller.msg(f"Added {char.name} to the group {group.db_name}.")
         char.msg(f"You were added to the group {group.db_name}.")
         return
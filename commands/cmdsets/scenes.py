@@ -8,7 +8,6 @@ Pose Order Tracker commands should also live here.
 """
 from math import floor
 #from typing import AwaitableGenerator
-from evennia.server.sessionhandler import SESSIONS
 import time
 import re
 from evennia import ObjectDB, AccountDB
@@ -18,6 +17,11 @@ from evennia.utils import utils, create, evtable, make_iter, inherits_from, date
 from evennia.comms.models import Msg
 from world.scenes.models import Scene, LogEntry
 from typeclasses.rooms import Room
+from server.poseorder import get_pose_order
+from server.posehistory import get_pose_history, forget_poses
+from server.scenelog import get_scene_log, flush_scene_log
+from server.scenearchive import archive_scene
+from server.scenesearch import index_scene, index_unindexed_scenes, search_scenes
 from django.conf import settings
 
 from datetime import datetime
@@ -27,42 +31,14 @@ BEATS_MULTI = 3
 
 # from evennia import default_cmds
 
-def prune_sessions(session_list):
-    # This function modifies the display of "who" and "+pot" so that, if the same player is connected from multiple
-    # devices, their character name is only displayed once to avoid confusion. Admin still see all connected sessions.
-    session_accounts = [session.account.key for session in session_list]  # get a list of just the names
-
-    unique_accounts = set(session_accounts)
-    positions = []
-
-    for acct in unique_accounts:
-        # finds positions of account name matches in the session_accounts list
-        account_positions = [i for i, x in enumerate(session_accounts) if x == acct]
-
-        # add the position of the account entry we want to the positions list
-        if len(account_positions) != 1:
-            positions.append(account_positions[-1])
-        else:
-            positions.append(account_positions[0])
-
-    positions.sort()  # since set() unorders the initial list and we want to keep a specific printed order
-    pruned_sessions = []
-
-    for pos in positions:
-        pruned_sessions.append(session_list[pos])
-
-    return pruned_sessions
-
 def add_participant_to_scene(character, scene):
     '''
     Given a character, checks the given scene's participants for that character and, if
     NOT present, adds the character as a participant to the scene.
     '''
 
-    if scene.participants.filter(pk=character.id):
-        return
-
-    scene.participants.add(character)
+    # queued with the scene's log and synced in one go on the next flush
+    get_scene_log(scene.id).add_participant(character)
 
 # Borrowing these functions from SCSMUSH autologger with permission
 # text replacement function stolen from https://stackoverflow.com/questions/919056/case-insensitive-replace
@@ -210,7 +186,7 @@ class CmdPot(MuxCommand):
                 return
             else:
                 caller.db.potprivate = True
-                caller.db.lastpose = ""
+                forget_poses(caller)
                 caller.msg("Privacy On: +pot will not track your poses.")
                 return
 
@@ -223,7 +199,7 @@ class CmdPot(MuxCommand):
             else:
                 caller.set_pose_time(0.0)
                 caller.db.observer = True
-                caller.db.lastpose = ""
+                forget_poses(caller)
                 caller.msg("Entering observer mode.")
                 caller.location.msg_contents(
                 "|y<SCENE>|n {0} is now an observer.".format(self.caller.name))
@@ -241,13 +217,12 @@ class CmdPot(MuxCommand):
                 return
         
         """
-        Get all connected accounts by polling session.
+        Read the room's pose order, oldest pose first. Only the people
+        in this room are looked at, see server/poseorder.py.
         """
 
-        all_sessions = SESSIONS.get_sessions()
-
-        all_sessions = sorted(all_sessions, key=lambda o: o.account.character[0].get_pose_time()) # sort by last posed time
-        pruned_sessions = prune_sessions(all_sessions)
+        pose_order = get_pose_order(caller.location)
+        pose_history = get_pose_history(caller.location)
 
         if "last" in switches:
             #get all poses
@@ -258,17 +233,19 @@ class CmdPot(MuxCommand):
                 if not inherits_from(char, settings.BASE_CHARACTER_TYPECLASS):
                     caller.msg("Character not found.")
                     return
-                caller.msg(f"{char.name}'s last pose: \n{char.db.lastpose}\n")
+                entry = pose_history.last_pose(char)
+                if not entry:
+                    caller.msg(f"{char.name} hasn't posed here recently.")
+                    return
+                caller.msg(f"{char.name}'s last pose: \n{entry.text}\n")
                 return
             else:
-                #list all the poses
-                pose_list = []
+                #list all the poses stored in the room, oldest first
                 poses = ""
-                for session in all_sessions:
-                    pose_list.append(session.db.lastpose)
-                    poses += (f"{session.db.name}'s last pose: \n{session.db.lastpose}\n")
+                for entry in pose_history.all():
+                    poses += (f"{entry.name}'s pose: \n{entry.text}\n")
 
-                caller.msg(poses)
+                caller.msg(poses or "No poses stored in this room.")
                 return
 
         if "since" in switches:
@@ -282,15 +259,12 @@ class CmdPot(MuxCommand):
                     return
                 
                 #list all the poses since that person
-                pose_list = []
                 poses = ""
                 
-                for session in all_sessions:
-                    if session.get_pose_time() < args.get_pose_time():
-                        pose_list.append(session.db.lastpose)
-                        poses += (f"{session.db.name}'s last pose: \n{session.db.lastpose}\n")
+                for entry in pose_history.since(char):
+                    poses += (f"{entry.name}'s pose: \n{entry.text}\n")
 
-                caller.msg(poses)
+                caller.msg(poses or f"{char.name} hasn't posed here recently.")
                 return
 
         table = self.styled_table(
@@ -301,15 +275,18 @@ class CmdPot(MuxCommand):
             "|wCondition"
         )
 
-        old_session_list = []
+        old_pose_list = []
+        now = time.time()
 
-        for session in pruned_sessions:
-            if not session.logged_in:
+        for pose_time, puppet in pose_order.ordered():
+            sessions = puppet.sessions.all()
+            if not sessions:
                 continue
 
-            puppet = session.get_puppet()
-            delta_cmd = time.time() - session.cmd_last_visible
-            delta_pose_time = time.time() - puppet.get_pose_time()
+            # someone connected from several devices is only listed once,
+            # idle from whichever session they used last
+            delta_cmd = now - max(session.cmd_last_visible for session in sessions)
+            delta_pose_time = now - pose_time
 
 
             '''
@@ -317,32 +294,25 @@ class CmdPot(MuxCommand):
             M3 can sometimes be slower, so I'll give you 2.
             '''
             if delta_pose_time > 7200:
-                old_session_list.append(session)
+                old_pose_list.append((puppet, delta_cmd, delta_pose_time))
                 continue
             
+            # logic for setting up pose table
+            table.add_row(puppet.key,
+                          utils.time_format(delta_cmd, 1),
+                          utils.time_format(delta_pose_time, 1))
+
+        for puppet, delta_cmd, delta_pose_time in old_pose_list:
 
-            if puppet.location == self.caller.location:
-                # logic for setting up pose table
+            # Changes display depending on if someone has set themselves as an observer or not.
+            if puppet.db.observer == True:
+                table.add_row("|y" + puppet.key + " (O)",
+                              utils.time_format(delta_cmd, 1),
+                              "-")
+            else:
                 table.add_row(puppet.key,
                               utils.time_format(delta_cmd, 1),
                               utils.time_format(delta_pose_time, 1))
-
-        for session in old_session_list:
-            puppet = session.get_puppet()
-            delta_cmd = time.time() - session.cmd_last_visible
-            delta_conn = time.time() - session.conn_time
-
-
-            # Changes display depending on if someone has set themselves as an observer or not.
-            if puppet.location == self.caller.location:
-                if puppet.db.observer == True:
-                    table.add_row("|y" + puppet.key + " (O)",
-                                  utils.time_format(delta_cmd, 1),
-                                  "-")
-                else:
-                    table.add_row(puppet.key,
-                                  utils.time_format(delta_cmd, 1),
-                                  utils.time_format(delta_pose_time, 1))
     
         # no valid switches, just return table
         caller.msg(table)
@@ -382,7 +352,7 @@ class CmdObserve(MuxCommand):
             caller.set_pose_time(0.0)
             caller.db.observer = True
             caller.msg("Entering observer mode.")
-            caller.db.lastpose = ""
+            forget_poses(caller)
             caller.location.msg_contents(
                 "|y<SCENE>|n {0} is now an observer.".format(self.caller.name))
             return
@@ -393,6 +363,7 @@ class CmdSceneSched(MuxCommand):
     Syntax: +scenes (+tp, +scene, +schedule)                                      
         +scene/add <Month>/<Day> <Time> <Title>=<Description>                 
         +scene/del <Month>/<Day>                                              
+        +scene/search <words>
                                                                               
         The first command displays a list of scheduled scenes. More than one a
 day can be stored. Clicking on the 'title' displayed, if you have a hyperlink 
@@ -410,6 +381,10 @@ number for a month. An example of the command would be:
                                                                               
         The +scene/del command will remove the Month/Date entry you made.     
                                                                               
+        +scene/search finds logged scenes by words in their title,
+        description or log, best matches first. Staff can use
+        +scene/reindex to index old logs that predate the search.
+
         The +scenes list should be configured to display in your current
         time zone (todo)
     """
@@ -426,6 +401,10 @@ number for a month. An example of the command would be:
             return
 
         elif "add" in self.switches:
+            # still a debug placeholder, keep it to staff for now
+            if not caller.check_permstring("builders"):
+                caller.msg("Scheduling scenes isn't open yet.")
+                return
             # Add scene
             event = Scene.objects.create(
                 name='Unnamed Event',
@@ -448,6 +427,32 @@ number for a month. An example of the command would be:
             # remove the scene matched by id
             # in the future, we will allow people to edit scenes, so this may be refactored.
 
+        elif "search" in self.switches:
+            if not self.args:
+                caller.msg("Search scenes for what?")
+                return
+            results = search_scenes(self.args)
+            if not results:
+                caller.msg("No logged scenes match that.")
+                return
+            msg = "|wScenes matching '{0}':|n".format(self.args.strip())
+            for result in results:
+                scene = result.scene
+                when = scene.start_time.strftime("%Y-%m-%d") if scene.start_time else "-"
+                msg += "\n|w{0:>5}|n {1} ({2})".format(scene.id, scene.name or "Untitled scene", when)
+                if result.snippet:
+                    msg += "\n      " + result.snippet
+            caller.msg(msg)
+            return
+
+        elif "reindex" in self.switches:
+            if not caller.check_permstring("builders"):
+                caller.msg("Only staff can rebuild the scene search index.")
+                return
+            count = index_unindexed_scenes()
+            caller.msg("Indexed {0} scene(s) for +scene/search.".format(count))
+            return
+
 
 class CmdEvent(MuxCommand):
     """
@@ -504,8 +509,14 @@ class CmdEvent(MuxCommand):
             except Exception as original:
                 raise Exception("Found zero or multiple Scenes :/") from original
 
+            # write out anything still queued for the log
+            flush_scene_log(caller.location.db.event_id, forget=True)
+
             # Stop the Room's active event by removing the active event attribute.
             Scene.objects.filter(id=caller.location.db.event_id).update(end_time=datetime.now())
+            # pack the finished log into its compressed archive and index it for +scene/search
+            archive_scene(caller.location.db.event_id)
+            index_scene(caller.location.db.event_id)
             self.caller.location.msg_contents("|y<SCENE>|n A log has been stopped in this room with scene ID {0}.".format(events.id))
             del caller.location.db.active_event
             return
@@ -829,8 +840,14 @@ class CmdAutolog(MuxCommand):
             except Exception as original:
                 raise Exception("Found zero or multiple Scenes :/") from original
 
+            # write out anything still queued for the log
+            flush_scene_log(caller.location.db.event_id, forget=True)
+
             # Stop the Room's active event by removing the active event attribute.
             Scene.objects.filter(id=caller.location.db.event_id).update(end_time=datetime.now())
+            # pack the finished log into its compressed archive and index it for +scene/search
+            archive_scene(caller.location.db.event_id)
+            index_scene(caller.location.db.event_id)
             self.caller.location.msg_contents("|y<SCENE>|n A log has been stopped in this room with scene ID {0}.".format(events.id))
             del caller.location.db.active_event
             return
@@ -5,7 +5,8 @@ from evennia import CmdSet
 from six import string_types
 from commands.command import BaseCommand, Command
 from evennia.commands.default.muxcommand import MuxCommand
-from server.utils import sub_old_ansi, color_check
+from server.utils import sub_old_ansi, color_check, forget_highlighter
+from server.posebroadcast import forget_viewer
 from evennia.accounts.models import AccountDB
 from evennia import ObjectDB
 from commands.cmdsets import places
@@ -626,6 +627,7 @@ class CmdHighlight(MuxCommand):
                 return
             if not high_list:
                 caller.db.highlightlist = []
+                high_list = caller.db.highlightlist
 
             high_str = args.split("=")
             if len(high_str) == 1:
@@ -637,6 +639,8 @@ class CmdHighlight(MuxCommand):
                 return
             else:
                 high_list.append(high_str)
+                forget_highlighter(caller)
+                forget_viewer(caller)
                 caller.msg(f"Added word |{high_str[1]}{high_str[0]}|n.")
                 return
 
@@ -653,8 +657,10 @@ class CmdHighlight(MuxCommand):
                         matched = True                        
                         caller.msg(f"Deleted word pairing {high_list[check]}|n.")
                         del high_list[check:check+1]
-                        check = check +1
+                        forget_highlighter(caller)
+                        forget_viewer(caller)
                         return
+                    check = check +1
                 if not matched:
                     caller.msg(f"{args} was not found.")
                     return
@@ -8,18 +8,18 @@ Communication commands:
 """
 
 from django.conf import settings
-from django.db.models import Q
 
 from evennia.accounts import bots
 from evennia.accounts.models import AccountDB
 from evennia.comms.comms import DefaultChannel
-from evennia.comms.models import Msg, TempMsg
 from evennia.locks.lockhandler import LockException
 from evennia.utils import create, logger, search, utils
 from evennia.utils.evmenu import ask_yes_no
 from evennia.utils.logger import tail_log_file
 from evennia.utils.utils import class_from_module, strip_unsafe_input
 
+from server.pagehistory import page_history, last_paged, note_page_sent
+
 COMMAND_DEFAULT_CLASS = class_from_module(settings.COMMAND_DEFAULT_CLASS)
 CHANNEL_DEFAULT_TYPECLASS = class_from_module(
     settings.BASE_CHANNEL_TYPECLASS, fallback=settings.FALLBACK_CHANNEL_TYPECLASS
@@ -1309,12 +1309,13 @@ class CmdPage(COMMAND_DEFAULT_CLASS):
       page <account>,<account>,... = <message>
       tell        ''
       p ''
+      page <number>
 
     Switches:
       last - shows who you last messaged
 
     Send a message to target user (if online). If no argument is given, you
-    will get a list of your latest messages. The equal sign is needed for
+    will see your latest page, or your last <number> pages. The equal sign is needed for
     multiple targets or if sending to target with space in the name.
 
     """
@@ -1334,32 +1335,13 @@ class CmdPage(COMMAND_DEFAULT_CLASS):
         # Since account_caller is set above, this will be an Account.
         caller = self.caller
 
-        # get the messages we've sent (not to channels)
-        pages_we_sent = Msg.objects.get_messages_by_sender(caller).order_by("-db_date_created")
-        # get only messages tagged as pages or not tagged at all (legacy pages)
-        pages_we_sent = pages_we_sent.filter(
-            Q(db_tags__db_key__iexact="page", db_tags__db_category__iexact="comms")
-            | Q(db_tags__isnull=True)
-        )
-        # we need to default to True to allow for legacy pages
-        pages_we_sent = [msg for msg in pages_we_sent if msg.access(caller, "read", default=True)]
-
-        # get last messages we've got
-        pages_we_got = Msg.objects.get_messages_by_receiver(caller).order_by("-db_date_created")
-        pages_we_got = pages_we_got.filter(
-            Q(db_tags__db_key__iexact="page", db_tags__db_category__iexact="comms")
-            | Q(db_tags__isnull=True)
-        )
-        # we need to default to True to allow for legacy pages
-        pages_we_got = [msg for msg in pages_we_got if msg.access(caller, "read", default=True)]
-
-        # get only messages tagged as pages or not tagged at all (legacy pages)
         targets, message, number = [], None, None
 
         if "last" in self.switches:
-            if pages_we_sent:
-                recv = ",".join(obj.key for obj in pages_we_sent[0].receivers)
-                self.msg(f"You last paged |c{recv}|n:{pages_we_sent[0].message}")
+            last_page = last_paged(caller)
+            if last_page:
+                recv = ",".join(obj.key for obj in last_page.receivers)
+                self.msg(f"You last paged |c{recv}|n:{last_page.message}")
                 return
             else:
                 self.msg("You haven't paged anyone yet.")
@@ -1392,15 +1374,13 @@ class CmdPage(COMMAND_DEFAULT_CLASS):
                     # a single-word message - use the original args
                     message = self.args.strip()
 
-        pages = list(pages_we_sent) + list(pages_we_got)
-        pages = sorted(pages, key=lambda page: page.date_created)
-
         if message:
             # send a message
             if not targets:
                 # no target given - send to last person we paged
-                if pages_we_sent:
-                    targets = pages_we_sent[0].receivers
+                last_page = last_paged(caller)
+                if last_page:
+                    targets = last_page.receivers
                 else:
                     self.msg("Who do you want page?")
                     return
@@ -1411,7 +1391,7 @@ class CmdPage(COMMAND_DEFAULT_CLASS):
 
             # create the persistent message object
             target_perms = " or ".join([f"id({target.id})" for target in targets + [caller]])
-            create.create_message(
+            page = create.create_message(
                 caller,
                 message,
                 receivers=targets,
@@ -1422,6 +1402,7 @@ class CmdPage(COMMAND_DEFAULT_CLASS):
                 ),
                 tags=[("page", "comms")],
             )
+            note_page_sent(caller, page)
 
             # tell the accounts they got a message.
             received = []
@@ -1445,29 +1426,16 @@ class CmdPage(COMMAND_DEFAULT_CLASS):
             return
 
         else:
-            # no message to send
-            if number is not None and len(pages) > number:
-                lastpages = pages[-number:]
-            else:
-                lastpages = pages
+            # no message to send, show the latest page or the last number of them
+            lastpages = page_history(caller, number or 1)
             to_template = "|w{date}{clr} {sender}|nto{clr}{receiver}|n:> {message}"
             from_template = "|w{date}{clr} {receiver}|nfrom{clr}{sender}|n:< {message}"
             listing = []
-            prev_selfsend = False
             for page in lastpages:
                 multi_send = len(page.senders) > 1
                 multi_recv = len(page.receivers) > 1
+                # the history has each page once, so self-messages show as sends
                 sending = self.caller in page.senders
-                # self-messages all look like sends, so we assume they always
-                # come in close pairs and treat the second of the pair as the recv.
-                selfsend = sending and self.caller in page.receivers
-                if selfsend:
-                    if prev_selfsend:
-                        # this is actually a receive of a self-message
-                        sending = False
-                        prev_selfsend = False
-                    else:
-                        prev_selfsend = True
 
                 clr = "|c" if sending else "|g"
 
@@ -1492,12 +1460,10 @@ class CmdPage(COMMAND_DEFAULT_CLASS):
                     )
                 )
             lastpages = "\n ".join(listing)
-            # hacky way to get only my most recent page, for now
-            # to avoid spamming with Every Page Ever
-            length_pages = len(listing)
-            last_page = listing[length_pages-1]
-            if lastpages:
-                string = f"Your latest page:\n {last_page}"
+            if len(listing) > 1:
+                string = f"Your latest pages:\n {lastpages}"
+            elif lastpages:
+                string = f"Your latest page:\n {lastpages}"
             else:
                 string = "You haven't sent or received any pages yet."
             self.msg(string)
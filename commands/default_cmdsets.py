@@ -28,17 +28,17 @@ from commands.cmdsets.charinfo import CmdFinger, CmdSheet, CmdCookieCounter, Cmd
 #from commands.cmdsets.scenes import CmdPot
 from commands.cmdsets.mail import CmdMail, CmdMailCharacter
 from commands.cmdsets.movement import CmdHome, CmdDitch, CmdSummon, CmdJoin, CmdFollow, CmdPortal, CmdTidyUp
-from commands.cmdsets.chargen import CmdUnPlayer, CmdSetPlayer, CmdFCStatus, CmdAllWeaponSearch, CmdAllArmorSearch, CmdWorkArmor
+from commands.cmdsets.chargen import CmdUnPlayer, CmdSetPlayer, CmdFCStatus, CmdAllWeaponSearch, CmdAllArmorSearch, CmdWorkArmor, CmdMigrateStats
 from commands import command
 from commands.default.account import CmdOOC, CmdOOCLook, CmdCharCreate, CmdCharDelete
-from commands.cmdsets.combat import CmdRoll, CmdModeSwap, CmdGMRoll, CmdFlip, CmdRollSet, CmdRollSkill, CmdTaunt, CmdPersuade, CmdIntimidate, CmdHPDisplay, CmdAttack, CmdGenericAtk, CmdShowdown
+from commands.cmdsets.combat import CmdRoll, CmdModeSwap, CmdGMRoll, CmdFlip, CmdRollSet, CmdRollSkill, CmdTaunt, CmdPersuade, CmdIntimidate, CmdHPDisplay, CmdAttack, CmdGenericAtk, CmdShowdown, CmdOdds
 from commands.cmdsets.capabilities import CmdWeaponCopy
 from commands.cmdsets.roster import CmdShowGroups, CmdSetGroups, CmdFCList, CmdCreateGroup, CmdCreateSquad, CmdCreateGameRoster, CmdXWho
 from commands.cmdsets.building import CmdLinkTeleport, CmdMakeCity, CmdProtector, CmdSetProtector, CmdClearProtector, CmdCheckQuota, CmdMakePrivateRoom, CmdDestroyPrivateRoom
 from commands.cmdsets.building import CmdLockRoom, CmdUnLockRoom, CmdDescInterior
 from commands.cmdsets.items import CmdCraft, CmdDescCraft, CmdSetQuota, CmdJunkCraft
 from commands.cmdsets.places import CmdClearStage, CmdListStages, CmdMakeStage, CmdSetStage, CmdStageMute, CmdDepart, CmdStageSelect
-from commands.cmdsets.scenes import CmdSequenceStart, CmdAutolog, CmdObserve, CmdPot
+from commands.cmdsets.scenes import CmdSequenceStart, CmdAutolog, CmdObserve, CmdPot, CmdSceneSched
 from commands.cmdsets.jobs import CmdRequest, CmdCheckJobs, CmdCreateFile, CmdCheckFiles
 
 
@@ -146,6 +146,7 @@ class CharacterCmdSet(default_cmds.CharacterCmdSet):
         self.add(CmdFlip())
         self.add(CmdShowdown())
         self.add(CmdGMRoll())
+        self.add(CmdOdds())
         self.add(CmdRoll())
         self.add(CmdRollSet())
         self.add(CmdRollSkill())
@@ -183,6 +184,7 @@ class CharacterCmdSet(default_cmds.CharacterCmdSet):
 
         #GM and autologger
         self.add(CmdSequenceStart())
+        self.add(CmdSceneSched())
 
         #request
         self.add(CmdRequest())
@@ -211,6 +213,7 @@ class CharacterCmdSet(default_cmds.CharacterCmdSet):
         self.add(CmdAllWeaponSearch())
         self.add(CmdAllArmorSearch())
         self.add(CmdWorkArmor())
+        self.add(CmdMigrateStats())
         self.add(CmdCookieBomb())
         self.add(CmdStaffRole())
 
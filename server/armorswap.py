@@ -0,0 +1,113 @@
+"""
+Armor mode snapshots.
+
+Swapping armor used to copy a mode onto the character field by field:
+the stats, size, speed, strength, capabilities, weapons, primary and
+secondary each got their own Attribute write, and the weapon and
+capability lists were re-queried every time anything read them.
+
+Now a swap takes one snapshot of the mode - its packed stat block,
+the plain fields and the ids of its weapons and capabilities, all
+fetched up front with prefetch_related - and stores it in a single
+Attribute, db.activemode. The character caches the loaded snapshot in
+ndb with the weapon and capability objects already resolved, so the
+attack path never goes back to the armor tables.
+
+Usage:
+    armor = find_armor(caller, "Hover")
+    caller.activate_armor(armor)
+"""
+
+from server.statblock import pack_from_armor
+from world.armor.models import ArmorMode, Capability
+from world.combat.models import Weapon
+
+
+SWAP_MESSAGES = {
+    1: "{char} has activated their {name} mode!",
+    2: "{char} has swapped to their {name} stance!",
+    3: "{char} focuses their efforts, becoming {name} !",
+    4: "{char} changes forms, becoming their {name}!",
+    5: "{char} jacks in, activating {name}!",
+    6: "{char} summons {name} to assist!",
+    7: "{char} is playing as squadron {name}.",
+    8: "{char} activates their {name} system!",
+}
+# the generic '9' is currently a catch-all
+DEFAULT_SWAP_MESSAGE = "{char} activates their {name} armor!"
+
+
+def prefetched_armors():
+    '''
+    ArmorMode queryset with the weapon and capability lists pulled in
+    the same trip.
+    '''
+    return ArmorMode.objects.prefetch_related("db_weapons", "db_capabilities")
+
+
+def find_armor(char, name):
+    '''
+    find one of char's own armor modes by name, not case sensitive.
+    An exact name match wins over a partial one. Returns None if
+    there is no match.
+    '''
+    my_armors = char.get_all_armors() or []
+    armor_ids = [armor.id for armor in my_armors]
+    if not armor_ids:
+        return None
+    matches = list(prefetched_armors().filter(id__in=armor_ids, db_name__icontains=name))
+    if not matches:
+        return None
+    for armor in matches:
+        if armor.db_name.lower() == name.lower():
+            return armor
+    return matches[0]
+
+
+def snapshot_armor(armor):
+    '''
+    everything a swap needs from an armor mode, as plain values.
+    Weapons and capabilities are stored by id.
+    '''
+    return {
+        "id": armor.id,
+        "name": armor.db_name,
+        "swap": armor.db_swap,
+        "statblock": pack_from_armor(armor),
+        "size": armor.db_size,
+        "speed": armor.db_speed,
+        "strength": armor.db_strength,
+        "weapons": [weapon.id for weapon in armor.db_weapons.all()],
+        "capabilities": [cap.id for cap in armor.db_capabilities.all()],
+        "primary": armor.db_primary_id,
+        "secondary": armor.db_secondary_id,
+    }
+
+
+def _in_order(model, ids):
+    found = model.objects.in_bulk(ids)
+    return [found[i] for i in ids if i in found]
+
+
+def load_snapshot(snapshot):
+    '''
+    turn a stored snapshot back into a ready to use dict, with the
+    weapon and capability objects fetched in one query each.
+    '''
+    mode = dict(snapshot)
+    weapon_ids = list(snapshot["weapons"])
+    for key in ("primary", "secondary"):
+        if snapshot[key] and snapshot[key] not in weapon_ids:
+            weapon_ids.append(snapshot[key])
+    weapons = Weapon.objects.in_bulk(weapon_ids)
+    mode["weapons"] = [weapons[i] for i in snapshot["weapons"] if i in weapons]
+    mode["primary"] = weapons.get(snapshot["primary"])
+    mode["secondary"] = weapons.get(snapshot["secondary"])
+    mode["capabilities"] = _in_order(Capability, snapshot["capabilities"])
+    mode["statblock"] = list(snapshot["statblock"])
+    return mode
+
+
+def swap_message(char, mode):
+    template = SWAP_MESSAGES.get(mode["swap"], DEFAULT_SWAP_MESSAGE)
+    return template.format(char=char, name=mode["name"])
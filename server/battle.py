@@ -7,6 +7,10 @@ Just stubbing these things out.
 from datetime import datetime
 from world.combat.models import Weapon, WeaponClass, WeaponFlag
 from random import randint
+from server.combatstate import get_combatant
+from server.statblock import ATTACK_ROLLS, STATBLOCK_INDEX
+from server.dice import DICE, count_successes, dice_to_string, opposed_result
+from server.choices import WEAPON_CLASSES, ELEMENTS, WEAPON_FLAGS, element_mask
 from evennia.utils.utils import inherits_from
 from django.conf import settings
 
@@ -19,10 +23,7 @@ def do_roll(stat, skill):
 
     # pooling stat and skill, but saving old way just in case
     roll_val = stat + skill
-    roll = list(range(roll_val))
-    for i in range(0,roll_val):
-        random = randint(1,10)
-        roll[i] = random
+    roll = DICE.roll_dice(roll_val)
     '''
     stat_roll = list(range(stat))
     skill_roll = list(range(skill))
@@ -37,26 +38,11 @@ def do_roll(stat, skill):
     return roll
 
 def explode_tens(roll):
-    for value in roll:
-        if value == 10:
-            new_roll = randint(1,10)
-            roll.append(new_roll)
-            if new_roll == 10:
-                explode_tens(new_roll)
-    return roll
+    # each 10 rolls another die, batched per pass in the dice engine
+    return DICE.explode(roll)
 
 def roll_to_string(roll):
-    die_string = ""
-    for value in roll:
-        if value == 10:
-            die_string = die_string + "|g" + str(value) + "|n "
-            continue
-        if value >=7:
-            die_string = die_string + "|G" + str(value) + "|n "
-            continue
-        else:
-            die_string = die_string + "|R" + str(value)+ "|n "
-    return die_string
+    return dice_to_string(roll)
 
 def listcap_to_string(list):
     if len(list) == 0:
@@ -85,13 +71,13 @@ def check_valid_target(char):
         return True
     
 def check_not_ko(char):
-    if (char.db.hp > 0):
+    if (get_combatant(char).hp > 0):
         return True
     else:  
         return False
     
 def check_morale(char):
-    if (char.db.morale > 0):
+    if (get_combatant(char).morale > 0):
         return True
     else:
         return False
@@ -99,42 +85,23 @@ def check_morale(char):
 #check success of a normal roll.
 
 def check_successes(roll):
-    successes = 0
-    for value in roll:
-        if value >= 7:
-            successes = successes +1
-    return successes
+    return count_successes(roll)
+
+def roll_pools(sizes, explode=True):
+    '''
+    roll a pool for everyone at once, eg. a whole boss showdown.
+    returns PoolResults with dice, successes, crit and the colour string.
+    '''
+    return DICE.roll_pools(sizes, explode)
 
 #check success of opposed rolls, including dramatic/crits
 #this uses K&T values for now
 def check_opposed_rolls(roll1, roll2):
-    successes, failures = 0
-    crit = False
-    drama = False
-    for value in roll1:
-        if value >= 7:
-            successes = successes +1
-    for value in roll2:
-        if value >= 7:
-            failures = failures +1
-    if successes >= 5:
-        crit = True
-    if failures >= 5:
-        drama = True
+    successes = count_successes(roll1)
+    failures = count_successes(roll2)
 
     #process results on a scale of positive or negative
-
-    if successes == failures:
-        #this is a tie
-        return 0
-    if successes > failures and crit:
-        return 2
-    if successes > failures:
-        return 1
-    if failures > successes and drama:
-        return -2
-    if failures > successes:
-        return -1
+    return opposed_result(successes, failures)
 
 
 '''
@@ -148,56 +115,33 @@ def char_weakness(char):
     return weakness
 
 def char_resists(char):
-    resist = char.db.resist
+    resist = char.db.resistance
     return resist
 
+def check_elements(weapon, char):
+    '''
+    does this weapon hit the character's weakness, their resistance,
+    or both? Compares element bitmasks instead of element by element.
+    '''
+    elements = element_mask(weapon)
+    weak = bool(elements & ELEMENTS.mask([char_weakness(char)]))
+    resist = bool(elements & ELEMENTS.mask([char_resists(char)]))
+    return weak, resist
+
 def check_capabilities(char):
-    cap = char.db.capabilities
+    cap = char.get_capabilities()
     return cap
 
 def check_weapons(char):
-    weapon = char.db.weapons
+    weapon = char.get_weapons()
     return weapon
 
 def process_attack_class(type_string):
-    type_string = str(type_string)
-    type_string = type_string.upper()
-
-    val = 0
-    if type_string == "RANGED":
-        val = 1
-    elif type_string == "WAVE":
-        val = 2
-    elif type_string == "THROWN":
-        val = 3
-    elif type_string == "MELEE":
-        val = 4
-    elif type_string == "BLITZ":
-        val = 5
-    elif type_string == "SNEAK":
-        val = 6
-    elif type_string == "GRAPPLE":
-        val = 7
-    elif type_string == "SPELL":
-        val = 8
-    elif type_string == "WILL":
-        val = 9
-    elif type_string == "GADGET":
-        val = 10
-    elif type_string == "CHIP":
-        val = 11
-    elif type_string == "RANDOM":
-        val = 12
-   
     #nothing found? It will return 0, process as an error
-    return val
+    return WEAPON_CLASSES.value(type_string)
 
 def get_class_text(num):
-    if not num:
-        num == 0
-    num = int(num)
-    element_list = ["None", "Ranged", "Wave" , "Thrown", "Melee", "Blitz", "Sneak,", "Grapple", "Spell","Will", "Gadget", "Chip","Random"]
-    return element_list[num]
+    return WEAPON_CLASSES.text(num)
 
 
 def process_elements(type_string):
@@ -205,66 +149,11 @@ def process_elements(type_string):
     process to convert string to structured data to see what element was used
     
     '''
-    type_string = str(type_string)    
-    type_string = type_string.upper()
-
-    val = 0
-    if type_string == "SLASHING":
-        val = 1
-    elif type_string == "PIERCING":
-         val = 2
-    elif type_string == "ELECTRIC":
-        val = 3
-    elif type_string ==  "EXPLOSIVE" :
-        val = 4
-    elif type_string == "FIRE" :
-        val = 5
-    elif type_string == "GRAVITY" :
-        val = 6
-    elif type_string ==  "AIR" :
-        val = 7
-    elif type_string ==  "ICE" :
-        val = 8
-    elif type_string ==  "TOXIC" :
-        val = 9
-    elif type_string ==  "BLUNT" :
-        val = 10
-    elif type_string ==  "QUAKE" :
-        val = 11
-    elif type_string ==  "KARATE" :
-        val = 12
-    elif type_string ==  "SONIC" :
-        val = 13
-    elif type_string ==  "TIME":
-        val = 14
-    elif type_string ==  "WOOD" :
-        val = 15
-    elif type_string ==  "WATER" :
-        val = 16
-    elif type_string ==  "PLASMA" :
-        val = 17
-    elif type_string ==  "LASER" :
-        val = 18
-    elif type_string ==  "LIGHT" :
-        val = 19
-    elif type_string ==  "DARKNESS" :
-        val = 20
-    elif type_string ==  "PSYCHO" :
-        val = 21
-    elif type_string ==  "CHI" :
-        val = 22
-    elif type_string ==  "DISENCHANT":
-        val  = 23
-            
     #nothing found? It will return 0, process as an error
-    return val
+    return ELEMENTS.value(type_string)
 
 def get_element_text(num):
-    if not num:
-        num == 0
-    num = int(num)
-    element_list = ["None", "Slashing", "Piercing", "Electric", "Explosive", "Fire", "Gravity", "Air", "Ice", "Toxic", "Blunt", "Quake", "Karate", "Sonic", "Time", "Wood", "Water", "Plasma", "Laser", "Light", "Darkness", "Psycho", "Chi", "Disenchant"]
-    return element_list[num]
+    return ELEMENTS.text(num)
  
 def get_all_elements(weapon):
     elements_list = []
@@ -280,65 +169,27 @@ attack rolls
 '''
 
 def roll_attack(char, attack):
-    if attack.db_class == 1:
-        return char.db.dex, char.db.aim
-    if attack.db_class == 2:
-        return char.db.pow, char.db.force
-    if attack.db_class == 3:
-        return char.db.pow, char.db.aim
-    if attack.db_class == 4:
-        return char.db.dex, char.db.athletics
-    if attack.db_class == 5:
-        return char.db.dex, char.db.force
-    if attack.db_class == 6:
-        return char.db.dex, char.db.stealth
-    if attack.db_class == 7:
-        return char.db.pow, char.db.athletics
-    if attack.db_class == 8:
-        return char.db.aur, char.db.arcana
-    if attack.db_class == 9:
-        return char.db.aur, char.db.presence
-    if attack.db_class == 10:
-        return char.db.cun, char.db.mechanics
-    if attack.db_class == 11:
-        return char.db.cun, char.db.computer
     if attack.db_class == 12:
         return randint(1,10), randint(1,10)
+    # look up the stat and skill for this class in the character's stat block
+    rolls = ATTACK_ROLLS.get(attack.db_class)
+    if not rolls:
+        return None
+    block = char.get_statblock()
+    stat, skill = rolls
+    return block[stat], block[skill]
 
 
 def process_effects(type_string):
     '''
-    process to convert string to structured data to see what element was used
+    process to convert string to structured data to see what effect was used
     
     '''
-    type_string = str(type_string)    
-    type_string = type_string.upper()
-
-    val = 0
-    if type_string == "MEGABLAST":
-        val = 1
-    elif type_string == "EXCEED":
-         val = 2
-    elif type_string == "PRIORITY":
-        val = 3
-    elif type_string ==  "STABLE" :
-        val = 4
-    elif type_string == "BLIND" :
-        val = 5
-    elif type_string == "DEGRADE" :
-        val = 6
-    elif type_string == "ENTANGLE" :
-        val = 7
     #nothing found? It will return 0, process as an error
-    return val
+    return WEAPON_FLAGS.value(type_string)
 
 def get_effect_text(num):
-    if not num:
-        num == 0
-    num = int(num)
-    element_list = ["None", "Megablast", "Exceed", "Priority", "Stable", "Blind", "Degrade", "Entangle"]
-    string_value = str(element_list[num])
-    return string_value
+    return WEAPON_FLAGS.text(num)
 
 def get_all_flags(weapon):
     fx_list = []
@@ -350,8 +201,8 @@ def get_all_flags(weapon):
 
 def calc_damage(target,attacker):
     damage = randint(1,10)
-    target_defense = target.db.ten
-    attacker_dmg_bonus = attacker.db.pow
+    target_defense = target.get_statblock()[STATBLOCK_INDEX["ten"]]
+    attacker_dmg_bonus = attacker.get_statblock()[STATBLOCK_INDEX["pow"]]
     damage = damage - target_defense + attacker_dmg_bonus
     return damage
 
@@ -361,12 +212,12 @@ an attack does etc.
 '''
 
 def process_attack(target, attacker):
-    charge_val = attacker.db.chargedice
+    charge_val = get_combatant(attacker).chargedice
     if charge_val:
         damage = damage * 2
 
 def copy_attack(target, copier):
-    cap_list = copier.check_capabilities()
+    cap_list = check_capabilities(copier)
     copy_type = 0
     for cap in cap_list:
         if cap == "Weapon_copy":
@@ -391,20 +242,20 @@ def copy_attack(target, copier):
 
 
 def copy_melee_weapon(target):
-    weapon_list = target.check_weapons()
+    weapon_list = check_weapons(target)
     # by default, copy the primary weapon if no other selection is viable
-    copy_this = target.db.primary
+    copy_this = target.get_primary()
     # maybe only a primary has priority but I'll check all just in case
     for weapon in weapon_list:
         if weapon.db_flag_1 == 3 or weapon.db_flag_2 == 3:
             # a weapon has priority, so we're done, copy it
             copy_this = weapon
             return copy_this
-        if target.db.primary == weapon:
+        if target.get_primary() == weapon:
             if weapon.db_class >= 4 and weapon.db_class <= 7:
                 # weapon is fine, copy it
                 return copy_this
-        if target.db.secondary == weapon:
+        if target.get_secondary() == weapon:
             if weapon.db_class >= 4 and weapon.db_class <= 7:
                 return copy_this
     if not copy_this.db_class >= 4 and copy_this.db_class <=7:
@@ -417,20 +268,20 @@ def copy_melee_weapon(target):
 
 
 def copy_ranged_weapon(target, copier):
-    weapon_list = target.check_weapons()
+    weapon_list = check_weapons(target)
     # by default, copy the primary weapon if no other selection is viable
-    copy_this = target.db.primary
+    copy_this = target.get_primary()
     # maybe only a primary has priority but I'll check all just in case
     for weapon in weapon_list:
         if weapon.db_flag_1 == 3 or weapon.db_flag_2 == 3:
             # a weapon has priority, so we're done, copy it
             copy_this = weapon
             return copy_this
-        if target.db.primary == weapon:
+        if target.get_primary() == weapon:
             if weapon.db_class >= 1 and weapon.db_class <= 3:
                 # weapon is fine, copy it
                 return copy_this
-        if target.db.secondary == weapon:
+        if target.get_secondary() == weapon:
             if weapon.db_class >= 1 and weapon.db_class <= 3:
                 return copy_this
     if not copy_this.db_class >= 1 and copy_this.db_class <=3:
@@ -0,0 +1,136 @@
+"""
+New post notifications for bboards.
+
+Telling subscribers about a new post used to mean loading every
+subscriber, checking their access and reading their tags one at a time,
+whether they were logged in or not. Instead:
+
+    - each board's subscribers are read from the has_subscriber table
+      once and kept in memory with the board's group names, until
+      someone subscribes, unsubscribes or the board's groups change
+    - whether a subscriber can read the board and wants notices is
+      worked out the first time it's needed and kept as a flag
+    - a new post walks the connected sessions once and messages the
+      ones puppeting a subscriber with the flag set
+
+Offline subscribers aren't touched at all. They're told what they
+missed from the unread index when they next log in.
+
+Usage:
+    notify_new_post(board, post, caller)
+    forget_subscriber(char)
+"""
+
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from world.boards.models import BulletinBoard
+from server.bbunread import unread_counts
+
+
+# characters with this tag don't get told about new posts
+QUIET_TAG = "no_post_notifications"
+
+_REGISTRY = {}
+
+
+def can_read(char, group_names):
+    '''
+    boards with no groups are open to everyone, otherwise char needs
+    to be in one of them.
+    '''
+    if not group_names:
+        return True
+    return any(name in group_names for name in char.db.pcgroups or ())
+
+
+class BoardSubscribers(object):
+    """
+    Who is subscribed to one board and which of them get notices.
+    """
+
+    def __init__(self, board_id, subscriber_ids, group_names):
+        self.board_id = board_id
+        self.subscribers = frozenset(subscriber_ids)
+        self.group_names = frozenset(group_names)
+        self.flags = {}
+
+    def __contains__(self, char_id):
+        return char_id in self.subscribers
+
+    def wants_notice(self, char):
+        flag = self.flags.get(char.id)
+        if flag is None:
+            flag = (can_read(char, self.group_names)
+                    and not char.tags.has(QUIET_TAG)
+                    and not (hasattr(char, "is_guest") and char.is_guest()))
+            self.flags[char.id] = flag
+        return flag
+
+
+def get_subscribers(board):
+    subs = _REGISTRY.get(board.id)
+    if subs is None:
+        subscriber_ids = board.has_subscriber.through.objects.filter(
+            bulletinboard_id=board.id).values_list("objectdb_id", flat=True)
+        group_names = board.db_groups.values_list("db_name", flat=True)
+        subs = BoardSubscribers(board.id, subscriber_ids, group_names)
+        _REGISTRY[board.id] = subs
+    return subs
+
+
+def forget_subscriber(char):
+    '''
+    call when char's groups or notification setting change.
+    '''
+    for subs in _REGISTRY.values():
+        subs.flags.pop(char.id, None)
+
+
+def notify_new_post(board, post, poster=None):
+    '''
+    tell the online subscribers of board about post, in one pass over
+    the connected sessions. Returns the number of sessions told.
+    '''
+    from evennia.server.sessionhandler import SESSION_HANDLER
+
+    subs = get_subscribers(board)
+    if not subs.subscribers:
+        return 0
+    notice = "|wNew post on {0} by {1}:|n {2}\nUse |wbbread {3}/{4}|n to read it.".format(
+        board.db_name, post.posted_by, post.db_title, board.id, post.db_seq)
+    poster_id = poster.id if poster else None
+    sent = 0
+    for session in SESSION_HANDLER.get_sessions():
+        char = session.puppet
+        if not char or char.id == poster_id or char.id not in subs:
+            continue
+        if subs.wants_notice(char):
+            session.msg(notice)
+            sent += 1
+    return sent
+
+
+def announce_unread_boards(char):
+    '''
+    at login, tell char which of their boards have posts they missed.
+    '''
+    counts = unread_counts(char)
+    if not counts:
+        return
+    boards = BulletinBoard.objects.filter(has_subscriber=char, id__in=list(counts))
+    missed = ["%s (%s)" % (board.db_name, counts[board.id]) for board in boards]
+    if missed:
+        char.msg("|wNew bboard posts in:|n " + ", ".join(missed))
+
+
+@receiver(m2m_changed, sender=BulletinBoard.has_subscriber.through)
+@receiver(m2m_changed, sender=BulletinBoard.db_groups.through)
+def _subscribers_changed(sender, instance, action, reverse, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if reverse:
+        # changed from the character or group side, any board could be affected
+        _REGISTRY.clear()
+    else:
+        _REGISTRY.pop(instance.id, None)
@@ -0,0 +1,94 @@
+"""
+Bboard timeouts and archiving.
+
+Every board has a timeout in days, but nothing ever enforced it, so
+every listing and unread count had to wade through every post ever
+made. The daily sweep (DailyEvents.clean_bboards) now:
+
+    - archives posts older than their board's timeout, with one
+      UPDATE per BB_SWEEP_CHUNK posts rather than a save per post.
+      Pinned posts and boards with a timeout of 0 are left alone.
+    - if BBOARD_COLD_STORAGE is on, moves the body of each archived
+      post into a zlib-compressed BoardPostArchive row and empties
+      body_text, a chunk at a time
+
+Archived posts drop out of listings and unread counts but keep their
+post numbers, so bbread <board>/<number> still finds them. Use
+post_body() to read a post's text wherever it's stored.
+
+Usage:
+    archive_expired_posts()
+    freeze_archived_bodies()
+"""
+
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from world.boards.models import BulletinBoard, BoardPost, BoardPostArchive
+from server.bbunread import posts_changed
+
+
+BB_SWEEP_CHUNK = 500
+BBOARD_COLD_STORAGE = getattr(settings, "BBOARD_COLD_STORAGE", True)
+
+
+def archive_expired_posts(now=None, chunk=BB_SWEEP_CHUNK):
+    '''
+    archive every post past its board's timeout. Returns how many.
+    '''
+    now = now or timezone.now()
+    total = 0
+    for board_id, timeout in BulletinBoard.objects.filter(
+            db_timeout__gt=0).values_list("id", "db_timeout"):
+        expired = BoardPost.objects.filter(
+            db_board_id=board_id, is_archived=False, is_pinned=False,
+            db_date_created__lt=now - timedelta(days=timeout))
+        while True:
+            ids = list(expired.values_list("id", flat=True)[:chunk])
+            if not ids:
+                break
+            total += BoardPost.objects.filter(id__in=ids).update(is_archived=True)
+    if total:
+        posts_changed()
+    return total
+
+
+def freeze_archived_bodies(chunk=BB_SWEEP_CHUNK):
+    '''
+    move archived post bodies into compressed cold storage. Returns how many.
+    '''
+    total = 0
+    pending = BoardPost.objects.filter(is_archived=True, cold__isnull=True)
+    while True:
+        rows = list(pending.values_list("id", "body_text")[:chunk])
+        if not rows:
+            break
+        with transaction.atomic():
+            BoardPostArchive.objects.bulk_create(
+                [BoardPostArchive(post_id=post_id, body=zlib.compress(text.encode("utf-8")))
+                 for post_id, text in rows])
+            BoardPost.objects.filter(id__in=[post_id for post_id, text in rows]).update(body_text="")
+        total += len(rows)
+    return total
+
+
+def post_body(post):
+    '''
+    the text of post, from cold storage if it has been moved there.
+    '''
+    if post.body_text or not post.is_archived:
+        return post.body_text
+    try:
+        return zlib.decompress(bytes(post.cold.body)).decode("utf-8")
+    except BoardPostArchive.DoesNotExist:
+        return post.body_text
+
+
+def sweep_bboards():
+    archived = archive_expired_posts()
+    frozen = freeze_archived_bodies() if BBOARD_COLD_STORAGE else 0
+    return archived, frozen
@@ -0,0 +1,97 @@
+"""
+Unread bboard posts.
+
+Unread counts used to load every BoardPost on the game and run
+read_by.all() for each one to see if the caller was in it, once per
+board, every time +bbread or +bbnew listed anything. Instead:
+
+    - whether a post is unread is an Exists() subquery against the
+      read_by table, so the database answers it for a whole board in
+      the same query that lists the posts
+    - the unread count for every board comes back in one grouped query
+    - each reader's counts are cached in ndb, tagged with a post
+      generation that goes up whenever any post is made, deleted or archived,
+      and dropped whenever the reader marks something read
+
+Usage:
+    counts = unread_counts(caller)
+    posts = with_read_flag(board_posts, caller)
+    mark_read(caller, post)
+"""
+
+from django.db.models import Count, Exists, OuterRef
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from world.boards.models import BoardPost
+
+
+# bumped whenever a post is made or deleted, see the signal handlers
+_GENERATION = [0]
+
+
+def read_by_reader(reader):
+    '''
+    an Exists() that is true for posts reader has read, for annotate/filter.
+    '''
+    return Exists(BoardPost.read_by.through.objects.filter(
+        boardpost_id=OuterRef("pk"), objectdb_id=reader.id))
+
+
+def unread_posts(reader, board=None):
+    '''
+    posts reader hasn't read, oldest first, on one board or all of them.
+    '''
+    posts = BoardPost.objects.filter(~read_by_reader(reader), is_archived=False)
+    if board is not None:
+        posts = posts.filter(db_board=board)
+    return posts.order_by("db_date_created", "id")
+
+
+def with_read_flag(posts, reader):
+    # every post gets an is_read flag from the same query
+    return posts.annotate(is_read=read_by_reader(reader))
+
+
+def unread_counts(reader):
+    '''
+    {board id: unread posts} for every board with anything unread.
+    '''
+    cached = reader.ndb.bb_unread
+    if cached and cached[0] == _GENERATION[0]:
+        return cached[1]
+    rows = (BoardPost.objects.filter(~read_by_reader(reader), is_archived=False)
+            .values("db_board_id").annotate(unread=Count("id")).order_by())
+    counts = {row["db_board_id"]: row["unread"] for row in rows}
+    reader.ndb.bb_unread = (_GENERATION[0], counts)
+    return counts
+
+
+def forget_unread(reader):
+    reader.ndb.bb_unread = None
+
+
+def mark_read(reader, *posts):
+    '''
+    mark posts read by reader in one insert.
+    '''
+    if not posts:
+        return
+    through = BoardPost.read_by.through
+    through.objects.bulk_create(
+        [through(boardpost_id=post.id, objectdb_id=reader.id) for post in posts],
+        ignore_conflicts=True,
+    )
+    forget_unread(reader)
+
+
+def posts_changed():
+    # for bulk updates that don't send signals, like the archive sweep
+    _GENERATION[0] += 1
+
+
+@receiver(post_save, sender=BoardPost)
+@receiver(post_delete, sender=BoardPost)
+def _post_changed(sender, instance, **kwargs):
+    if kwargs.get("created", True):
+        posts_changed()
@@ -0,0 +1,78 @@
+"""
+Lookup tables for the weapon choice fields.
+
+The names and numbers for weapon classes, elements and flags are
+declared once, as TYPE_CHOICES on the models in world/combat/models.py.
+Everything here is built from those at import time into read-only
+dicts, so turning "Fire" into 5 or 5 into "Fire" is a single dict
+lookup instead of an if/elif chain.
+
+Elements can also be packed into a bitmask, one bit per element, so
+comparing a weapon's elements to a weakness is one & operation.
+
+Usage:
+    ELEMENTS.value("fire")        # 5
+    ELEMENTS.text(5)              # "Fire"
+    ELEMENTS.mask([5, 8])         # bits 5 and 8 set
+"""
+
+from types import MappingProxyType
+
+from world.combat.models import WeaponClass, ElementalType, WeaponFlag
+
+
+class ChoiceRegistry(object):
+    """
+    Both directions of one TYPE_CHOICES tuple, frozen.
+    """
+
+    def __init__(self, choices):
+        self.choices = tuple(choices)
+        self.by_value = MappingProxyType({value: label for value, label in self.choices})
+        self.by_name = MappingProxyType({label.upper(): value for value, label in self.choices})
+
+    def value(self, name):
+        '''
+        the number for a name, not case sensitive.
+        Nothing found returns 0, process as an error.
+        '''
+        return self.by_name.get(str(name).strip().upper(), 0)
+
+    def to_value(self, value):
+        '''
+        a number from either a number, a number in a string or a
+        name. Used for fields that have been stored both ways.
+        '''
+        if not value:
+            return 0
+        if isinstance(value, int):
+            return value if value in self.by_value else 0
+        value = str(value).strip()
+        if value.isdigit():
+            return self.to_value(int(value))
+        return self.value(value)
+
+    def text(self, value):
+        if not value:
+            return "None"
+        return self.by_value.get(int(value), "None")
+
+    def mask(self, values):
+        bits = 0
+        for value in values:
+            value = self.to_value(value)
+            if value:
+                bits |= 1 << value
+        return bits
+
+    def unmask(self, bits):
+        return tuple(value for value in self.by_value if bits & (1 << value))
+
+
+WEAPON_CLASSES = ChoiceRegistry(WeaponClass.TYPE_CHOICES)
+ELEMENTS = ChoiceRegistry(ElementalType.TYPE_CHOICES)
+WEAPON_FLAGS = ChoiceRegistry(WeaponFlag.TYPE_CHOICES)
+
+
+def element_mask(weapon):
+    return ELEMENTS.mask((weapon.db_type_1, weapon.db_type_2, weapon.db_type_3))
@@ -0,0 +1,174 @@
+"""
+In-memory combat state for showdowns.
+
+Every combat field on a character (hp, morale, aim and charge dice,
+guard and so on) used to be its own Attribute, so a single attack read
+and wrote around ten rows. Instead each room in a fight keeps a
+CombatState in ndb holding one slotted Combatant record per character.
+Commands read and change those records directly, and the changed ones
+are written back to the characters with one batch_add each when the
+showdown ends, when a character leaves the room, or at a periodic
+checkpoint so a crash only loses the last minute of a fight. Outside a
+showdown nothing is kept: records are read fresh and written straight
+back.
+
+Usage:
+    combatant = get_combatant(char)
+    if combatant.hp > 0:
+        combatant.hp -= damage
+        mark_dirty(char)
+"""
+
+import time
+
+
+# the character attributes that live in the combat state
+COMBAT_FIELDS = ("hp", "morale", "aimdice", "chargedice", "bonusdice",
+                 "defending", "reckless", "incombat", "boss")
+
+COMBAT_DEFAULTS = {
+    "hp": 60,
+    "morale": 70,
+    "aimdice": 0,
+    "chargedice": 0,
+    "bonusdice": 0,
+    "defending": 0,
+    "reckless": False,
+    "incombat": False,
+    "boss": False,
+}
+
+# seconds between checkpoints of a live fight
+CHECKPOINT_INTERVAL = 60
+
+# every live CombatState, keyed by room id, so they can all be flushed at shutdown
+_ACTIVE_STATES = {}
+
+
+class Combatant(object):
+    """
+    One character's combat fields, held in memory.
+    """
+
+    __slots__ = ("char",) + COMBAT_FIELDS
+
+    def __init__(self, char):
+        self.char = char
+        # one get per field, older characters can be missing some of them
+        for field in COMBAT_FIELDS:
+            value = char.attributes.get(field)
+            if value is None:
+                value = COMBAT_DEFAULTS[field]
+            setattr(self, field, value)
+
+    def as_pairs(self):
+        return [(field, getattr(self, field)) for field in COMBAT_FIELDS]
+
+
+class CombatState(object):
+    """
+    The combat records for everyone fighting in one room.
+    """
+
+    def __init__(self, room):
+        self.room = room
+        self.combatants = {}
+        self.dirty = set()
+        self.last_checkpoint = time.time()
+
+    def in_showdown(self):
+        return bool(self.room and self.room.db.combat)
+
+    def get(self, char):
+        # records are only kept between commands while a showdown is on,
+        # otherwise they're read fresh so edits to db.hp etc. show up
+        combatant = self.combatants.get(char.id)
+        if not combatant or (char.id not in self.dirty and not self.in_showdown()):
+            combatant = Combatant(char)
+            self.combatants[char.id] = combatant
+        return combatant
+
+    def mark_dirty(self, char):
+        self.dirty.add(char.id)
+        if not self.in_showdown():
+            # no showdown to flush it later, write it now
+            self.release(char)
+        elif time.time() - self.last_checkpoint > CHECKPOINT_INTERVAL:
+            self.flush()
+
+    def reset(self, char, hp, morale):
+        combatant = self.get(char)
+        combatant.hp = hp
+        combatant.morale = morale
+        combatant.aimdice = 0
+        combatant.defending = 0
+        combatant.chargedice = 0
+        combatant.bonusdice = 0
+        combatant.boss = False
+        self.mark_dirty(char)
+        return combatant
+
+    def flush(self):
+        '''
+        write every changed record back to its character, one
+        batch per character.
+        '''
+        for char_id in self.dirty:
+            combatant = self.combatants.get(char_id)
+            if combatant:
+                combatant.char.attributes.batch_add(*combatant.as_pairs())
+        self.dirty = set()
+        self.last_checkpoint = time.time()
+
+    def release(self, char):
+        '''
+        flush and forget one character, eg. when they leave the room.
+        '''
+        if char.id in self.dirty:
+            combatant = self.combatants[char.id]
+            char.attributes.batch_add(*combatant.as_pairs())
+            self.dirty.discard(char.id)
+        self.combatants.pop(char.id, None)
+
+    def end(self):
+        self.flush()
+        self.combatants = {}
+        room_id = self.room.id if self.room else None
+        _ACTIVE_STATES.pop(room_id, None)
+        if self.room:
+            self.room.ndb.combat_state = None
+
+
+def get_combat_state(room, create=True):
+    '''
+    get the CombatState held in a room's ndb, making one if needed.
+    '''
+    state = room.ndb.combat_state if room else _ACTIVE_STATES.get(None)
+    if not state and create:
+        state = CombatState(room)
+        if room:
+            room.ndb.combat_state = state
+        _ACTIVE_STATES[room.id if room else None] = state
+    return state
+
+
+def get_combatant(char):
+    return get_combat_state(char.location).get(char)
+
+
+def mark_dirty(char):
+    get_combat_state(char.location).mark_dirty(char)
+
+
+def release_combatant(char, room):
+    state = get_combat_state(room, create=False)
+    if state:
+        state.release(char)
+
+
+def flush_all_combat_states():
+    '''
+    checkpoint every fight on the server. Called when the server stops.
+    '''
+    for state in list(_ACTIVE_STATES.values()):
+        state.flush()
@@ -30,7 +30,11 @@ def at_server_start():
     This is called every time the server starts up, regardless of
     how it was shut down.
     """
-    pass
+    from server.odds import build_odds_tables
+    # importing the weapon lookups hooks up their save/delete signals
+    import server.weapons
+
+    build_odds_tables()
 
 
 def at_server_stop():
@@ -38,7 +42,13 @@ def at_server_stop():
     This is called just before the server is shut down, regardless
     of it is for a reload, reset or shutdown.
     """
-    pass
+    from server.combatstate import flush_all_combat_states
+    from server.scenelog import flush_all_scene_logs
+    from server.radio import flush_radio_logs
+
+    flush_all_combat_states()
+    flush_all_scene_logs()
+    flush_radio_logs()
 
 
 def at_server_reload_start():
@@ -52,7 +62,9 @@ def at_server_reload_stop():
     """
     This is called only time the server stops before a reload.
     """
-    pass
+    from server.posehistory import checkpoint_pose_histories
+
+    checkpoint_pose_histories()
 
 
 def at_server_cold_start():
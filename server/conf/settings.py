@@ -75,6 +75,12 @@ ADDITIONAL_ANSI_MAPPINGS = [
 COMMAND_DEFAULT_ARG_REGEX = r"^[ /]+.*$|$"
 
 MAX_CHAR_LIMIT = 8000
+# how many recent poses each room keeps for +pot/last and +pot/since,
+# and whether they're saved across a reload
+POSE_HISTORY_SIZE = 40
+POSE_HISTORY_CHECKPOINT = True
+# move the bodies of timed out bboard posts into compressed storage
+BBOARD_COLD_STORAGE = True
 TIME_ZONE = "America/New_York"
 MULTISESSION_MODE = 3
 
@@ -104,6 +110,24 @@ GLOBAL_SCRIPTS = {
         "interval": 3600 * 24 * 7,
         "desc": "Cookies and Jobs"
     },
+    "scene_log_writer": {
+        "typeclass": "typeclasses.scripts.SceneLogScript",
+        "repeats": -1,
+        "interval": 15,
+        "desc": "Buffered scene logs"
+    },
+    "radio_log_writer": {
+        "typeclass": "typeclasses.scripts.RadioLogScript",
+        "repeats": -1,
+        "interval": 30,
+        "desc": "Buffered radio recall"
+    },
+    "daily_events": {
+        "typeclass": "typeclasses.scripts.DailyEvents",
+        "repeats": -1,
+        "interval": 3600 * 24,
+        "desc": "Board timeouts"
+    },
 }
 
 
@@ -144,7 +168,8 @@ INSTALLED_APPS +=  ["world.roster",
                     "world.msgs",
                     "world.scenes",
                     "world.requests",
-                    "world.files"
+                    "world.files",
+                    "world.radio"
                     ]
 
 
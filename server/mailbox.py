@@ -0,0 +1,208 @@
+"""
+@mail inboxes.
+
+Listing @mail used to pull the whole inbox, then for every message run
+one query for its status tag and more for its senders, and reading or
+deleting mail number N counted and indexed into the whole inbox again
+on every access. Instead:
+
+    - the inbox is listed a page (MAIL_PAGE_SIZE) at a time, with each
+      message's status tag fetched by a subquery and the senders
+      prefetched, so a page costs the same however big the inbox is
+    - mail N is a single LIMIT 1 lookup
+    - each mailbox owner keeps its unread count in an Attribute, bumped
+      when mail is sent to it and lowered when it's read or deleted,
+      so the login notice doesn't have to count anything. If the
+      Attribute is missing it's rebuilt with one COUNT.
+
+Sending went through create_message and tags.add once per recipient,
+several queries each. send_mail_bulk still gives every recipient their
+own copy, so they can delete and tag it separately, but creates all the
+copies, their sender and receiver links and their "new" tags with one
+bulk_create each in a single transaction. Online recipients are told
+in one pass over the connected sessions. Groups and roster casts can be
+mailed as a whole, see group_mail_targets.
+
+Usage:
+    messages, first = inbox_page(caller, page)
+    message = mail_at(caller, 3)
+    mark_mail_read(caller, message)
+    send_mail_bulk(caller, recipients, subject, text)
+"""
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Subquery
+from evennia.accounts.models import AccountDB
+from evennia.comms.models import Msg
+from evennia.typeclasses.tags import Tag
+from evennia.utils import inherits_from
+
+
+MAIL_PAGE_SIZE = 20
+MAIL_UNREAD_ATTRIBUTE = "mail_unread"
+
+SENDER_PREFETCH = ("db_sender_accounts", "db_sender_objects", "db_sender_scripts")
+
+
+def _mail_tags(key=None):
+    tags = Msg.db_tags.through.objects.filter(msg_id=OuterRef("pk"), tag__db_category="mail")
+    if key:
+        tags = tags.filter(tag__db_key=key)
+    return tags
+
+
+def is_account(owner):
+    return inherits_from(owner, "evennia.accounts.accounts.DefaultAccount")
+
+
+def mailbox(owner):
+    '''
+    every mail to owner (an Account or a Character), oldest first.
+    Mail numbers are positions in this.
+    '''
+    if is_account(owner):
+        received = Msg.objects.filter(db_receivers_accounts=owner)
+    else:
+        received = Msg.objects.filter(db_receivers_objects=owner)
+    return received.filter(Exists(_mail_tags())).order_by("db_date_created", "id")
+
+
+def mail_page_count(owner, size=MAIL_PAGE_SIZE):
+    return max(1, (mailbox(owner).count() + size - 1) // size)
+
+
+def inbox_page(owner, page=1, size=MAIL_PAGE_SIZE):
+    '''
+    one page of owner's mail, each with a .status from its latest mail
+    tag. Returns (messages, number of the first one).
+    '''
+    start = (max(1, page) - 1) * size
+    messages = (mailbox(owner)
+                .annotate(status=Subquery(_mail_tags().order_by("-id").values("tag__db_key")[:1]))
+                .prefetch_related(*SENDER_PREFETCH))
+    return list(messages[start:start + size]), start + 1
+
+
+def mail_at(owner, number):
+    '''
+    owner's mail numbered number, or None.
+    '''
+    if number < 1:
+        return None
+    found = list(mailbox(owner).prefetch_related(*SENDER_PREFETCH)[number - 1:number])
+    return found[0] if found else None
+
+
+def unread_mail_count(owner):
+    count = owner.attributes.get(MAIL_UNREAD_ATTRIBUTE)
+    if count is None:
+        count = mailbox(owner).filter(Exists(_mail_tags("new"))).count()
+        owner.attributes.add(MAIL_UNREAD_ATTRIBUTE, count)
+    return count
+
+
+def _adjust_unread(owner, change):
+    # a missing count is rebuilt when it's next read, so leave it missing
+    count = owner.attributes.get(MAIL_UNREAD_ATTRIBUTE)
+    if count is not None:
+        owner.attributes.add(MAIL_UNREAD_ATTRIBUTE, max(0, count + change))
+
+
+def note_mail_sent(recipient):
+    _adjust_unread(recipient, 1)
+
+
+def mark_mail_read(owner, message, status="-"):
+    '''
+    swap message's "new" tag for status, and lower owner's unread count
+    if it was new.
+    '''
+    if message.tags.has("new", category="mail"):
+        message.tags.remove("new", category="mail")
+        _adjust_unread(owner, -1)
+    message.tags.add(status, category="mail")
+
+
+def delete_mail(owner, message):
+    if message.tags.has("new", category="mail"):
+        _adjust_unread(owner, -1)
+    message.delete()
+
+
+def announce_unread_mail(owner):
+    count = unread_mail_count(owner)
+    if count:
+        owner.msg("You have |w%s|n unread @mail message%s." % (count, "" if count == 1 else "s"))
+
+
+def _mail_tag(key):
+    # the shared Tag row the tag handler would use for this mail tag
+    tag = Tag.objects.filter(db_key=key, db_category="mail", db_model="msg",
+                             db_tagtype=None).first()
+    if not tag:
+        tag = Tag.objects.create(db_key=key, db_category="mail", db_model="msg", db_tagtype=None)
+    return tag
+
+
+def send_mail_bulk(sender, recipients, subject, message):
+    '''
+    send one copy of a mail to each recipient, all Accounts or all
+    Characters. Returns the recipients it went to.
+    '''
+    recipients = list({recipient.id: recipient for recipient in recipients}.values())
+    if not recipients:
+        return []
+    to_accounts = is_account(recipients[0])
+    with transaction.atomic():
+        copies = Msg.objects.bulk_create(
+            [Msg(db_header=subject, db_message=message) for _ in recipients])
+        if is_account(sender):
+            senders = Msg.db_sender_accounts.through
+            senders.objects.bulk_create(
+                [senders(msg_id=copy.id, accountdb_id=sender.id) for copy in copies])
+        else:
+            senders = Msg.db_sender_objects.through
+            senders.objects.bulk_create(
+                [senders(msg_id=copy.id, objectdb_id=sender.id) for copy in copies])
+        if to_accounts:
+            receivers = Msg.db_receivers_accounts.through
+            receivers.objects.bulk_create(
+                [receivers(msg_id=copy.id, accountdb_id=recipient.id)
+                 for copy, recipient in zip(copies, recipients)])
+        else:
+            receivers = Msg.db_receivers_objects.through
+            receivers.objects.bulk_create(
+                [receivers(msg_id=copy.id, objectdb_id=recipient.id)
+                 for copy, recipient in zip(copies, recipients)])
+        new_tag = _mail_tag("new")
+        tags = Msg.db_tags.through
+        tags.objects.bulk_create([tags(msg_id=copy.id, tag_id=new_tag.id) for copy in copies])
+    for recipient in recipients:
+        note_mail_sent(recipient)
+    notify_mail(sender, recipients, to_accounts)
+    return recipients
+
+
+def notify_mail(sender, recipients, to_accounts):
+    '''
+    tell the online recipients they have mail, in one pass over the sessions.
+    '''
+    from evennia.server.sessionhandler import SESSION_HANDLER
+
+    recipient_ids = {recipient.id for recipient in recipients}
+    notice = "You have received a new @mail from %s" % sender
+    for session in SESSION_HANDLER.get_sessions():
+        owner = session.get_account() if to_accounts else session.puppet
+        if owner and owner.id in recipient_ids:
+            session.msg(notice)
+
+
+def group_mail_targets(members, accounts=True):
+    '''
+    the Accounts (or Characters) to mail for a group's member characters,
+    e.g. a PlayerGroup's or GameRoster's db_members.
+    '''
+    if not accounts:
+        return list(members.all())
+    account_ids = members.exclude(db_account=None).values_list("db_account_id", flat=True)
+    return list(AccountDB.objects.filter(id__in=list(account_ids)))
@@ -0,0 +1,166 @@
+"""
+Precomputed odds for opposed rolls.
+
+Every (attack pool, defense pool) pair up to the stat caps has an
+exact outcome distribution worked out once and then looked up, so
+attack previews and balance tooling don't have to roll anything.
+Tables are built lazily and memoized; build_odds_tables() warms the
+opposed tables at server start.
+
+The opposed outcomes are scored with the same opposed_result() that
+check_opposed_rolls uses, so the tables always agree with the dice.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+
+from server.dice import CRIT_THRESHOLD, opposed_result
+
+
+STAT_CAP = 10
+SKILL_CAP = 5
+# guard doubles tenacity, so the biggest pool is a doubled stat plus a skill
+MAX_POOL = STAT_CAP * 2 + SKILL_CAP
+
+# exploding pools can in theory succeed forever; anything past this
+# is folded into the last bucket. The leftover mass is far below 1e-12.
+MAX_SUCCESSES = MAX_POOL * 3
+
+# a plain die succeeds on 7-9, a ten succeeds and explodes
+P_FAIL = 0.6
+P_SUCCESS = 0.3
+P_TEN = 0.1
+
+Odds = namedtuple("Odds", ["crit", "hit", "tie", "miss", "drama"])
+
+
+def _convolve(first, second, limit=None):
+    out = [0.0] * (len(first) + len(second) - 1)
+    for i, p in enumerate(first):
+        if not p:
+            continue
+        for j, q in enumerate(second):
+            out[i + j] += p * q
+    if limit is not None and len(out) > limit + 1:
+        out[limit] = sum(out[limit:])
+        del out[limit + 1:]
+    return out
+
+
+@lru_cache(maxsize=None)
+def _single_die(explode):
+    '''
+    success distribution for one die, index is number of successes
+    '''
+    if not explode:
+        return (P_FAIL, P_SUCCESS + P_TEN)
+    # a ten is worth one success plus whatever the next die is worth
+    dist = [0.0] * (MAX_SUCCESSES + 1)
+    dist[0] = P_FAIL
+    chain = 1.0
+    for k in range(1, MAX_SUCCESSES + 1):
+        # k-1 tens in a row, then a 7-9 or a ten that stops at a failure
+        dist[k] = chain * (P_SUCCESS + P_TEN * P_FAIL)
+        chain *= P_TEN
+    dist[MAX_SUCCESSES] += chain
+    return tuple(dist)
+
+
+@lru_cache(maxsize=None)
+def success_distribution(pool, explode=False):
+    '''
+    chance of each number of successes on a pool of d10s.
+    Returns a tuple indexed by success count.
+    '''
+    if pool <= 0:
+        return (1.0,)
+    smaller = success_distribution(pool - 1, explode)
+    return tuple(_convolve(smaller, _single_die(explode), MAX_SUCCESSES))
+
+
+@lru_cache(maxsize=None)
+def opposed_odds(attack_pool, defense_pool, explode=False):
+    '''
+    chance of each opposed result for an attack pool against a
+    defense pool. Returns Odds(crit, hit, tie, miss, drama).
+    '''
+    attack = success_distribution(attack_pool, explode)
+    defense = success_distribution(defense_pool, explode)
+
+    # below[n] is the chance the defense rolls fewer than n successes
+    below = [0.0]
+    for q in defense:
+        below.append(below[-1] + q)
+    total = below[-1]
+
+    def defense_below(n):
+        return below[min(n, len(defense))]
+
+    totals = {2: 0.0, 1: 0.0, 0: 0.0, -1: 0.0, -2: 0.0}
+    for successes, p in enumerate(attack):
+        if not p:
+            continue
+        if successes < len(defense):
+            totals[0] += p * defense[successes]
+        # the attacker wins on any defense roll below their own
+        totals[opposed_result(successes, 0)] += p * defense_below(successes)
+        # the defender wins on anything higher, a drama once they reach the threshold
+        losing = total - defense_below(successes + 1)
+        drama = total - defense_below(max(successes + 1, CRIT_THRESHOLD))
+        totals[-2] += p * drama
+        totals[-1] += p * (losing - drama)
+    return Odds(totals[2], totals[1], totals[0], totals[-1], totals[-2])
+
+
+@lru_cache(maxsize=None)
+def sum_distribution(pool):
+    '''
+    chance of each total on a pool of d10s, no exploding.
+    index is the total.
+    '''
+    if pool <= 0:
+        return (1.0,)
+    die = [0.0] + [0.1] * 10
+    return tuple(_convolve(sum_distribution(pool - 1), die))
+
+
+@lru_cache(maxsize=None)
+def damage_distribution(attack_pool, defense_pool):
+    '''
+    chance of each raw damage value, before crit and resist factors.
+    Damage is the attack dice total minus the defense dice total,
+    and can't go below zero.
+    '''
+    attack = sum_distribution(attack_pool)
+    defense = sum_distribution(defense_pool)
+    damage = [0.0] * len(attack)
+    for a_total, p in enumerate(attack):
+        if not p:
+            continue
+        for d_total, q in enumerate(defense):
+            if not q:
+                continue
+            damage[max(a_total - d_total, 0)] += p * q
+    return tuple(damage)
+
+
+@lru_cache(maxsize=None)
+def expected_damage(attack_pool, defense_pool):
+    dist = damage_distribution(attack_pool, defense_pool)
+    return sum(value * p for value, p in enumerate(dist))
+
+
+def crit_chance(pool, explode=False):
+    return sum(success_distribution(pool, explode)[CRIT_THRESHOLD:])
+
+
+def build_odds_tables():
+    '''
+    fill the opposed tables up to the caps. Called at server start so
+    the first attack of the day doesn't pay for it. Damage tables are
+    bigger and stay lazy.
+    '''
+    for explode in (False, True):
+        for attack_pool in range(MAX_POOL + 1):
+            for defense_pool in range(MAX_POOL + 1):
+                opposed_odds(attack_pool, defense_pool, explode)
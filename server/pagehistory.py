@@ -0,0 +1,68 @@
+"""
+Page history.
+
+page used to load every message an account had ever sent and every one
+it had ever received, add the two lists together, sort them in Python
+and keep the last few. Instead:
+
+    - the database merges sent and received pages with a UNION, orders
+      it by date and returns only the ids of the last N
+    - just those N messages are loaded, with their senders and
+      receivers prefetched
+    - the last page an account sent is kept in ndb when they send it,
+      so page/last and paging the same people again don't look at the
+      history at all. After a reload it's one LIMIT 1 query.
+
+Usage:
+    for page in page_history(caller, 5):
+        ...
+    last = last_paged(caller)
+"""
+
+from django.db.models import Q
+from evennia.comms.models import Msg
+
+
+# what Msg.senders and Msg.receivers read
+PAGE_PREFETCH = (
+    "db_sender_accounts", "db_sender_objects", "db_sender_scripts",
+    "db_receivers_accounts", "db_receivers_objects", "db_receivers_scripts",
+)
+
+
+def page_filter():
+    # messages tagged as pages, or not tagged at all (legacy pages)
+    return (Q(db_tags__db_key__iexact="page", db_tags__db_category__iexact="comms")
+            | Q(db_tags__isnull=True))
+
+
+def page_history(account, number=5):
+    '''
+    the last number pages account sent or got, oldest first.
+    '''
+    sent = (Msg.objects.filter(db_sender_accounts=account).filter(page_filter())
+            .values("id", "db_date_created"))
+    got = (Msg.objects.filter(db_receivers_accounts=account).filter(page_filter())
+           .values("id", "db_date_created"))
+    latest = sent.union(got).order_by("-db_date_created")[:number]
+    pages = (Msg.objects.filter(id__in=[row["id"] for row in latest])
+             .order_by("db_date_created", "id").prefetch_related(*PAGE_PREFETCH))
+    # we need to default to True to allow for legacy pages
+    return [page for page in pages if page.access(account, "read", default=True)]
+
+
+def last_paged(account):
+    '''
+    the last page account sent, or None.
+    '''
+    page = account.ndb.last_paged
+    if page is None:
+        page = (Msg.objects.filter(db_sender_accounts=account).filter(page_filter())
+                .order_by("-db_date_created").prefetch_related(*PAGE_PREFETCH).first())
+        # False remembers that there isn't one
+        account.ndb.last_paged = page or False
+    return page or None
+
+
+def note_page_sent(account, page):
+    account.ndb.last_paged = page
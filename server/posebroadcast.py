@@ -0,0 +1,121 @@
+"""
+Pose fan-out for a room.
+
+Poses, emits and says used to walk every character in the room, read
+their nospoof, highlight and stagemute settings from the database one
+by one and transform the pose for each of them in turn. Instead:
+
+    - each room keeps a snapshot of who is in it and their display
+      settings in ndb, rebuilt when the room's contents change or
+      someone changes a setting (see forget_viewer)
+    - viewers with the same settings are bucketed together
+    - each bucket's text is rendered once from the original pose and
+      sent to everyone in it
+
+so a busy scene costs one render per distinct set of settings rather
+than one per person.
+
+Usage:
+    broadcast_pose(caller, message)
+"""
+
+from django.conf import settings
+from evennia.utils.utils import inherits_from
+
+from server.utils import highlight_text
+
+
+class ViewerPrefs(object):
+    """
+    The display settings that change how a pose looks to one viewer.
+    """
+
+    __slots__ = ("viewer", "nospoof", "highlights", "stagemute", "stage")
+
+    def __init__(self, viewer):
+        self.viewer = viewer
+        # read one by one, highlightlist only exists after +highlight add
+        attributes = viewer.attributes
+        self.nospoof = bool(attributes.get("nospoof", default=False))
+        highlights = attributes.get("highlightlist", default=()) or ()
+        self.highlights = tuple(tuple(pair) for pair in highlights)
+        self.stagemute = bool(attributes.get("stagemute", default=False))
+        self.stage = attributes.get("stage", default=None) or None
+
+    def render_key(self):
+        return (self.nospoof, self.highlights)
+
+    def hears(self, poser_stage):
+        '''
+        stagemuted viewers only see poses from their own stage, or
+        from people not on a stage.
+        '''
+        if not self.stagemute or not poser_stage:
+            return True
+        return poser_stage == self.stage
+
+
+def _contents_key(location):
+    return tuple(obj.id for obj in location.contents)
+
+
+def room_viewers(location):
+    '''
+    the cached ViewerPrefs for every character in location.
+    '''
+    key = _contents_key(location)
+    cached = location.ndb.pose_viewers
+    if cached and cached[0] == key:
+        return cached[1]
+    viewers = [ViewerPrefs(obj) for obj in location.contents
+               if inherits_from(obj, settings.BASE_CHARACTER_TYPECLASS)]
+    location.ndb.pose_viewers = (key, viewers)
+    return viewers
+
+
+def forget_viewer(char):
+    '''
+    call when char changes a display setting, so their room
+    re-reads everyone's settings on the next pose.
+    '''
+    location = char.location
+    if location:
+        location.ndb.pose_viewers = None
+
+
+def render_pose(poser, pose, nospoof, highlights):
+    if nospoof:
+        pose = (f"|c{poser} poses: |n\n") + pose
+    if highlights:
+        pose = highlight_text(pose, highlights)
+    return pose
+
+
+def pose_buckets(poser, location):
+    '''
+    group the viewers in location who can see poser's poses by how
+    the pose should look to them.
+    '''
+    poser_stage = poser.db.stage or None
+    buckets = {}
+    for prefs in room_viewers(location):
+        if prefs.hears(poser_stage):
+            buckets.setdefault(prefs.render_key(), []).append(prefs.viewer)
+    return buckets
+
+
+def broadcast_pose(poser, pose, location=None):
+    '''
+    send pose to everyone in the room, rendering it once per bucket.
+    Returns the number of distinct renders.
+    '''
+    if not pose:
+        #got no text so do nothing
+        return 0
+    location = location or poser.location
+    buckets = pose_buckets(poser, location)
+    for (nospoof, highlights), viewers in buckets.items():
+        text = f"\n{render_pose(poser, pose, nospoof, highlights)}\n"
+        for viewer in viewers:
+            viewer.msg(text)
+    return len(buckets)
@@ -0,0 +1,125 @@
+"""
+Recent pose history per room.
+
++pot/last and +pot/since used to read each character's db.lastpose,
+which meant a database write on every pose and only ever one pose per
+person. Instead each room keeps a fixed-size ring buffer in ndb of its
+last POSE_HISTORY_SIZE poses, each with its time and author, so late
+arrivals can catch up on the scene in order without touching the
+database.
+
+If POSE_HISTORY_CHECKPOINT is on, the buffers are saved to an
+Attribute on their room just before a reload and read back the first
+time the room is posed in afterwards.
+
+Usage:
+    record_pose(caller, message)
+    for entry in get_pose_history(room).since(char):
+        ...
+"""
+
+import time
+from collections import deque, namedtuple
+
+from django.conf import settings
+
+
+POSE_HISTORY_SIZE = getattr(settings, "POSE_HISTORY_SIZE", 40)
+POSE_HISTORY_CHECKPOINT = getattr(settings, "POSE_HISTORY_CHECKPOINT", True)
+
+CHECKPOINT_ATTRIBUTE = "pose_history_checkpoint"
+
+PoseEntry = namedtuple("PoseEntry", ["time", "char_id", "name", "text"])
+
+# every live PoseHistory, keyed by room id, so they can be checkpointed
+_ACTIVE_HISTORIES = {}
+
+
+class PoseHistory(object):
+    """
+    The last few poses in one room, oldest first.
+    """
+
+    def __init__(self, room, capacity=POSE_HISTORY_SIZE, entries=()):
+        self.room = room
+        self.entries = deque((PoseEntry(*entry) for entry in entries), maxlen=capacity)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, char, text, when=None):
+        entry = PoseEntry(when or time.time(), char.id, char.key, text)
+        self.entries.append(entry)
+        return entry
+
+    def all(self):
+        return list(self.entries)
+
+    def _last_index(self, char):
+        for index in range(len(self.entries) - 1, -1, -1):
+            if self.entries[index].char_id == char.id:
+                return index
+        return None
+
+    def last_pose(self, char):
+        index = self._last_index(char)
+        return None if index is None else self.entries[index]
+
+    def since(self, char):
+        '''
+        char's last pose and every pose after it.
+        '''
+        index = self._last_index(char)
+        if index is None:
+            return []
+        return list(self.entries)[index:]
+
+    def forget(self, char):
+        # for privacy and observer mode, drop everything char has posed
+        kept = [entry for entry in self.entries if entry.char_id != char.id]
+        self.entries = deque(kept, maxlen=self.entries.maxlen)
+
+
+def get_pose_history(room, create=True):
+    '''
+    the room's PoseHistory, picking up a reload checkpoint if there is one.
+    '''
+    history = room.ndb.pose_history
+    if history is None and create:
+        saved = room.attributes.get(CHECKPOINT_ATTRIBUTE)
+        if saved:
+            room.attributes.remove(CHECKPOINT_ATTRIBUTE)
+        history = PoseHistory(room, entries=saved or ())
+        room.ndb.pose_history = history
+        _ACTIVE_HISTORIES[room.id] = history
+    return history
+
+
+def record_pose(char, text):
+    '''
+    store a pose in char's room and stamp their pose time for +pot.
+    '''
+    now = time.time()
+    if char.location:
+        get_pose_history(char.location).add(char, text, now)
+    char.set_pose_time(float(now))
+
+
+def forget_poses(char):
+    if char.location:
+        history = get_pose_history(char.location, create=False)
+        if history:
+            history.forget(char)
+
+
+def checkpoint_pose_histories():
+    '''
+    save every room's recent poses so they survive a reload.
+    Called just before the server reloads.
+    '''
+    if not POSE_HISTORY_CHECKPOINT:
+        return
+    for history in list(_ACTIVE_HISTORIES.values()):
+        if history.room and history.entries:
+            history.room.attributes.add(CHECKPOINT_ATTRIBUTE,
+                                        [tuple(entry) for entry in history.entries])
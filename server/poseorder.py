@@ -0,0 +1,99 @@
+"""
+Pose order index for +pot.
+
++pot used to pull every session on the server, sort them all by pose
+time and then throw away everyone not in the room. Instead each room
+keeps a PoseOrder in ndb: a sorted list of (last pose time, character)
+for the characters in it, updated when someone poses, arrives or
+leaves. +pot just reads the room's list in order.
+
+The index is built from the room's contents the first time it's
+needed after a reload, so nothing has to be saved.
+
+Usage:
+    for pose_time, char in get_pose_order(room).ordered():
+        ...
+"""
+
+import bisect
+
+from django.conf import settings
+from evennia.utils.utils import inherits_from
+
+
+class PoseOrder(object):
+    """
+    The characters in one room, oldest pose first.
+    """
+
+    def __init__(self):
+        # sorted (pose_time, char id) pairs, the id breaks ties
+        self.entries = []
+        self.chars = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def update(self, char, pose_time):
+        pose_time = float(pose_time or 0.0)
+        self.remove(char)
+        bisect.insort(self.entries, (pose_time, char.id))
+        self.chars[char.id] = (pose_time, char)
+
+    def remove(self, char):
+        old = self.chars.pop(char.id, None)
+        if not old:
+            return
+        entry = (old[0], char.id)
+        index = bisect.bisect_left(self.entries, entry)
+        if index < len(self.entries) and self.entries[index] == entry:
+            del self.entries[index]
+
+    def ordered(self, start=0):
+        '''
+        (pose_time, char) pairs from the oldest pose to the newest.
+        '''
+        return [(pose_time, self.chars[char_id][1]) for pose_time, char_id in self.entries[start:]]
+
+    def since(self, char):
+        '''
+        char and everyone who has posed after them, in order.
+        '''
+        if char.id not in self.chars:
+            return []
+        pose_time = self.chars[char.id][0]
+        return self.ordered(bisect.bisect_left(self.entries, (pose_time, char.id)))
+
+
+def get_pose_order(room, create=True):
+    '''
+    the room's PoseOrder, built from its contents if there isn't one yet.
+    '''
+    order = room.ndb.pose_order
+    if order is None and create:
+        order = PoseOrder()
+        for obj in room.contents:
+            if inherits_from(obj, settings.BASE_CHARACTER_TYPECLASS):
+                order.update(obj, obj.get_pose_time())
+        room.ndb.pose_order = order
+    return order
+
+
+def note_pose(char, pose_time):
+    # only touch an index that already exists, a new one reads the time anyway
+    room = char.location
+    order = get_pose_order(room, create=False) if room else None
+    if order is not None:
+        order.update(char, pose_time)
+
+
+def note_arrival(room, obj):
+    order = get_pose_order(room, create=False)
+    if order is not None and inherits_from(obj, settings.BASE_CHARACTER_TYPECLASS):
+        order.update(obj, obj.get_pose_time())
+
+
+def note_departure(room, obj):
+    order = get_pose_order(room, create=False)
+    if order is not None:
+        order.remove(obj)
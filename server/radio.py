@@ -0,0 +1,340 @@
+"""
+Radio routing.
+
+A +radio transmission used to find the frequency through the caller's
+parallel radio_list/radio_names/radio_titles/radio_colors lists, query
+the Frequency table again for every +freq command, then walk every
+member of the frequency, online or not. Instead:
+
+    - each character's frequencies live in one db.radio_tuning dict,
+      letter -> {"freq", "name", "title", "color"}
+    - the routing table maps each frequency number to a RadioRoute
+      holding the ids of its members and of those gagging it. It is
+      read from the Frequency M2Ms in two queries the first time it's
+      needed after a start or reload, and kept current by tune(),
+      untune() and set_gag(), which also write the M2Ms.
+    - the members who are connected with their radio on are the
+      route's listeners, added and dropped as characters are puppeted
+      and unpuppeted, with the letter, name and colour each of them
+      uses for that frequency
+    - a transmission walks only the listeners of its frequency, once,
+      formatting it for each with their own label
+
++freq/recall used to be meant to read a 50 entry Postgres array on the
+Frequency row, rewritten on every message and unusable on SQLite.
+Instead each route keeps its last RADIO_RECALL_SIZE transmissions in a
+deque, loaded with one query the first time the frequency is used after
+a reload. New transmissions are queued as unsaved FrequencyLog rows and
+appended with one bulk_create when RADIO_LOG_BATCH are waiting, on the
+RadioLogScript timer and when the server stops. The daily sweep trims
+each frequency's log back to its last RADIO_RECALL_SIZE rows.
+
+Usage:
+    tune(char, "A", 1234)
+    transmit(caller, "A", ":waves hello")
+    radio_online(char)
+    lines = recall(caller, "A", 10)
+"""
+
+from collections import deque
+
+from django.db import transaction
+
+
+DEFAULT_RADIO_COLOR = "|400"
+# transmissions kept per frequency for +freq/recall
+RADIO_RECALL_SIZE = 50
+# write the queued log as soon as it has this many entries
+RADIO_LOG_BATCH = 50
+# seconds between timed flushes, see typeclasses.scripts.RadioLogScript
+RADIO_LOG_FLUSH_INTERVAL = 30
+
+_ROUTES = {}
+_BUILT = [False]
+_PENDING = []
+
+
+def slot_letter(text):
+    '''
+    the upper case slot letter text names, or None.
+    '''
+    text = (text or "").strip()
+    if len(text) != 1 or not text.isalpha():
+        return None
+    return text.upper()
+
+
+def get_tuning(char):
+    return char.db.radio_tuning or {}
+
+
+def slot_for(char, number):
+    # the letter and settings char uses for frequency number
+    for letter, slot in sorted(get_tuning(char).items()):
+        if slot["freq"] == number:
+            return letter, slot
+    return None, None
+
+
+class RadioRoute(object):
+    """
+    Who is on one frequency, who is gagging it and who is listening now.
+    """
+
+    def __init__(self, number, freq_id=None, member_ids=(), gagged_ids=()):
+        self.number = number
+        self.freq_id = freq_id
+        self.members = set(member_ids)
+        self.gagged = set(gagged_ids)
+        # char id -> (char, label)
+        self.listeners = {}
+        self.recall = None
+
+    def get_recall(self):
+        # the last RADIO_RECALL_SIZE log entries, oldest first
+        if self.recall is None:
+            from world.radio.models import FrequencyLog
+
+            latest = FrequencyLog.objects.filter(
+                frequency_id=self.freq_id).order_by("-id")[:RADIO_RECALL_SIZE]
+            self.recall = deque(reversed(list(latest)), maxlen=RADIO_RECALL_SIZE)
+        return self.recall
+
+    def record(self, speaker, text, spoof=False):
+        from world.radio.models import FrequencyLog
+
+        entry = FrequencyLog(frequency_id=self.freq_id, speaker=speaker, text=text, spoof=spoof)
+        self.get_recall().append(entry)
+        _PENDING.append(entry)
+        if len(_PENDING) >= RADIO_LOG_BATCH:
+            flush_radio_logs()
+
+    def listen(self, char):
+        letter, slot = slot_for(char, self.number)
+        if letter is None:
+            self.listeners.pop(char.id, None)
+            return
+        label = "%s<%s: %s>|n " % (slot["color"] or DEFAULT_RADIO_COLOR, letter, slot["name"])
+        self.listeners[char.id] = (char, label)
+
+
+def build_routes():
+    '''
+    read every frequency's members and gags and pick out who is online.
+    '''
+    from evennia.server.sessionhandler import SESSION_HANDLER
+    from world.radio.models import Frequency
+
+    numbers = dict(Frequency.objects.values_list("id", "db_freq"))
+    routes = {number: RadioRoute(number, freq_id) for freq_id, number in numbers.items()}
+    for freq_id, char_id in Frequency.db_members.through.objects.values_list(
+            "frequency_id", "objectdb_id"):
+        routes[numbers[freq_id]].members.add(char_id)
+    for freq_id, char_id in Frequency.db_gaglist.through.objects.values_list(
+            "frequency_id", "objectdb_id"):
+        routes[numbers[freq_id]].gagged.add(char_id)
+    _ROUTES.clear()
+    _ROUTES.update(routes)
+    _BUILT[0] = True
+    for session in SESSION_HANDLER.get_sessions():
+        if session.puppet:
+            radio_online(session.puppet)
+
+
+def get_route(number, freq=None):
+    # passing the Frequency creates the route if it's new
+    if not _BUILT[0]:
+        build_routes()
+    route = _ROUTES.get(number)
+    if route is None and freq:
+        route = _ROUTES[number] = RadioRoute(number, freq.id)
+    return route
+
+
+def radio_online(char):
+    '''
+    start routing char's frequencies to them. Also call this after
+    they rename or recolour a frequency.
+    '''
+    if not _BUILT[0] or not char.db.radio_on:
+        return
+    for slot in get_tuning(char).values():
+        route = _ROUTES.get(slot["freq"])
+        if route and char.id in route.members:
+            route.listen(char)
+
+
+def radio_offline(char):
+    for route in _ROUTES.values():
+        route.listeners.pop(char.id, None)
+
+
+def tune(char, letter, number, name="No Name", title="", color=DEFAULT_RADIO_COLOR):
+    '''
+    set char's slot letter to frequency number, creating the frequency
+    if nobody has used it yet.
+    '''
+    from world.radio.models import Frequency
+
+    tuning = dict(get_tuning(char))
+    if letter in tuning:
+        untune(char, letter)
+        tuning = dict(get_tuning(char))
+    with transaction.atomic():
+        freq = Frequency.objects.filter(db_freq=number).first()
+        if not freq:
+            freq = Frequency.objects.create(db_freq=number)
+        freq.db_members.add(char)
+    tuning[letter] = {"freq": number, "name": name, "title": title, "color": color}
+    char.db.radio_tuning = tuning
+    get_route(number, freq).members.add(char.id)
+    radio_online(char)
+
+
+def untune(char, letter):
+    '''
+    clear char's slot letter. They leave the frequency unless another
+    of their slots is still on it.
+    '''
+    from world.radio.models import Frequency
+
+    tuning = dict(get_tuning(char))
+    slot = tuning.pop(letter, None)
+    if not slot:
+        return False
+    char.db.radio_tuning = tuning
+    number = slot["freq"]
+    route = get_route(number)
+    if any(other["freq"] == number for other in tuning.values()):
+        if route and char.id in route.listeners:
+            route.listen(char)
+        return True
+    freq = Frequency.objects.filter(db_freq=number).first()
+    if freq:
+        freq.db_members.remove(char)
+        freq.db_gaglist.remove(char)
+    if route:
+        route.members.discard(char.id)
+        route.gagged.discard(char.id)
+        route.listeners.pop(char.id, None)
+    return True
+
+
+def set_gag(char, letter, gag=True):
+    from world.radio.models import Frequency
+
+    slot = get_tuning(char).get(letter)
+    if not slot:
+        return False
+    freq = Frequency.objects.filter(db_freq=slot["freq"]).first()
+    if not freq:
+        return False
+    route = get_route(slot["freq"], freq)
+    if gag:
+        freq.db_gaglist.add(char)
+        route.gagged.add(char.id)
+    else:
+        freq.db_gaglist.remove(char)
+        route.gagged.discard(char.id)
+    return True
+
+
+def is_gagged(char, letter):
+    slot = get_tuning(char).get(letter)
+    route = slot and get_route(slot["freq"])
+    return bool(route and char.id in route.gagged)
+
+
+def listeners_on(number):
+    '''
+    the characters hearing frequency number right now, with whether
+    each is gagging it.
+    '''
+    route = get_route(number)
+    if not route:
+        return []
+    return [(char, char.id in route.gagged) for char, label in route.listeners.values()]
+
+
+def format_transmission(speaker, title, text):
+    name = "%s %s" % (title, speaker.name) if title else speaker.name
+    if text.startswith(":"):
+        return "%s %s" % (name, text[1:].lstrip())
+    if text.startswith(";"):
+        return "%s%s" % (name, text[1:])
+    return '%s transmits: "%s"' % (name, text)
+
+
+def transmit(caller, letter, text):
+    '''
+    send text over caller's frequency letter to everyone listening who
+    isn't gagging it. Returns how many heard it, or None if caller has
+    no such frequency.
+    '''
+    slot = get_tuning(caller).get(letter)
+    route = slot and get_route(slot["freq"])
+    if not route:
+        return None
+    if text.startswith("@"):
+        # an emit, shown without a name unless the listener has nospoof
+        plain = text[1:]
+        spoofed = spoof_line(caller.name, plain)
+    else:
+        plain = spoofed = format_transmission(caller, slot["title"], text)
+    route.record(caller.name, plain, spoof=text.startswith("@"))
+    heard = 0
+    for char_id, (char, label) in list(route.listeners.items()):
+        if char_id in route.gagged:
+            continue
+        char.msg(label + (spoofed if char.db.radio_nospoof else plain))
+        heard += 1
+    return heard
+
+
+def spoof_line(speaker, text):
+    return "(From %s): %s" % (speaker, text)
+
+
+def recall(char, letter, count=RADIO_RECALL_SIZE):
+    '''
+    the last count transmissions on char's frequency letter as lines
+    for char, oldest first, or None if char has no such frequency.
+    '''
+    slot = get_tuning(char).get(letter)
+    route = slot and get_route(slot["freq"])
+    if not route:
+        return None
+    nospoof = char.db.radio_nospoof
+    entries = list(route.get_recall())[-count:] if count > 0 else []
+    return ["[%s] %s" % (entry.created_at.strftime("%H:%M"),
+                         spoof_line(entry.speaker, entry.text) if entry.spoof and nospoof
+                         else entry.text)
+            for entry in entries]
+
+
+def flush_radio_logs():
+    from world.radio.models import FrequencyLog
+
+    entries = _PENDING[:]
+    del _PENDING[:]
+    if entries:
+        FrequencyLog.objects.bulk_create(entries)
+
+
+def prune_radio_logs():
+    '''
+    drop log rows older than each frequency's last RADIO_RECALL_SIZE.
+    Returns how many went.
+    '''
+    from world.radio.models import Frequency, FrequencyLog
+
+    flush_radio_logs()
+    removed = 0
+    for freq_id in Frequency.objects.values_list("id", flat=True):
+        oldest_kept = list(FrequencyLog.objects.filter(frequency_id=freq_id)
+                           .order_by("-id").values_list("id", flat=True)
+                           [RADIO_RECALL_SIZE - 1:RADIO_RECALL_SIZE])
+        if oldest_kept:
+            removed += FrequencyLog.objects.filter(
+                frequency_id=freq_id, id__lt=oldest_kept[0]).delete()[0]
+    return removed
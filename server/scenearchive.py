@@ -0,0 +1,162 @@
+"""
+Compressed archives of finished scenes.
+
+A scene's log used to stay in the LogEntry table forever, one row per
+pose, and reading it back meant pulling every row. When a scene stops
+its entries are packed into a single SceneArchive row instead:
+
+    - each entry becomes one line of JSON
+    - every ARCHIVE_FRAME_SIZE lines are zlib-compressed as their own
+      frame and the frames are joined into one blob
+    - the byte offset of each frame is kept in frame_index, so a page
+      of the log can be inflated on its own and the whole log can be
+      streamed frame by frame without holding it all in memory
+
+The LogEntry rows are deleted once the archive is saved. Readers should
+go through scene_entries(), which reads the archive if there is one and
+the live table if the scene is still running.
+
+Usage:
+    archive_scene(scene_id)
+    for entry in scene_entries(scene):
+        ...
+"""
+
+import json
+import zlib
+from collections import namedtuple
+from datetime import datetime
+
+from django.db import transaction
+
+from world.scenes.models import Scene, LogEntry, SceneArchive
+
+
+# log entries per compressed frame, which is also the page size for paging
+ARCHIVE_FRAME_SIZE = 100
+ARCHIVE_COMPRESSION = 6
+
+# one log entry as readers see it, whether it came from an archive or the live table
+ArchivedEntry = namedtuple("ArchivedEntry",
+                           ["id", "created_at", "type", "character_id", "character_name", "content"])
+
+
+def _as_archived(entry):
+    character = entry.character
+    return ArchivedEntry(entry.id, entry.created_at, entry.type, entry.character_id,
+                         character.key if character else None, entry.content)
+
+
+def _entry_line(entry):
+    entry = _as_archived(entry)
+    line = [entry.id, entry.created_at.isoformat() if entry.created_at else None,
+            entry.type, entry.character_id, entry.character_name, entry.content]
+    return json.dumps(line, separators=(",", ":")) + "\n"
+
+
+def _read_line(line):
+    entry_id, created_at, entry_type, char_id, name, content = json.loads(line)
+    if created_at:
+        created_at = datetime.fromisoformat(created_at)
+    return ArchivedEntry(entry_id, created_at, entry_type, char_id, name, content)
+
+
+def pack_lines(lines, frame_size=ARCHIVE_FRAME_SIZE):
+    '''
+    compress an iterable of text lines into (blob, frame offsets, raw size).
+    '''
+    blob = bytearray()
+    offsets = []
+    raw_size = 0
+    frame = []
+
+    def close_frame():
+        raw = "".join(frame).encode("utf-8")
+        offsets.append(len(blob))
+        blob.extend(zlib.compress(raw, ARCHIVE_COMPRESSION))
+        del frame[:]
+        return len(raw)
+
+    for line in lines:
+        frame.append(line)
+        if len(frame) >= frame_size:
+            raw_size += close_frame()
+    if frame:
+        raw_size += close_frame()
+    return bytes(blob), offsets, raw_size
+
+
+def unpack_frame(blob, offsets, number):
+    '''
+    the text lines in one frame of a packed blob.
+    '''
+    start = offsets[number]
+    end = offsets[number + 1] if number + 1 < len(offsets) else len(blob)
+    return zlib.decompress(blob[start:end]).decode("utf-8").splitlines()
+
+
+def archive_scene(scene_id):
+    '''
+    pack a stopped scene's log into a SceneArchive and drop its LogEntry
+    rows. Flush the scene's log buffer first. Returns the archive, or
+    None if there was nothing to archive.
+    '''
+    scene = Scene.objects.filter(id=scene_id).first()
+    if not scene or SceneArchive.objects.filter(scene_id=scene_id).exists():
+        return None
+    entries = LogEntry.objects.filter(scene_id=scene_id).select_related("character").order_by("id")
+    count = entries.count()
+    if not count:
+        return None
+    blob, offsets, raw_size = pack_lines(_entry_line(entry) for entry in entries.iterator())
+    with transaction.atomic():
+        archive = SceneArchive.objects.create(scene=scene, data=blob,
+                                              frame_index=json.dumps(offsets),
+                                              frame_size=ARCHIVE_FRAME_SIZE,
+                                              entry_count=count, raw_size=raw_size)
+        LogEntry.objects.filter(scene_id=scene_id).delete()
+    return archive
+
+
+def get_archive(scene):
+    try:
+        return scene.archive
+    except SceneArchive.DoesNotExist:
+        return None
+
+
+def archive_pages(archive):
+    return len(json.loads(archive.frame_index))
+
+
+def archive_page(archive, page):
+    '''
+    the ArchivedEntries on one page (frame) of an archive, from 0.
+    '''
+    offsets = json.loads(archive.frame_index)
+    if page < 0 or page >= len(offsets):
+        return []
+    return [_read_line(line) for line in unpack_frame(bytes(archive.data), offsets, page)]
+
+
+def iter_archive(archive, start_page=0):
+    '''
+    stream every ArchivedEntry from start_page on, one frame at a time.
+    '''
+    offsets = json.loads(archive.frame_index)
+    blob = bytes(archive.data)
+    for page in range(start_page, len(offsets)):
+        for line in unpack_frame(blob, offsets, page):
+            yield _read_line(line)
+
+
+def scene_entries(scene):
+    '''
+    every entry in a scene's log in order as ArchivedEntries, from its
+    archive if it has one and the live table otherwise.
+    '''
+    archive = get_archive(scene)
+    if archive:
+        return iter_archive(archive)
+    entries = scene.logentry_set.select_related("character").order_by("id")
+    return (_as_archived(entry) for entry in entries.iterator(chunk_size=ARCHIVE_FRAME_SIZE))
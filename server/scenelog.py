@@ -0,0 +1,108 @@
+"""
+Buffered autologger writes.
+
+Logging every pose straight to the database was one LogEntry INSERT
+per pose plus a participant lookup, which is why autologging was left
+switched off in the pose commands. Instead each running scene gets a
+SceneLog buffer in memory:
+
+    - poses, emits and says are queued as unsaved LogEntry objects
+    - the queue is written with one bulk_create when it reaches
+      SCENE_LOG_BATCH entries, when the scene stops, on the
+      SceneLogScript timer and when the server stops
+    - participants are kept in a set and any new ones are added to the
+      scene with one bulk insert into the M2M table on the same flush
+
+Entries keep their pose order by id. created_at is stamped when the
+batch is written, so it can trail the pose by up to one flush.
+
+Usage:
+    log_scene_entry(caller, LogEntry.EntryType.POSE, message)
+"""
+
+from world.scenes.models import Scene, LogEntry
+
+
+# write a scene's queue as soon as it has this many entries
+SCENE_LOG_BATCH = 50
+# seconds between timed flushes, see typeclasses.scripts.SceneLogScript
+SCENE_LOG_FLUSH_INTERVAL = 15
+
+_SCENE_LOGS = {}
+
+
+class SceneLog(object):
+    """
+    The unsaved entries and participants for one scene.
+    """
+
+    def __init__(self, scene_id):
+        self.scene_id = scene_id
+        self.entries = []
+        self.participants = set()
+        self.synced = set()
+
+    def add(self, entry_type, text, character):
+        self.entries.append(LogEntry(scene_id=self.scene_id, content=text,
+                                     type=entry_type, character_id=character.id))
+        self.participants.add(character.id)
+        if len(self.entries) >= SCENE_LOG_BATCH:
+            self.flush()
+
+    def add_participant(self, character):
+        self.participants.add(character.id)
+
+    def flush(self):
+        entries, self.entries = self.entries, []
+        if entries:
+            LogEntry.objects.bulk_create(entries)
+        new = self.participants - self.synced
+        if new:
+            through = Scene.participants.through
+            through.objects.bulk_create(
+                [through(scene_id=self.scene_id, objectdb_id=char_id) for char_id in new],
+                ignore_conflicts=True,
+            )
+            self.synced |= new
+
+
+def get_scene_log(scene_id):
+    log = _SCENE_LOGS.get(scene_id)
+    if log is None:
+        log = SceneLog(scene_id)
+        _SCENE_LOGS[scene_id] = log
+    return log
+
+
+def active_scene_id(room):
+    # the scene being logged in room, or None
+    if not room or not room.db.active_event:
+        return None
+    return room.db.event_id
+
+
+def log_scene_entry(character, entry_type, text):
+    '''
+    queue text for the scene running where character is, if any.
+    Private (+pot/privacy) poses aren't logged.
+    '''
+    scene_id = active_scene_id(character.location)
+    if not scene_id or character.db.potprivate:
+        return False
+    get_scene_log(scene_id).add(entry_type, text, character)
+    return True
+
+
+def flush_scene_log(scene_id, forget=False):
+    '''
+    write out one scene's queue. forget drops the buffer too, for
+    when the scene has ended.
+    '''
+    log = _SCENE_LOGS.pop(scene_id, None) if forget else _SCENE_LOGS.get(scene_id)
+    if log:
+        log.flush()
+
+
+def flush_all_scene_logs():
+    for log in list(_SCENE_LOGS.values()):
+        log.flush()
@@ -0,0 +1,153 @@
+"""
+Full-text search over scene logs.
+
+The only way to find an old scene was an icontains scan over every
+LogEntry, which can't see into archived logs at all. Instead each
+scene gets a small inverted index in SceneSearchTerm when it stops:
+
+    - the name, description and log are split into lowercase words,
+      leaving out common stop words
+    - each distinct word is stored once per scene with a weight, the
+      number of times it appears, with words in the name counting
+      NAME_WEIGHT times and words in the description DESCRIPTION_WEIGHT
+    - a search looks its words up in the term index, ranks scenes by how
+      many of the words they contain and then by total weight, and only
+      reads the logs of the top results to cut a snippet around the
+      first hit
+
+It's plain tables and indexes, so it works the same on SQLite and
+PostgreSQL without needing FTS5 or tsvector. Scenes still running
+aren't searchable until they stop.
+
+Usage:
+    index_scene(scene_id)
+    for result in search_scenes("wily fortress"):
+        ...
+"""
+
+import re
+from collections import Counter, namedtuple
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from evennia.utils.ansi import strip_ansi
+
+from world.scenes.models import Scene, SceneSearchTerm
+from server.scenearchive import scene_entries
+
+
+WORD_RE = re.compile(r"[a-z0-9][a-z0-9']*")
+MIN_WORD = 2
+MAX_WORD = 64
+STOP_WORDS = frozenset("""
+    an and are as at be but by for from has have he her him his in into is it
+    its me my no not of on or our she so than that the their them then there
+    they this to up was we were what when which who will with you your
+""".split())
+
+NAME_WEIGHT = 10
+DESCRIPTION_WEIGHT = 3
+
+SEARCH_LIMIT = 10
+SNIPPET_WIDTH = 100
+
+SearchResult = namedtuple("SearchResult", ["scene", "matched", "score", "snippet"])
+
+
+def words(text):
+    '''
+    the indexable words in text, lowercased and without colour codes.
+    '''
+    for word in WORD_RE.findall(strip_ansi(text or "").lower()):
+        if word.endswith("'s"):
+            word = word[:-2]
+        word = word.rstrip("'")
+        if MIN_WORD <= len(word) <= MAX_WORD and word not in STOP_WORDS:
+            yield word
+
+
+def index_scene(scene_id):
+    '''
+    (re)build one scene's search terms. Returns the number of distinct words.
+    '''
+    scene = Scene.objects.filter(id=scene_id).first()
+    if not scene:
+        return 0
+    counts = Counter()
+    for word in words(scene.name):
+        counts[word] += NAME_WEIGHT
+    for word in words(scene.description):
+        counts[word] += DESCRIPTION_WEIGHT
+    for entry in scene_entries(scene):
+        counts.update(words(entry.content))
+    with transaction.atomic():
+        SceneSearchTerm.objects.filter(scene_id=scene.id).delete()
+        SceneSearchTerm.objects.bulk_create(
+            [SceneSearchTerm(term=term, scene_id=scene.id, weight=weight)
+             for term, weight in counts.items()],
+            batch_size=500,
+        )
+    return len(counts)
+
+
+def index_unindexed_scenes():
+    '''
+    index every finished scene that has no search terms yet, for logs
+    from before the index existed. Returns how many were indexed.
+    '''
+    missing = Scene.objects.filter(end_time__isnull=False, search_terms__isnull=True)
+    scene_ids = list(missing.values_list("id", flat=True))
+    for scene_id in scene_ids:
+        index_scene(scene_id)
+    return len(scene_ids)
+
+
+def _snippet(text, match):
+    text = strip_ansi(text)
+    start = max(0, match.start() - SNIPPET_WIDTH // 3)
+    snippet = " ".join(text[start:start + SNIPPET_WIDTH].split())
+    if start > 0:
+        snippet = "..." + snippet
+    if start + SNIPPET_WIDTH < len(text):
+        snippet += "..."
+    return snippet
+
+
+def scene_snippet(scene, terms):
+    '''
+    a short piece of text around the first place in scene that one of
+    terms turns up. Stops reading the log at the first hit.
+    '''
+    finder = re.compile(r"\b(?:%s)" % "|".join(re.escape(term) for term in terms), re.I)
+    texts = [scene.name or "", scene.description or ""]
+    for text in texts:
+        match = finder.search(strip_ansi(text))
+        if match:
+            return _snippet(text, match)
+    for entry in scene_entries(scene):
+        text = strip_ansi(entry.content)
+        match = finder.search(text)
+        if match:
+            return _snippet(text, match)
+    return ""
+
+
+def search_scenes(query, limit=SEARCH_LIMIT):
+    '''
+    the scenes best matching query as SearchResults, best first.
+    '''
+    terms = list(dict.fromkeys(words(query)))
+    if not terms:
+        return []
+    ranked = list(SceneSearchTerm.objects.filter(term__in=terms)
+                  .values("scene_id")
+                  .annotate(matched=Count("id"), score=Sum("weight"))
+                  .order_by("-matched", "-score", "-scene_id")[:limit])
+    scenes = Scene.objects.select_related("location").in_bulk([row["scene_id"] for row in ranked])
+    results = []
+    for row in ranked:
+        scene = scenes.get(row["scene_id"])
+        if scene:
+            results.append(SearchResult(scene, row["matched"], row["score"],
+                                        scene_snippet(scene, terms)))
+    return results
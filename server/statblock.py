@@ -0,0 +1,102 @@
+"""
+Packed stat block for characters.
+
+A character's 7 stats and 12 skills are kept together as one list of
+ints in a single Attribute (db.statblock), cached in ndb, instead of
+as 19 separate Attributes. Everything that reads stats goes through
+the fixed layout below, so a sheet, an attack roll or a chargen check
+is one lookup.
+
+Layout:
+    0-6    pow dex ten cun edu chr aur
+    7-18   discern aim athletics force mechanics medicine computer
+           stealth heist convince presence arcana
+"""
+
+from world.combat.models import WeaponClass
+
+
+STAT_NAMES = ("pow", "dex", "ten", "cun", "edu", "chr", "aur")
+SKILL_NAMES = ("discern", "aim", "athletics", "force", "mechanics", "medicine",
+               "computer", "stealth", "heist", "convince", "presence", "arcana")
+STATBLOCK_FIELDS = STAT_NAMES + SKILL_NAMES
+
+STAT_SLICE = slice(0, len(STAT_NAMES))
+SKILL_SLICE = slice(len(STAT_NAMES), len(STATBLOCK_FIELDS))
+
+STAT_LONG_NAMES = {
+    "power": "pow",
+    "dexterity": "dex",
+    "tenacity": "ten",
+    "cunning": "cun",
+    "education": "edu",
+    "charisma": "chr",
+    "aura": "aur",
+}
+
+STATBLOCK_INDEX = {name: i for i, name in enumerate(STATBLOCK_FIELDS)}
+for _long, _short in STAT_LONG_NAMES.items():
+    STATBLOCK_INDEX[_long] = STATBLOCK_INDEX[_short]
+
+STAT_DEFAULT = 1
+
+# which stat and skill each weapon class rolls, as statblock indexes
+ATTACK_ROLLS = {
+    WeaponClass.RANGED: (STATBLOCK_INDEX["dex"], STATBLOCK_INDEX["aim"]),
+    WeaponClass.WAVE: (STATBLOCK_INDEX["pow"], STATBLOCK_INDEX["force"]),
+    WeaponClass.THROWN: (STATBLOCK_INDEX["pow"], STATBLOCK_INDEX["aim"]),
+    WeaponClass.MELEE: (STATBLOCK_INDEX["dex"], STATBLOCK_INDEX["athletics"]),
+    WeaponClass.BLITZ: (STATBLOCK_INDEX["dex"], STATBLOCK_INDEX["force"]),
+    WeaponClass.SNEAK: (STATBLOCK_INDEX["dex"], STATBLOCK_INDEX["stealth"]),
+    WeaponClass.GRAPPLE: (STATBLOCK_INDEX["pow"], STATBLOCK_INDEX["athletics"]),
+    WeaponClass.SPELL: (STATBLOCK_INDEX["aur"], STATBLOCK_INDEX["arcana"]),
+    WeaponClass.WILL: (STATBLOCK_INDEX["aur"], STATBLOCK_INDEX["presence"]),
+    WeaponClass.GADGET: (STATBLOCK_INDEX["cun"], STATBLOCK_INDEX["mechanics"]),
+    WeaponClass.CHIP: (STATBLOCK_INDEX["cun"], STATBLOCK_INDEX["computer"]),
+}
+
+
+def stat_index(name):
+    '''
+    index of a stat or skill by short or long name, or None.
+    '''
+    if not name:
+        return None
+    return STATBLOCK_INDEX.get(name.strip().lower())
+
+
+def is_stat(name):
+    index = stat_index(name)
+    return index is not None and index < SKILL_SLICE.start
+
+
+def is_skill(name):
+    index = stat_index(name)
+    return index is not None and index >= SKILL_SLICE.start
+
+
+def default_statblock():
+    return [STAT_DEFAULT] * len(STATBLOCK_FIELDS)
+
+
+def pack_from_attributes(obj):
+    '''
+    build a stat block from the old one-attribute-per-stat layout.
+    '''
+    # one get per field, a legacy character can be missing any of them
+    block = []
+    for name in STATBLOCK_FIELDS:
+        value = obj.attributes.get(name)
+        block.append(STAT_DEFAULT if value is None else int(value))
+    return block
+
+
+def pack_from_armor(armor):
+    return [getattr(armor, "db_" + name) for name in STATBLOCK_FIELDS]
+
+
+def statblock_to_armor_fields(block):
+    '''
+    kwargs for creating an ArmorMode from a stat block.
+    '''
+    return {"db_" + name: value for name, value in zip(STATBLOCK_FIELDS, block)}
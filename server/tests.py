@@ -0,0 +1,98 @@
+import os
+import timeit
+from unittest import skipUnless
+
+from django.conf import settings
+from django.test import TestCase
+from evennia.utils.test_resources import EvenniaTest
+
+from server.posebroadcast import ViewerPrefs, broadcast_pose
+from server.utils import OLD_ANSI_CODES, sub_old_ansi, _strip_old_ansi, _translate_cached
+
+
+def replace_chain(text):
+    # the old one str.replace per code version of sub_old_ansi, to compare against
+    for code, markup in OLD_ANSI_CODES.items():
+        text = text.replace(code, markup)
+    return text
+
+
+def strip_chain(text):
+    for code in OLD_ANSI_CODES:
+        text = text.replace(code, "")
+    return text
+
+
+def make_pose(length):
+    line = ("Mega Man dashes past the %chspike pit%cn, skids to a stop on the far ledge and "
+            "braces himself against the wind howling through the broken shutters of the "
+            "fortress. He levels his buster at the wall and fires a %cyCharged Shot%cn.%r%t")
+    return (line * (length // len(line) + 1))[:length]
+
+
+def bench_old_ansi(runs=200):
+    '''
+    time the replace chain against sub_old_ansi on full length poses,
+    with and without codes. Returns {(chars, codes): (old, new)} in
+    microseconds per call.
+    '''
+    pose = make_pose(settings.MAX_CHAR_LIMIT)
+    results = {}
+    for text in (pose, pose.replace("%", "")):
+        old_time = timeit.timeit(lambda: replace_chain(text), number=runs)
+        new_time = timeit.timeit(lambda: sub_old_ansi(text), number=runs)
+        results[(len(text), text.count("%"))] = (old_time / runs * 1e6, new_time / runs * 1e6)
+    return results
+
+
+class OldAnsiTests(TestCase):
+
+    def test_matches_replace_chain(self):
+        samples = [
+            "",
+            "no codes at all",
+            "%r%R%t%T%b",
+            "%cr red %cR %cg %cG %cy %cY %cb %cB %cm %cM %cc %cC %cw %cW %cx %cX %ch %cn",
+            "100% sure, %c not a code, %%r",
+            make_pose(settings.MAX_CHAR_LIMIT),
+        ]
+        for text in samples:
+            self.assertEqual(sub_old_ansi(text), replace_chain(text))
+            self.assertEqual(_strip_old_ansi(text), strip_chain(text))
+
+    def test_short_strings_are_cached(self):
+        header = "%ch[Public]%cn"
+        _translate_cached.cache_clear()
+        self.assertEqual(sub_old_ansi(header), "|h[Public]|n")
+        self.assertEqual(sub_old_ansi(header), "|h[Public]|n")
+        self.assertEqual(_translate_cached.cache_info().hits, 1)
+        # poses are too long to be kept
+        sub_old_ansi(make_pose(settings.MAX_CHAR_LIMIT))
+        self.assertEqual(_translate_cached.cache_info().currsize, 1)
+
+    @skipUnless(os.environ.get("MEGA_BENCHMARKS"), "set MEGA_BENCHMARKS=1 to run benchmarks")
+    def test_benchmark_full_length_pose(self):
+        # no timing asserts, CI machines are too noisy. Call bench_old_ansi()
+        # from a shell to see the numbers.
+        results = bench_old_ansi()
+        self.assertEqual(len(results), 2)
+        for old_time, new_time in results.values():
+            self.assertGreater(old_time, 0)
+            self.assertGreater(new_time, 0)
+
+
+class PoseBroadcastTests(EvenniaTest):
+
+    character_typeclass = settings.BASE_CHARACTER_TYPECLASS
+
+    def test_viewer_without_settings(self):
+        # never used +highlight, +nospoof or a stage
+        for key in ("nospoof", "highlightlist", "stagemute", "stage"):
+            self.char2.attributes.remove(key)
+        prefs = ViewerPrefs(self.char2)
+        self.assertFalse(prefs.nospoof)
+        self.assertEqual(prefs.highlights, ())
+        self.assertFalse(prefs.stagemute)
+        self.assertIsNone(prefs.stage)
+        self.assertTrue(prefs.hears(None))
+        self.assertEqual(broadcast_pose(self.char1, "waves."), 1)
@@ -6,6 +6,7 @@ These helper functions are modified from the Arx helper functions.
 """
 import re
 from datetime import datetime
+from functools import lru_cache
 
 from django.conf import settings
 
@@ -77,80 +78,143 @@ def datetime_format(date):
     return timestring
 
 
+# old MUSH %-codes and the evennia markup they become
+OLD_ANSI_CODES = {
+    "%r": "|/",
+    "%R": "|/",
+    "%t": "|-",
+    "%T": "|-",
+    "%b": "|_",
+    "%cr": "|r",
+    "%cR": "|[R",
+    "%cg": "|g",
+    "%cG": "|[G",
+    "%cy": "|!Y",
+    "%cY": "|[Y",
+    "%cb": "|!B",
+    "%cB": "|[B",
+    "%cm": "|!M",
+    "%cM": "|[M",
+    "%cc": "|!C",
+    "%cC": "|[C",
+    "%cw": "|!W",
+    "%cW": "|[W",
+    "%cx": "|!X",
+    "%cX": "|[X",
+    "%ch": "|h",
+    "%cn": "|n",
+}
+
+# one scan finds every code. The group keeps the codes in split()'s
+# output, so they land on the odd indexes.
+OLD_ANSI_RE = re.compile("(%c[rRgGyYbBmMcCwWxXhn]|%[rRtTb])")
+
+# short strings like channel headers repeat a lot, so remember them.
+# poses are too long to be worth keeping.
+ANSI_CACHE_SIZE = 512
+ANSI_CACHE_MAX_LENGTH = 256
+
+
+def _translate_old_ansi(text):
+    parts = OLD_ANSI_RE.split(text)
+    parts[1::2] = map(OLD_ANSI_CODES.__getitem__, parts[1::2])
+    return "".join(parts)
+
+
+def _strip_old_ansi(text):
+    return "".join(OLD_ANSI_RE.split(text)[0::2])
+
+
+_translate_cached = lru_cache(maxsize=ANSI_CACHE_SIZE)(_translate_old_ansi)
+_strip_cached = lru_cache(maxsize=ANSI_CACHE_SIZE)(_strip_old_ansi)
+
+
 def sub_old_ansi(text):
     """Replacing old ansi with newer evennia markup strings"""
     if not text:
         return ""
-    text = text.replace("%r", "|/")
-    text = text.replace("%R", "|/")
-    text = text.replace("%t", "|-")
-    text = text.replace("%T", "|-")
-    text = text.replace("%b", "|_")
-    text = text.replace("%cr", "|r")
-    text = text.replace("%cR", "|[R")
-    text = text.replace("%cg", "|g")
-    text = text.replace("%cG", "|[G")
-    text = text.replace("%cy", "|!Y")
-    text = text.replace("%cY", "|[Y")
-    text = text.replace("%cb", "|!B")
-    text = text.replace("%cB", "|[B")
-    text = text.replace("%cm", "|!M")
-    text = text.replace("%cM", "|[M")
-    text = text.replace("%cc", "|!C")
-    text = text.replace("%cC", "|[C")
-    text = text.replace("%cw", "|!W")
-    text = text.replace("%cW", "|[W")
-    text = text.replace("%cx", "|!X")
-    text = text.replace("%cX", "|[X")
-    text = text.replace("%ch", "|h")
-    text = text.replace("%cn", "|n")
-    return text
+    if "%" not in text:
+        return text
+    if len(text) <= ANSI_CACHE_MAX_LENGTH:
+        return _translate_cached(text)
+    return _translate_old_ansi(text)
+
+class Highlighter(object):
+    """
+    Colours every highlighted phrase in one pass over the text, with a
+    single compiled regex. Longer phrases are tried first, so 'Mega Man'
+    wins over 'Mega'.
+    """
+
+    def __init__(self, lightlist):
+        self.colors = {}
+        for pair in lightlist:
+            phrase, color = pair[0], pair[1]
+            if phrase and phrase not in self.colors:
+                self.colors[phrase] = color
+        self.pattern = None
+        if self.colors:
+            phrases = sorted(self.colors, key=len, reverse=True)
+            self.pattern = re.compile("|".join(re.escape(phrase) for phrase in phrases))
+
+    def _color(self, match):
+        phrase = match.group(0)
+        return "|" + self.colors[phrase] + phrase + "|n"
+
+    def __call__(self, text):
+        if not self.pattern or not text:
+            return text
+        return self.pattern.sub(self._color, text)
+
+
+@lru_cache(maxsize=256)
+def compile_highlights(pairs):
+    # pairs is a tuple of (phrase, color) tuples so it can be cached
+    return Highlighter(pairs)
+
+
+def _freeze_highlights(lightlist):
+    return tuple((pair[0], pair[1]) for pair in lightlist or () if len(pair) > 1)
+
+
+def get_highlighter(caller):
+    '''
+    the compiled highlighter for caller's +highlight list, kept in ndb
+    until the list changes.
+    '''
+    highlighter = caller.ndb.highlighter
+    if highlighter is None:
+        highlighter = compile_highlights(_freeze_highlights(caller.db.highlightlist))
+        caller.ndb.highlighter = highlighter
+    return highlighter
+
+
+def forget_highlighter(caller):
+    # call whenever caller's highlight list changes
+    caller.ndb.highlighter = None
+
 
 def highlight_words(text, caller):
     if not text:
         return ""
-    lightlist = caller.db.highlightlist
+    return get_highlighter(caller)(text)
+
+def highlight_text(text, lightlist):
+    # the highlighting itself, for when the list was already read
     if not lightlist:
         return text
-    for phrase, color in lightlist:
-        text = text.replace(phrase, ("|"+ color + phrase + "|n"))
-        return text
+    return compile_highlights(_freeze_highlights(lightlist))(text)
 
 def strip_ansi(text):
     """Stripping out old ansi from a string"""
     from evennia.utils.ansi import strip_ansi
 
     text = strip_ansi(text)
-    text = (
-        text.replace("%r", "")
-        .replace("%R", "")
-        .replace("%t", "")
-        .replace("%T", "")
-        .replace("%b", "")
-    )
-    text = (
-        text.replace("%cr", "")
-        .replace("%cR", "")
-        .replace("%cg", "")
-        .replace("%cG", "")
-        .replace("%cy", "")
-    )
-    text = (
-        text.replace("%cY", "")
-        .replace("%cb", "")
-        .replace("%cB", "")
-        .replace("%cm", "")
-        .replace("%cM", "")
-    )
-    text = (
-        text.replace("%cc", "")
-        .replace("%cC", "")
-        .replace("%cw", "")
-        .replace("%cW", "")
-        .replace("%cx", "")
-    )
-    text = text.replace("%cX", "").replace("%ch", "").replace("%cn", "")
-    return text
+    if "%" not in text:
+        return text
+    if len(text) <= ANSI_CACHE_MAX_LENGTH:
+        return _strip_cached(text)
+    return _strip_old_ansi(text)
 
 
 def broadcast(txt, format_announcement=True):
@@ -0,0 +1,203 @@
+"""
+Weapon name lookups.
+
+Attacks used to find a weapon with an icontains query on every swing,
+then loop over the character's weapons to check they actually own it,
+and then run a second icontains query for generic attacks. Instead the
+names are kept in memory in case-folded prefix tries:
+
+    - one over every Weapon, for the builder commands
+    - one over the GenericAttacks
+    - one per character over their current arsenal, kept in ndb
+
+Each name is indexed from the start of every word, so "buster" finds
+"Mega Buster". An exact name always wins, otherwise a partial name
+only resolves if exactly one weapon matches it.
+
+The tries are built lazily and thrown away whenever a Weapon or
+GenericAttack is saved or deleted, see the signal handlers at the
+bottom.
+
+Usage:
+    matches = match_weapon(caller, "buster")
+    if len(matches) == 1:
+        weapon = matches[0]
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from world.combat.models import Weapon, GenericAttack
+
+
+class _Node(object):
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children = {}
+        self.ids = set()
+
+
+def _fold(name):
+    return " ".join(str(name).casefold().split())
+
+
+def _keys(name):
+    # the whole name plus the rest of it from each later word
+    words = _fold(name).split(" ")
+    return [" ".join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+class NameIndex(object):
+    """
+    A prefix trie of names over any objects with a db_name.
+    """
+
+    def __init__(self, items=()):
+        self.root = _Node()
+        self.exact = {}
+        self.items = {}
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def all(self):
+        return [self.items[i] for i in sorted(self.items)]
+
+    def add(self, item):
+        if item.id in self.items:
+            self.remove(item)
+        self.items[item.id] = item
+        self.exact.setdefault(_fold(item.db_name), set()).add(item.id)
+        for key in _keys(item.db_name):
+            node = self.root
+            for char in key:
+                node = node.children.setdefault(char, _Node())
+                node.ids.add(item.id)
+
+    def remove(self, item):
+        old = self.items.pop(item.id, None)
+        if old is None:
+            return
+        # old and item can be the same object with a new name, so walk
+        # every branch rather than trusting the name
+        for ids in self.exact.values():
+            ids.discard(item.id)
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            node.ids.discard(item.id)
+            stack.extend(node.children.values())
+
+    def _sorted(self, ids):
+        return [self.items[i] for i in sorted(ids)]
+
+    def find_exact(self, name):
+        return self._sorted(self.exact.get(_fold(name), ()))
+
+    def find(self, text):
+        '''
+        every item with a word starting with text, in id order.
+        '''
+        node = self.root
+        for char in _fold(text):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return self._sorted(node.ids)
+
+    def resolve(self, text):
+        '''
+        matches for text, an exact name first. One item back means it
+        resolved, more than one means the name was ambiguous.
+        '''
+        if not text or not text.strip():
+            return []
+        exact = self.find_exact(text)
+        if exact:
+            return exact
+        return self.find(text)
+
+
+_INDEXES = {}
+# bumped on every weapon change so per-character indexes know they're stale
+_GENERATION = [0]
+
+
+def weapon_index():
+    index = _INDEXES.get("weapons")
+    if index is None:
+        index = NameIndex(Weapon.objects.all())
+        _INDEXES["weapons"] = index
+    return index
+
+
+def generic_index():
+    index = _INDEXES.get("generic")
+    if index is None:
+        index = NameIndex(GenericAttack.objects.all())
+        _INDEXES["generic"] = index
+    return index
+
+
+def arsenal_index(char):
+    '''
+    the trie over char's current weapons. Rebuilt only when their
+    weapons change, eg. an armor swap, or any weapon is edited.
+    '''
+    weapons = char.get_weapons() or []
+    key = (_GENERATION[0], tuple(weapon.id for weapon in weapons))
+    cached = char.ndb.weapon_index
+    if cached and cached[0] == key:
+        return cached[1]
+    index = NameIndex(weapons)
+    char.ndb.weapon_index = (key, index)
+    return index
+
+
+def match_weapon(char, name):
+    return arsenal_index(char).resolve(name)
+
+
+def match_generic(name):
+    return generic_index().resolve(name)
+
+
+def match_any_weapon(name):
+    return weapon_index().resolve(name)
+
+
+def ambiguous_msg(matches):
+    names = ", ".join(match.db_name for match in matches)
+    return f"Which did you mean? {names}"
+
+
+@receiver(post_save, sender=Weapon)
+@receiver(post_delete, sender=Weapon)
+def _weapon_changed(sender, instance, **kwargs):
+    _GENERATION[0] += 1
+    index = _INDEXES.get("weapons")
+    if index is None:
+        return
+    if kwargs.get("created") is None:
+        # post_delete sends no created flag
+        index.remove(instance)
+    else:
+        index.add(instance)
+
+
+@receiver(post_save, sender=GenericAttack)
+@receiver(post_delete, sender=GenericAttack)
+def _generic_changed(sender, instance, **kwargs):
+    index = _INDEXES.get("generic")
+    if index is None:
+        return
+    if kwargs.get("created") is None:
+        index.remove(instance)
+    else:
+        index.add(instance)
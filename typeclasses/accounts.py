@@ -5,6 +5,7 @@ from evennia.accounts.models import AccountDB
 from evennia.server.throttle import Throttle
 from evennia import DefaultAccount
 from evennia.utils import class_from_module, create, logger
+from server.mailbox import announce_unread_mail
 # Create throttles for too many account-creations and login attempts
 CREATION_THROTTLE = Throttle(
     limit=settings.CREATION_THROTTLE_LIMIT, timeout=settings.CREATION_THROTTLE_TIMEOUT
@@ -107,7 +108,9 @@ class Account(DefaultAccount):
 
     """
 
-    pass
+    def at_post_login(self, session=None, **kwargs):
+        super().at_post_login(session=session, **kwargs)
+        announce_unread_mail(self)
 
 
 class MegaGuest(DefaultAccount):
@@ -11,6 +11,13 @@ creation commands.
 
 from evennia import DefaultCharacter
 from evennia.utils import ansi
+from server.statblock import (default_statblock, pack_from_attributes, stat_index,
+                              is_stat, is_skill, STAT_SLICE, SKILL_SLICE)
+from server.armorswap import snapshot_armor, load_snapshot
+from server.poseorder import note_pose
+from server.bbnotify import announce_unread_boards
+from server.mailbox import announce_unread_mail
+from server.radio import radio_online, radio_offline
 import inflect
 
 _INFLECT = inflect.engine()
@@ -37,12 +44,11 @@ class Character(DefaultCharacter):
 
         # stats and basic setup
 
-        self.db.pow = self.db.dex  = self.db.ten = self.db.cun = self.db.edu = self.db.chr = self.db.aur = 1
-
+        # stats and skills live together in one packed stat block.
         #skills can't be null in combat testing
         # setting to 1 for now, will decide later if 0 is OK
 
-        self.db.discern = self.db.aim = self.db.athletics =  self.db.force = self.db.mechanics = self.db.medicine = self.db.computer = self.db.stealth = self.db.heist = self.db.convince =  self.db.presence = self.db.arcana = 1
+        self.set_statblock(default_statblock())
 
         self.db.size = "Medium"
         self.db.speed = 1
@@ -91,7 +97,6 @@ class Character(DefaultCharacter):
         self.db.observer = False
         self.db.potprivate = False
 
-        self.db.lastpose = 0
         self.db.pose_time = 0.0
 
         self.db.appstatus = "Open"
@@ -100,44 +105,76 @@ class Character(DefaultCharacter):
 
         self.db.radio_on = True
         self.db.radio_channels = 8
-        self.db.radio_list = []
-        self.db.radio_slots = []
-        self.db.radio_names = []
-        self.db.radio_titles = []
-        self.db.radio_colors = []
+        # letter -> frequency settings, see server/radio.py
+        self.db.radio_tuning = {}
         self.db.radio_nospoof = False
 
+    def at_post_puppet(self, **kwargs):
+        super().at_post_puppet(**kwargs)
+        # bboard notices only go to people online, catch up on the rest
+        announce_unread_boards(self)
+        announce_unread_mail(self)
+        radio_online(self)
+
+    def at_post_unpuppet(self, account=None, session=None, **kwargs):
+        super().at_post_unpuppet(account=account, session=session, **kwargs)
+        if not self.sessions.count():
+            radio_offline(self)
+
+    def get_statblock(self):
+        """
+        The packed list of stats then skills, see server/statblock.py
+        for the layout. Cached in ndb so repeat reads don't touch
+        the attribute at all. While an armor mode is active this is
+        the mode's block.
+        """
+        mode = self.get_active_mode()
+        if mode:
+            return mode["statblock"]
+        return self.get_base_statblock()
+
+    def get_base_statblock(self):
+        block = self.ndb.statblock
+        if block is None:
+            block = self.db.statblock
+            if not block:
+                # older character, pack the separate attributes once
+                block = pack_from_attributes(self)
+                self.db.statblock = block
+            block = list(block)
+            self.ndb.statblock = block
+        return block
+
+    def set_statblock(self, block):
+        # one write for the whole block
+        block = list(block)
+        self.db.statblock = block
+        self.ndb.statblock = block
+
+    def set_stat(self, name, value):
+        index = stat_index(name)
+        if index is None:
+            return False
+        block = list(self.get_base_statblock())
+        block[index] = value
+        self.set_statblock(block)
+        return True
 
     def get_stats(self):
         """
         Simple access method to return ability
         scores as a tuple. 
         """
-        return self.db.pow, self.db.dex, self.db.ten, self.db.cun, self.db.edu, self.db.chr, self.db.aur
+        return tuple(self.get_statblock()[STAT_SLICE])
 
     def get_a_stat(self, stat):
 
-        #get a single stat.
-        #to-do - not case sensitive
-
-        if stat == "pow" or stat == "power":
-            return self.db.pow
-        elif stat == "dex" or stat == "dexterity":
-            return self.db.dex
-        elif stat == "ten" or stat == "tenacity":
-            return self.db.ten
-        elif stat == "cun" or stat == "cunning":
-            return self.db.cun
-        elif stat == "edu" or stat == "education":
-            return self.db.edu
-        elif stat == "chr" or stat == "charisma":
-            return self.db.chr
-        elif stat == "aur" or stat == "aura":
-            return self.db.aur
-
-        else:
+        #get a single stat, short or long name, not case sensitive
+
+        if not is_stat(stat):
             self.msg("No valid stat found.")
             return 0
+        return self.get_statblock()[stat_index(stat)]
 
 
     def get_skills(self):
@@ -145,38 +182,15 @@ class Character(DefaultCharacter):
         Simple access method to return skills
     
         """
-        return self.db.discern, self.db.aim, self.db.athletics, self.db.force, self.db.mechanics, self.db.medicine, self.db.computer, self.db.stealth, self.db.heist, self.db.convince, self.db.presence, self.db.arcana
+        return tuple(self.get_statblock()[SKILL_SLICE])
 
     def get_a_skill(self, skill):
         #access a single skill
 
-        if skill == "aim":
-            return self.db.aim
-        elif skill == "discern":
-            return self.db.discern
-        elif skill == "athletics":
-            return self.db.athletics
-        elif skill == "force":
-            return self.db.force
-        elif skill == "mechanics":
-            return self.db.mechanics
-        elif skill == "medicine":
-            return self.db.medicine
-        elif skill == "computer":
-            return self.db.computer
-        elif skill == "stealth":
-            return self.db.stealth
-        elif skill == "heist":
-            return self.db.heist
-        elif skill == "convince":
-            return self.db.convince
-        elif skill == "presence":
-            return self.db.presence
-        elif skill == "arcana":
-            return self.db.arcana
-        else:
+        if not is_skill(skill):
             self.msg("No valid skill found.")
             return 0
+        return self.get_statblock()[stat_index(skill)]
 
     def get_finger(self):
         """
@@ -194,10 +208,37 @@ class Character(DefaultCharacter):
         return self.db.parents, self.db.birthday, self.db.creator, self.db.builddate
 
     def get_statobjs(self):
+        mode = self.get_active_mode()
+        if mode:
+            return self.db.type, mode["size"], mode["speed"], mode["strength"]
         return self.db.type, self.db.size, self.db.speed, self.db.strength
+
+    def get_weapons(self):
+        mode = self.get_active_mode()
+        if mode:
+            return mode["weapons"]
+        return self.db.weapons or []
+
+    def get_capabilities(self):
+        mode = self.get_active_mode()
+        if mode:
+            return mode["capabilities"]
+        return self.db.capabilities or []
+
+    def get_primary(self):
+        mode = self.get_active_mode()
+        if mode:
+            return mode["primary"]
+        return self.db.primary
+
+    def get_secondary(self):
+        mode = self.get_active_mode()
+        if mode:
+            return mode["secondary"]
+        return self.db.secondary
     
     def get_caps(self):
-        cap_list = self.db.capabilities
+        cap_list = self.get_capabilities()
         str_list = []
         for cap in cap_list:
             str_list.append(cap.db_name)
@@ -211,6 +252,8 @@ class Character(DefaultCharacter):
 
     def set_pose_time(self, time):
         self.db.pose_time = time
+        # keep the room's +pot order in step
+        note_pose(self, time)
 
     
     def get_numbered_name(self, count, looker, **kwargs):
@@ -246,8 +289,35 @@ class Character(DefaultCharacter):
     
     def get_current_armor(self):
         #this is a string, not an armor
+        mode = self.get_active_mode()
+        if mode:
+            return mode["name"]
         return self.db.currentmode
 
+    def get_active_mode(self):
+        """
+        The active armor mode snapshot, see server/armorswap.py, or
+        None when in base form. Loaded once and kept in ndb.
+        """
+        mode = self.ndb.activemode
+        if mode is None:
+            snapshot = self.db.activemode
+            mode = load_snapshot(snapshot) if snapshot else False
+            self.ndb.activemode = mode
+        return mode or None
+
+    def activate_armor(self, armor):
+        # the whole mode goes in with one attribute write
+        snapshot = snapshot_armor(armor)
+        self.db.activemode = snapshot
+        self.ndb.activemode = load_snapshot(snapshot)
+        return self.ndb.activemode
+
+    def clear_armor(self):
+        # back to base form
+        self.attributes.remove("activemode")
+        self.ndb.activemode = False
+
 
     """
     The Character defaults to reimplementing some of base Object's hook methods with the
@@ -11,6 +11,8 @@ from evennia.utils import search
 from evennia.utils import logger
 from evennia.utils import ansi
 from typeclasses.objects import MObject
+from server.combatstate import release_combatant
+from server.poseorder import note_arrival, note_departure
 from collections import defaultdict
 from evennia.utils.utils import (
     class_from_module,
@@ -48,6 +50,17 @@ class Room(DefaultRoom):
         self.db.protector = []
         self.db.sequence_beats = 0
 
+    def at_object_receive(self, moved_obj, source_location, **kwargs):
+        # newcomers join the +pot order
+        note_arrival(self, moved_obj)
+        super().at_object_receive(moved_obj, source_location, **kwargs)
+
+    def at_object_leave(self, moved_obj, target_location, **kwargs):
+        # write back anyone's in-memory combat record before they go
+        release_combatant(moved_obj, self)
+        note_departure(self, moved_obj)
+        super().at_object_leave(moved_obj, target_location, **kwargs)
+
     def at_say(
         self,
         message,
@@ -23,6 +23,9 @@ from datetime import datetime, timedelta
 from typeclasses.bboard import BBoard
 from typeclasses.characters import Character
 from typeclasses.accounts import Account
+from server.scenelog import flush_all_scene_logs, SCENE_LOG_FLUSH_INTERVAL
+from server.bbsweep import sweep_bboards
+from server.radio import flush_radio_logs, prune_radio_logs, RADIO_LOG_FLUSH_INTERVAL
 
 
 
@@ -221,23 +224,59 @@ class WeeklyEvents(Script):
         return
 
 
+class SceneLogScript(Script):
+    "Writes out queued autologger entries every few seconds"
+
+    def at_script_creation(self):
+        "called only when the object is first created"
+        self.key = "scene_log_writer"
+        self.desc = "Flushes buffered scene log entries to the database."
+        self.interval = SCENE_LOG_FLUSH_INTERVAL
+        self.persistent = True
+
+    def at_repeat(self):
+        flush_all_scene_logs()
+
+
+class RadioLogScript(Script):
+    "Writes out queued radio recall entries every few seconds"
+
+    def at_script_creation(self):
+        "called only when the object is first created"
+        self.key = "radio_log_writer"
+        self.desc = "Flushes buffered radio recall entries to the database."
+        self.interval = RADIO_LOG_FLUSH_INTERVAL
+        self.persistent = True
+
+    def at_repeat(self):
+        flush_radio_logs()
+
+
 class DailyEvents(Script):
 
     def at_script_creation(self):
         "called only when the object is first created"
+        self.key = "daily_events"
+        self.desc = "Timeouts for boards, weapons and armor copies."
         self.interval = 3600 * 24 #hour times day
         self.start_delay = True
+        self.persistent = True
 
     def at_repeat(self):
         self.check_weapon_timeouts()
         self.check_copy_timeouts()
         self.clean_bboards()
+        self.clean_radio_logs()
 
-    def clean_bboards():
-        #do the thing
-        return
-    
-    def check_weapon_timeouts():
+    def clean_bboards(self):
+        # archive posts past their board's timeout, see server/bbsweep.py
+        sweep_bboards()
+
+    def clean_radio_logs(self):
+        # keep only what +freq/recall can show, see server/radio.py
+        prune_radio_logs()
+
+    def check_weapon_timeouts(self):
         #for all players with weapon copy skills
 
         #check if there are weapons past their use-by date
@@ -246,7 +285,7 @@ class DailyEvents(Script):
         #in the future, this might also process ride armor timeouts
         return
     
-    def check_copy_timeouts():
+    def check_copy_timeouts(self):
         #for all players with armor copy skills
 
         #check if there are armors past their use-by date
@@ -25,6 +25,8 @@ urlpatterns = [
     path("webclient/", include("web.webclient.urls")),
     # web admin
     path("admin/", include("web.admin.urls")),
+    # scene logs
+    path("scenes/", include("world.scenes.urls")),
     # add any extra urls here:
     # path("mypath/", include("path.to.my.urls.file")),
 ]
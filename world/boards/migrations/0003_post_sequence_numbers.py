@@ -0,0 +1,40 @@
+# Generated by Django 4.1.10
+
+from django.db import migrations, models
+
+
+def number_posts(apps, schema_editor):
+    # give existing posts their numbers in the order they were made
+    BulletinBoard = apps.get_model("boards", "BulletinBoard")
+    BoardPost = apps.get_model("boards", "BoardPost")
+    for board in BulletinBoard.objects.all():
+        posts = list(BoardPost.objects.filter(db_board=board).order_by("db_date_created", "id"))
+        for seq, post in enumerate(posts, 1):
+            post.db_seq = seq
+        BoardPost.objects.bulk_update(posts, ["db_seq"], batch_size=500)
+        board.db_last_seq = len(posts)
+        board.save(update_fields=["db_last_seq"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("boards", "0002_boardpost_is_pinned"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bulletinboard",
+            name="db_last_seq",
+            field=models.IntegerField(default=0, verbose_name="Last Post Number"),
+        ),
+        migrations.AddField(
+            model_name="boardpost",
+            name="db_seq",
+            field=models.IntegerField(default=0, verbose_name="Post Number"),
+        ),
+        migrations.RunPython(number_posts, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name="boardpost",
+            unique_together={("db_board", "db_seq")},
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.1.10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("boards", "0003_post_sequence_numbers"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="boardpost",
+            name="is_archived",
+            field=models.BooleanField(db_index=True, default=False, verbose_name="Is Archived?"),
+        ),
+        migrations.CreateModel(
+            name="BoardPostArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("body", models.BinaryField()),
+                (
+                    "post",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cold",
+                        to="boards.boardpost",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from world.pcgroups.models import PlayerGroup
 
 # Create your models here.
@@ -11,13 +12,28 @@ class BulletinBoard(models.Model):
                                             auto_now_add=True, db_index=True)
     has_subscriber = models.ManyToManyField("objects.ObjectDB", blank=True)
     db_timeout = models.IntegerField('Timeout', blank=True, default=180)
+    # the number given to the last post made here, see next_post_seq
+    db_last_seq = models.IntegerField('Last Post Number', default=0)
 
     def __str__(self):
         return self.db_name
 
+    def next_post_seq(self):
+        # bump the counter in the database so two posts at once can't
+        # get the same number
+        with transaction.atomic():
+            BulletinBoard.objects.filter(pk=self.pk).update(db_last_seq=F("db_last_seq") + 1)
+            self.db_last_seq = BulletinBoard.objects.values_list(
+                "db_last_seq", flat=True).get(pk=self.pk)
+        return self.db_last_seq
+
 
 class BoardPost(models.Model):
 
+    class Meta:
+        # post numbers are looked up by board, this is also the index for it
+        unique_together = ('db_board', 'db_seq')
+
     db_title = models.CharField('Post Title',max_length=360)
     db_date_created = models.DateTimeField('date created', editable=False,
                                             auto_now_add=True, db_index=True)
@@ -27,6 +43,24 @@ class BoardPost(models.Model):
     body_text = models.TextField('Post')
     read_by = models.ManyToManyField("objects.ObjectDB", blank=True)
     is_pinned = models.BooleanField('Is Pinned?', default=False)
+    # set by the daily sweep once the post is older than its board's timeout
+    is_archived = models.BooleanField('Is Archived?', default=False, db_index=True)
+    # this post's number on its board. Given on insert and never reused,
+    # so deleting a post doesn't renumber the ones after it.
+    db_seq = models.IntegerField('Post Number', default=0)
 
     def __str__(self):
-        return self.db_title
\ No newline at end of file
+        return self.db_title
+
+    def save(self, *args, **kwargs):
+        if not self.db_seq:
+            self.db_seq = self.db_board.next_post_seq()
+        super().save(*args, **kwargs)
+
+
+# The compressed body of an archived post, moved out of the posts table
+# so active board queries stay small. See server/bbsweep.py.
+class BoardPostArchive(models.Model):
+
+    post = models.OneToOneField(BoardPost, on_delete=models.CASCADE, related_name="cold")
+    body = models.BinaryField()
@@ -1,3 +1,114 @@
 from django.test import TestCase
+from evennia.utils.test_resources import EvenniaTest
 
-# Create your tests here.
+from server.battle import do_roll, explode_tens, check_opposed_rolls
+from server.dice import DiceEngine, count_successes, dice_to_string, seed_dice
+from server.odds import opposed_odds, success_distribution, expected_damage, MAX_POOL
+from server.statblock import (pack_from_attributes, stat_index, STATBLOCK_FIELDS,
+                              STAT_DEFAULT)
+
+
+class DiceEngineTests(TestCase):
+
+    def test_seed_replays_rolls(self):
+        first = DiceEngine(seed=1234)
+        second = DiceEngine(seed=1234)
+        self.assertEqual(first.roll_pool(12), second.roll_pool(12))
+        self.assertEqual(
+            [r.dice for r in first.roll_pools([3, 7, 10])],
+            [r.dice for r in second.roll_pools([3, 7, 10])],
+        )
+
+    def test_pools_keep_their_sizes(self):
+        engine = DiceEngine(seed=5)
+        results = engine.roll_pools([4, 0, 9], explode=False)
+        self.assertEqual([len(r.dice) for r in results], [4, 0, 9])
+
+    def test_tens_explode(self):
+        engine = DiceEngine(seed=99)
+        for _ in range(200):
+            roll = engine.roll_pool(10)
+            # every ten rolled added one more die
+            self.assertEqual(len(roll), 10 + roll.count(10))
+
+    def test_resolve(self):
+        engine = DiceEngine()
+        result = engine.resolve([10, 7, 3, 8, 9, 1])
+        self.assertEqual(result.successes, 4)
+        self.assertFalse(result.crit)
+        self.assertEqual(count_successes([7, 7, 7, 7, 7]), 5)
+        self.assertTrue(engine.resolve([7, 7, 7, 7, 7]).crit)
+        self.assertEqual(dice_to_string([10, 7, 3]), "|g10|n |G7|n |R3|n ")
+
+
+class OddsTableTests(TestCase):
+    '''
+    compare the precomputed tables against actually rolling do_roll
+    '''
+
+    TRIALS = 20000
+    TOLERANCE = 0.015
+
+    def setUp(self):
+        seed_dice(20240101)
+
+    def monte_carlo(self, attack_pool, defense_pool, explode=False):
+        counts = {2: 0, 1: 0, 0: 0, -1: 0, -2: 0}
+        for _ in range(self.TRIALS):
+            attack = do_roll(attack_pool, 0)
+            defense = do_roll(defense_pool, 0)
+            if explode:
+                attack = explode_tens(attack)
+                defense = explode_tens(defense)
+            counts[check_opposed_rolls(attack, defense)] += 1
+        return [counts[key] / self.TRIALS for key in (2, 1, 0, -1, -2)]
+
+    def assertClose(self, expected, observed):
+        for exact, rolled in zip(expected, observed):
+            self.assertAlmostEqual(exact, rolled, delta=self.TOLERANCE)
+
+    def test_distributions_sum_to_one(self):
+        for pool in (0, 1, 7, MAX_POOL):
+            self.assertAlmostEqual(sum(success_distribution(pool)), 1.0)
+            self.assertAlmostEqual(sum(success_distribution(pool, True)), 1.0)
+        self.assertAlmostEqual(sum(opposed_odds(12, 9, True)), 1.0)
+
+    def test_opposed_matches_rolls(self):
+        for attack_pool, defense_pool in ((3, 3), (8, 5), (4, 12), (15, 15)):
+            self.assertClose(
+                opposed_odds(attack_pool, defense_pool),
+                self.monte_carlo(attack_pool, defense_pool),
+            )
+
+    def test_exploding_matches_rolls(self):
+        for attack_pool, defense_pool in ((6, 6), (12, 7)):
+            self.assertClose(
+                opposed_odds(attack_pool, defense_pool, True),
+                self.monte_carlo(attack_pool, defense_pool, explode=True),
+            )
+
+    def test_expected_damage_matches_rolls(self):
+        attack_pool, defense_pool = 8, 6
+        total = 0
+        for _ in range(self.TRIALS):
+            damage = sum(do_roll(attack_pool, 0)) - sum(do_roll(defense_pool, 0))
+            total += max(damage, 0)
+        self.assertAlmostEqual(
+            expected_damage(attack_pool, defense_pool), total / self.TRIALS, delta=0.5
+        )
+
+
+class StatblockTests(EvenniaTest):
+
+    def test_pack_partial_stats(self):
+        # a legacy character with only some of its stats and skills set
+        self.char1.attributes.add("dex", 5)
+        self.char1.attributes.add("aim", 3)
+        self.char1.attributes.add("arcana", "2")
+        block = pack_from_attributes(self.char1)
+        self.assertEqual(len(block), len(STATBLOCK_FIELDS))
+        self.assertEqual(block[stat_index("dex")], 5)
+        self.assertEqual(block[stat_index("aim")], 3)
+        self.assertEqual(block[stat_index("arcana")], 2)
+        self.assertEqual(block[stat_index("pow")], STAT_DEFAULT)
+        self.assertEqual(block[stat_index("presence")], STAT_DEFAULT)
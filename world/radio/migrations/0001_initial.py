@@ -0,0 +1,90 @@
+# Generated by Django 4.1.10 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        ("objects", "0014_defaultobject_defaultcharacter_defaultexit_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Frequency",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "db_freq",
+                    models.IntegerField(db_index=True, default=1, verbose_name="Freq"),
+                ),
+                (
+                    "db_date_created",
+                    models.DateTimeField(
+                        auto_now_add=True, db_index=True, verbose_name="date created"
+                    ),
+                ),
+                (
+                    "db_security_level",
+                    models.IntegerField(default=1, verbose_name="Security Level"),
+                ),
+                (
+                    "db_gaglist",
+                    models.ManyToManyField(
+                        blank=True, related_name="radio_gags", to="objects.objectdb"
+                    ),
+                ),
+                (
+                    "db_members",
+                    models.ManyToManyField(
+                        blank=True,
+                        related_name="radio_frequencies",
+                        to="objects.objectdb",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="FrequencyLog",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("speaker", models.CharField(max_length=120)),
+                ("text", models.TextField()),
+                ("spoof", models.BooleanField(default=False)),
+                (
+                    "created_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "frequency",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="log",
+                        to="radio.frequency",
+                    ),
+                ),
+            ],
+        ),
+    ]
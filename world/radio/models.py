@@ -1,20 +1,32 @@
 from django.db import models
 from evennia import ObjectDB
 from evennia.utils.idmapper.models import SharedMemoryModel
-from django.contrib.postgres.fields import ArrayField
+from django.utils import timezone
 
 # radio channels
 
 
 
 class Frequency(SharedMemoryModel):
-    db_freq = models.IntegerField('Freq', Default=1)
+    db_freq = models.IntegerField('Freq', default=1, db_index=True)
     db_date_created = models.DateTimeField('date created', editable=False,
                                             auto_now_add=True, db_index=True)
-    db_members = models.ManyToManyField("objects.ObjectDB", blank=True)
-    db_gaglist = models.ManyToManyField("objects.ObjectDB", blank=True)
-    db_security_level = models.IntegerField('Security Level', Default=1)
-    db_content = ArrayField((models.TextField(blank=True)), blank=True, size=50)
-    
+    db_members = models.ManyToManyField("objects.ObjectDB", blank=True,
+                                        related_name="radio_frequencies")
+    db_gaglist = models.ManyToManyField("objects.ObjectDB", blank=True,
+                                        related_name="radio_gags")
+    db_security_level = models.IntegerField('Security Level', default=1)
+
     def __str__(self):
-        return self.db_freq
+        return str(self.db_freq)
+
+
+class FrequencyLog(models.Model):
+    # one transmission, kept for +freq/recall. Written in batches,
+    # see server/radio.py
+    frequency = models.ForeignKey(Frequency, related_name="log", on_delete=models.CASCADE)
+    speaker = models.CharField(max_length=120)
+    text = models.TextField()
+    # an @emit, shown with the speaker's name to people with nospoof on
+    spoof = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
@@ -0,0 +1,42 @@
+# Generated by Django 4.1.10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scenes", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SceneArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("data", models.BinaryField()),
+                ("frame_index", models.TextField(default="[]")),
+                ("frame_size", models.IntegerField(default=100)),
+                ("entry_count", models.IntegerField(default=0)),
+                ("raw_size", models.IntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "scene",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archive",
+                        to="scenes.scene",
+                    ),
+                ),
+            ],
+        ),
+    ]
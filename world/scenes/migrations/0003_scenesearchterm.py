@@ -0,0 +1,41 @@
+# Generated by Django 4.1.10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scenes", "0002_scenearchive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SceneSearchTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(db_index=True, max_length=64)),
+                ("weight", models.IntegerField(default=0)),
+                (
+                    "scene",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_terms",
+                        to="scenes.scene",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("term", "scene")},
+            },
+        ),
+    ]
@@ -129,4 +129,44 @@ class LogEntry(models.Model):
         null=True,
         on_delete=models.SET_NULL,
     )
-    # "objects.ObjectDB"
\ No newline at end of file
+    # "objects.ObjectDB"
+
+
+# A finished scene's log entries packed into one compressed row. See
+# server/scenearchive.py for the format. Once a scene is archived its
+# LogEntry rows are deleted and the log is read back from here.
+class SceneArchive(models.Model):
+    scene = models.OneToOneField(
+        Scene,
+        on_delete=models.CASCADE,
+        related_name="archive")
+
+    # zlib frames of JSON lines, one line per log entry.
+    data = models.BinaryField()
+
+    # JSON list of the byte offset each frame starts at, so one page can be
+    # read without inflating the whole log.
+    frame_index = models.TextField(default="[]")
+
+    # entries per frame, and totals for display.
+    frame_size = models.IntegerField(default=100)
+    entry_count = models.IntegerField(default=0)
+    raw_size = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+# One word of a scene's inverted search index and how much weight it has
+# in that scene. See server/scenesearch.py.
+class SceneSearchTerm(models.Model):
+    class Meta:
+        unique_together = ('term', 'scene')
+
+    term = models.CharField(max_length=64, db_index=True)
+    scene = models.ForeignKey(
+        Scene,
+        on_delete=models.CASCADE,
+        related_name="search_terms")
+
+    # times the word appears, with title and description words counting extra
+    weight = models.IntegerField(default=0)
@@ -1,8 +1,14 @@
 from django.urls import path
 from . import views
 
+app_name = 'scenes'
+
 urlpatterns = [
     path('', views.scenes, name='list'),
-    # ex: /polls/5/
+    # ex: /scenes/search/?q=wily+fortress
+    path('search/', views.search, name='search'),
+    # ex: /scenes/5/
     path('<int:scene_id>/', views.detail, name='detail'),
-]
\ No newline at end of file
+    # ex: /scenes/5/export/txt/
+    path('<int:scene_id>/export/<str:fmt>/', views.export, name='export'),
+]
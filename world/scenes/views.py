@@ -1,19 +1,112 @@
-from django.http import HttpResponse, HttpResponseRedirect
-from world.scenes.models import Scene
+from django.http import Http404, StreamingHttpResponse
+from world.scenes.models import Scene, LogEntry
 from django.shortcuts import get_object_or_404, render
+from django.template.loader import render_to_string
+from django.utils.html import escape
+from django.utils.text import slugify
 from django.utils.timezone import localtime
+from evennia.utils.ansi import strip_ansi
+from evennia.utils.text2html import parse_html
+
+from server.scenearchive import scene_entries
+from server.scenesearch import search_scenes
+
+
+# scenes on each page of the scene list
+SCENES_PER_PAGE = 25
+
+# detail.html puts this where the log goes, the log is streamed in its place
+LOG_MARKER = "<!-- scene log -->"
+
+ENTRY_LABELS = dict(LogEntry.EntryType.TYPE_CHOICES)
+
+
+def entry_html(entry):
+    return '<div class="log-entry log-{0}" id="entry-{1}">{2}</div>\n'.format(
+        ENTRY_LABELS.get(entry.type, "entry").lower(), entry.id, parse_html(entry.content))
+
+
+def entry_text(entry):
+    return strip_ansi(entry.content) + "\n\n"
+
+
+def stream_log(scene, head, tail, render_entry):
+    # head, every entry one at a time, tail. Only one archive frame or one
+    # chunk of rows is in memory at once.
+    yield head
+    for entry in scene_entries(scene):
+        yield render_entry(entry)
+    yield tail
+
+
+def scene_time(when):
+    return localtime(when).strftime("%Y-%m-%d %H:%M") if when else "-"
 
 
 def detail(request, scene_id):
-    scene = get_object_or_404(Scene, pk=scene_id)
+    scene = get_object_or_404(Scene.objects.select_related("location"), pk=scene_id)
     context = {
         "scene": scene,
-        "user": request.user
+        "user": request.user,
+        "log_marker": LOG_MARKER,
     }
-    return render(request, "scenes/detail.html", context)
+    page = render_to_string("scenes/detail.html", context, request)
+    head, tail = page.split(LOG_MARKER, 1)
+    return StreamingHttpResponse(stream_log(scene, head, tail, entry_html))
+
+
+def export(request, scene_id, fmt):
+    '''
+    download a scene's log as plain text or as a standalone html page.
+    '''
+    scene = get_object_or_404(Scene, pk=scene_id)
+    title = scene.name or "Scene {0}".format(scene.id)
+    when = "{0} to {1}".format(scene_time(scene.start_time), scene_time(scene.end_time))
+    if fmt == "txt":
+        head = "{0}\n{1}\n\n{2}\n\n".format(title, when, strip_ansi(scene.description or ""))
+        tail = ""
+        render_entry = entry_text
+        content_type = "text/plain; charset=utf-8"
+    elif fmt == "html":
+        head = ('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{0}</title></head>\n'
+                '<body>\n<h1>{0}</h1>\n<p>{1}</p>\n<p>{2}</p>\n<hr/>\n').format(
+                    escape(title), escape(when), parse_html(scene.description or ""))
+        tail = "</body></html>\n"
+        render_entry = entry_html
+        content_type = "text/html; charset=utf-8"
+    else:
+        raise Http404("No such export format.")
+    response = StreamingHttpResponse(stream_log(scene, head, tail, render_entry),
+                                     content_type=content_type)
+    filename = "{0}.{1}".format(slugify(title) or "scene-{0}".format(scene.id), fmt)
+    response["Content-Disposition"] = 'attachment; filename="{0}"'.format(filename)
+    return response
 
 
 def scenes(request):
-    all_scenes = Scene.objects.all()
-    context = { "all_scenes": all_scenes }
-    return render(request, "scenes/scenes.html", context)
\ No newline at end of file
+    '''
+    newest scenes first, SCENES_PER_PAGE at a time. ?before=<id> is the
+    last scene on the previous page, so every page is one indexed query
+    no matter how far back it is.
+    '''
+    all_scenes = Scene.objects.select_related("location").order_by("-id")
+    before = request.GET.get("before", "")
+    if before.isdigit():
+        all_scenes = all_scenes.filter(id__lt=int(before))
+    page = list(all_scenes[:SCENES_PER_PAGE + 1])
+    next_before = page[SCENES_PER_PAGE - 1].id if len(page) > SCENES_PER_PAGE else None
+    context = {
+        "all_scenes": page[:SCENES_PER_PAGE],
+        "next_before": next_before,
+        "first_page": not before,
+    }
+    return render(request, "scenes/scenes.html", context)
+
+
+def search(request):
+    query = request.GET.get("q", "").strip()
+    context = {
+        "query": query,
+        "results": search_scenes(query) if query else [],
+    }
+    return render(request, "scenes/search.html", context)